@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "CNAScope_api.settings")
 
 application = get_asgi_application()
+
+# Web 服务进程启动时在后台构建 GISTIC 结果目录快照
+from database.utils import recurrent_utils  # noqa: E402
+
+recurrent_utils.preload_gistic_catalog()
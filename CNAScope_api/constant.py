@@ -1,2 +1,3 @@
 DATA_HOME = '/mnt/cbc_adam/platform/CNAScope/data'
 GISTIC_HOME = '/mnt/cbc_adam/platform/CNAScope/data/bulkDNA/GDC/out/gistic_raw'
+DOWNLOAD_ZIP_HOME = '/mnt/cbc_adam/platform/CNAScope/data/download_zips'
@@ -0,0 +1,61 @@
+from django.utils.cache import patch_vary_headers
+
+from database.utils import compress_utils
+
+
+class CompressionMiddleware:
+    """
+    动态响应（矩阵子集、JSON 等）按 Accept-Encoding 即时压缩，支持 zstd / gzip，流式响应逐块压缩。
+
+    只处理完整的 200 响应：Range 请求的 206 响应、已带 Content-Encoding 的响应（预压缩文件）和交给代理发送的文件不做处理。
+    支持 Range 的文件整体下载时同样压缩，压缩后的响应不再声明 Accept-Ranges。
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+
+        if response.status_code != 200 or response.has_header('Content-Encoding'):
+            return response
+
+        if response.has_header('X-Accel-Redirect') or response.has_header('X-Sendfile'):
+            return response
+
+        if not compress_utils.is_compressible(response.get('Content-Type', '')):
+            return response
+
+        if not response.streaming and len(response.content) < compress_utils.MIN_COMPRESS_SIZE:
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = compress_utils.choose_encoding(request)
+
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            response.streaming_content = compress_utils.iter_compressed(response.streaming_content, encoding)
+            del response['Content-Length']
+        else:
+            compressed = compress_utils.compress_bytes(response.content, encoding)
+
+            if len(compressed) >= len(response.content):
+                return response
+
+            response.content = compressed
+            response['Content-Length'] = str(len(compressed))
+
+        # 压缩后内容不同，弱化 ETag
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response['ETag'] = f'W/{etag}'
+
+        response['Content-Encoding'] = encoding
+
+        # Range 针对未压缩的内容，不能用于压缩后的响应
+        if response.has_header('Accept-Ranges'):
+            del response['Accept-Ranges']
+
+        return response
@@ -48,6 +48,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "CNAScope_api.middleware.CompressionMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
@@ -144,4 +145,78 @@ REST_FRAMEWORK = {
 
 # Custom settings
 WORKSPACE_HOME = os.path.join(BASE_DIR, 'workspace')
-SLURM_SCRIPT_HOME = os.path.join(BASE_DIR, 'scripts', 'slurm_task')
\ No newline at end of file
+SLURM_SCRIPT_HOME = os.path.join(BASE_DIR, 'scripts', 'slurm_task')
+
+# 进程内 Arrow 表缓存容量（字节），用于基因 / Term 矩阵
+# 以下缓存容量均为每个进程的上限，实际内存占用约为 容量 x Web worker 进程数
+ARROW_TABLE_CACHE_MAX_BYTES = int(os.getenv('ARROW_TABLE_CACHE_MAX_BYTES', 512 * 1024 ** 2))
+ARROW_SCHEMA_CACHE_MAX_BYTES = int(os.getenv('ARROW_SCHEMA_CACHE_MAX_BYTES', 64 * 1024 ** 2))
+
+# 样本元数据 DataFrame 缓存容量（字节），用于样本列表的分页、筛选与排序
+META_FRAME_CACHE_MAX_BYTES = int(os.getenv('META_FRAME_CACHE_MAX_BYTES', 512 * 1024 ** 2))
+
+# GISTIC 结果目录快照的刷新间隔（秒）
+GISTIC_CATALOG_TTL = int(os.getenv('GISTIC_CATALOG_TTL', 600))
+GISTIC_CATALOG_PRELOAD = os.getenv('GISTIC_CATALOG_PRELOAD', 'true').lower() == 'true'
+
+# 预序列化 JSON 响应缓存容量（字节）
+PAYLOAD_CACHE_MAX_BYTES = int(os.getenv('PAYLOAD_CACHE_MAX_BYTES', 256 * 1024 ** 2))
+
+# 任务状态轮询：poll_task_status 的轮询间隔（秒），query_task 查到超过 STALE 秒未更新的任务时记录警告日志
+# TASK_EXECUTOR=slurm 时 `manage.py poll_task_status` 必须作为常驻服务运行：任务状态与通知邮件都由它写入
+TASK_STATUS_POLL_INTERVAL = int(os.getenv('TASK_STATUS_POLL_INTERVAL', 5))
+TASK_STATUS_STALE_SECONDS = int(os.getenv('TASK_STATUS_STALE_SECONDS', 60))
+
+# 大文件下载交给前端代理发送：'' 表示由 Django 发送，'x-accel-redirect'（nginx）或 'x-sendfile'（Apache / lighttpd）
+DOWNLOAD_OFFLOAD_HEADER = os.getenv('DOWNLOAD_OFFLOAD_HEADER', '').lower()
+# X-Accel-Redirect 的 internal location 前缀，对应 DOWNLOAD_ZIP_HOME
+DOWNLOAD_ACCEL_PREFIX = os.getenv('DOWNLOAD_ACCEL_PREFIX', '/protected/download_zips/')
+
+# 批量矩阵接口：单次请求的最大子请求数与并发读取线程数
+MATRIX_BATCH_MAX_ITEMS = int(os.getenv('MATRIX_BATCH_MAX_ITEMS', 20))
+MATRIX_BATCH_WORKERS = int(os.getenv('MATRIX_BATCH_WORKERS', 8))
+
+# 跨数据集基因查询：拷贝数不低于 / 不高于该值时计为扩增 / 缺失
+GENE_CNA_AMP_THRESHOLD = float(os.getenv('GENE_CNA_AMP_THRESHOLD', 2.5))
+GENE_CNA_DEL_THRESHOLD = float(os.getenv('GENE_CNA_DEL_THRESHOLD', 1.5))
+
+# 任务查找缓存：uuid -> 任务类型（已结束的任务缓存整条记录）的有效期（秒）与最大条目数
+TASK_LOOKUP_CACHE_TTL = int(os.getenv('TASK_LOOKUP_CACHE_TTL', 300))
+TASK_LOOKUP_CACHE_SIZE = int(os.getenv('TASK_LOOKUP_CACHE_SIZE', 10000))
+
+# 任务执行器：slurm 通过 sbatch 提交；local 在本机运行，用于没有 Slurm 的环境
+# TASK_EXECUTOR=local 时 `manage.py run_local_executor` 必须作为常驻服务运行（单实例）：Web 进程只写入任务的 job.json
+TASK_EXECUTOR = os.getenv('TASK_EXECUTOR', 'slurm').lower()
+# 本地执行器：同时运行的任务数、每个任务的 CPU 线程数、内存上限（MB）与运行时间上限（秒）
+LOCAL_EXECUTOR_WORKERS = int(os.getenv('LOCAL_EXECUTOR_WORKERS', 2))
+LOCAL_EXECUTOR_CPUS = int(os.getenv('LOCAL_EXECUTOR_CPUS', 4))
+LOCAL_EXECUTOR_MEMORY_MB = int(os.getenv('LOCAL_EXECUTOR_MEMORY_MB', 23 * 1024))
+LOCAL_EXECUTOR_TIMEOUT = int(os.getenv('LOCAL_EXECUTOR_TIMEOUT', 30 * 60))
+# 本地执行器心跳间隔（秒）：运行中的任务按此间隔刷新状态时间，超过 3 倍未刷新视为所属进程已退出
+LOCAL_EXECUTOR_HEARTBEAT = int(os.getenv('LOCAL_EXECUTOR_HEARTBEAT', 30))
+# run_local_executor 检查新提交任务的间隔（秒）
+LOCAL_EXECUTOR_POLL_INTERVAL = int(os.getenv('LOCAL_EXECUTOR_POLL_INTERVAL', 2))
+
+# 输入文件与参数完全相同的任务直接复用已成功任务的输出，不再重新运行
+TASK_RESULT_REUSE = os.getenv('TASK_RESULT_REUSE', 'true').lower() == 'true'
+
+# 任务通知邮件：任务结束时写入 EmailOutbox，由 send_task_emails 进程复用一个 SMTP 连接发送
+# 任务脚本不再自行发送邮件，`manage.py send_task_emails` 必须作为常驻服务运行（只运行一个实例）
+EMAIL_SMTP_HOST = os.getenv('EMAIL_SMTP_HOST', 'smtp.gmail.com')
+EMAIL_SMTP_PORT = int(os.getenv('EMAIL_SMTP_PORT', 587))
+EMAIL_SMTP_STARTTLS = os.getenv('EMAIL_SMTP_STARTTLS', 'true').lower() == 'true'
+EMAIL_SMTP_USER = os.getenv('GMAIL_USER', '')
+EMAIL_SMTP_PASSWORD = os.getenv('GMAIL_APP_PASSWORD', '')
+EMAIL_FROM = os.getenv('EMAIL_FROM', EMAIL_SMTP_USER) or 'cnascope@localhost'
+# 每批最多发送的邮件数、每分钟最多发送数、最多尝试次数与首次重试间隔（秒，之后逐次翻倍）
+EMAIL_OUTBOX_BATCH_SIZE = int(os.getenv('EMAIL_OUTBOX_BATCH_SIZE', 50))
+EMAIL_OUTBOX_RATE_LIMIT = int(os.getenv('EMAIL_OUTBOX_RATE_LIMIT', 60))
+EMAIL_OUTBOX_MAX_ATTEMPTS = int(os.getenv('EMAIL_OUTBOX_MAX_ATTEMPTS', 5))
+EMAIL_OUTBOX_RETRY_BASE = int(os.getenv('EMAIL_OUTBOX_RETRY_BASE', 60))
+EMAIL_OUTBOX_POLL_INTERVAL = int(os.getenv('EMAIL_OUTBOX_POLL_INTERVAL', 5))
+
+# 作业离开 squeue 后等待 status.txt 写出的宽限期（秒），超过后任务记为失败
+TASK_MISSING_GRACE_SECONDS = int(os.getenv('TASK_MISSING_GRACE_SECONDS', 300))
+
+# 任务结果的基因复发分页接口允许的最大 page_size
+RECURRENCE_MAX_PAGE_SIZE = int(os.getenv('RECURRENCE_MAX_PAGE_SIZE', 100))
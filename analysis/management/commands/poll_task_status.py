@@ -0,0 +1,34 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analysis.utils import task_utils
+
+
+class Command(BaseCommand):
+    help = (
+        'Poll Slurm once per interval and store the status of all unfinished analysis tasks. '
+        'Required as a long-running service with TASK_EXECUTOR=slurm: it records finished tasks and queues their notification emails.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=settings.TASK_STATUS_POLL_INTERVAL, help='Seconds between polls.')
+        parser.add_argument('--once', action='store_true', help='Poll a single time and exit.')
+
+    def handle(self, *args, **options):
+        while True:
+            try:
+                updated = task_utils.poll_task_status()
+            except Exception as e:
+                self.stderr.write(f'Failed to poll task status: {e}')
+            else:
+                if updated is None:
+                    self.stderr.write('Failed to execute squeue.')
+                elif options['verbosity'] > 1:
+                    self.stdout.write(f'{updated} tasks updated')
+
+            if options['once']:
+                break
+
+            time.sleep(options['interval'])
@@ -0,0 +1,32 @@
+import signal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from analysis import task_executor
+
+
+class Command(BaseCommand):
+    help = (
+        'Run analysis tasks submitted with TASK_EXECUTOR=local. '
+        'Required as a long-running service (one instance): web workers only write the job file of each task. '
+        'On SIGTERM/SIGINT running scripts are stopped and their tasks are queued again for the next start.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=settings.LOCAL_EXECUTOR_POLL_INTERVAL, help='Seconds between checks for new tasks.')
+
+    def handle(self, *args, **options):
+        executor = task_executor.get_executor()
+
+        if not isinstance(executor, task_executor.LocalExecutor):
+            raise CommandError('TASK_EXECUTOR is not "local".')
+
+        def stop(signum, frame):
+            self.stderr.write('Stopping local executor...')
+            executor.stop()
+
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+
+        executor.run(options['interval'])
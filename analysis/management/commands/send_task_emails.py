@@ -0,0 +1,43 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from analysis.utils import outbox_utils
+
+
+class Command(BaseCommand):
+    help = (
+        'Deliver queued task notification emails over a single reused SMTP connection. '
+        'Required as a long-running service (one instance): task scripts no longer send email themselves.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=int, default=settings.EMAIL_OUTBOX_POLL_INTERVAL, help='Seconds between outbox checks.')
+        parser.add_argument('--once', action='store_true', help='Deliver a single batch and exit.')
+
+    def handle(self, *args, **options):
+        sender = outbox_utils.get_smtp_sender()
+
+        try:
+            while True:
+                try:
+                    sent, failed = outbox_utils.deliver_pending_emails(sender)
+                except Exception as e:
+                    self.stderr.write(f'Failed to deliver emails: {e}')
+                    sent = failed = 0
+                else:
+                    if failed:
+                        self.stderr.write(f'{failed} emails failed')
+                    if sent and options['verbosity'] > 1:
+                        self.stdout.write(f'{sent} emails sent')
+
+                if options['once']:
+                    break
+
+                # 队列为空时断开连接，避免空闲连接被服务器关闭
+                if not sent and not failed:
+                    sender.close()
+                    time.sleep(options['interval'])
+        finally:
+            sender.close()
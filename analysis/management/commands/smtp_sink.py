@@ -0,0 +1,88 @@
+import socketserver
+
+from django.core.management.base import BaseCommand
+
+
+class SMTPSinkHandler(socketserver.StreamRequestHandler):
+    """
+    只实现发送邮件所需的 SMTP 命令，收到的邮件打印到 stdout，不做转发。
+    保留域名 .invalid 下的收件人会被拒绝（550），用于测试永久失败。
+    """
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        self.reply('220 smtp-sink ready')
+        mail_from, rcpt_to = None, []
+
+        while True:
+            line = self.rfile.readline()
+
+            if not line:
+                return
+
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+
+            if verb in ('HELO', 'EHLO'):
+                self.reply('250 smtp-sink')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command[10:].strip(), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                recipient = command[8:].strip()
+
+                if recipient.rstrip('>').lower().endswith('.invalid'):
+                    self.reply('550 No such user')
+                else:
+                    rcpt_to.append(recipient)
+                    self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                data = []
+
+                for data_line in self.rfile:
+                    if data_line.rstrip(b'\r\n') == b'.':
+                        break
+                    data.append(data_line.decode('utf-8', 'replace'))
+
+                self.server.deliver(mail_from, rcpt_to, ''.join(data))
+                self.reply('250 OK')
+            elif verb in ('RSET', 'NOOP'):
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class SMTPSinkServer(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, address, write):
+        super().__init__(address, SMTPSinkHandler)
+        self.write = write
+
+    def deliver(self, mail_from, rcpt_to, data):
+        self.write(f'---------- from {mail_from} to {", ".join(rcpt_to)}\n{data}')
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP server that prints received messages instead of delivering them (for testing send_task_emails).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1', help='Address to listen on.')
+        parser.add_argument('--port', type=int, default=1025, help='Port to listen on.')
+
+    def handle(self, *args, **options):
+        server = SMTPSinkServer((options['host'], options['port']), self.stdout.write)
+        self.stdout.write(f'SMTP sink listening on {options["host"]}:{options["port"]}')
+
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -0,0 +1,30 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("analysis", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="basicannotationtask",
+            name="queue_position",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="basicannotationtask",
+            name="status_update_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="recurrentcnatask",
+            name="queue_position",
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="recurrentcnatask",
+            name="status_update_time",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:59
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0004_email_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basicannotationtask',
+            name='missing_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurrentcnatask',
+            name='missing_since',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
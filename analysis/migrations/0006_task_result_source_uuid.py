@@ -0,0 +1,23 @@
+# Generated by Django 4.2.23 on 2026-10-18 09:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('analysis', '0005_task_missing_since'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='basicannotationtask',
+            name='result_source_uuid',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='recurrentcnatask',
+            name='result_source_uuid',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+    ]
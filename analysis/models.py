@@ -41,6 +41,14 @@ class BasicAnnotationTask(models.Model):
     window_type = models.CharField(choices=WindowType.choices, default=WindowType.bin)
     value_type = models.CharField(choices=ValueType.choices, default=ValueType.int)
     email = models.EmailField(max_length=254, blank=True, null=True)
+    queue_position = models.IntegerField(blank=True, null=True)
+    status_update_time = models.DateTimeField(auto_now=False, auto_now_add=False, null=True, blank=True)
+    # 作业已离开 squeue 但尚未写出 status.txt 的起始时间，超过宽限期后任务记为失败
+    missing_since = models.DateTimeField(auto_now=False, auto_now_add=False, null=True, blank=True)
+    # 输入文件与参数的 SHA-256，相同的任务复用已成功任务的输出
+    input_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # 复用输出时记录输出的来源任务；复用的输出文件名与内容中的 uuid 已替换为本任务的 uuid
+    result_source_uuid = models.UUIDField(blank=True, null=True)
 
 class RecurrentCNATask(models.Model):
     class Status(models.TextChoices):
@@ -75,4 +83,33 @@ class RecurrentCNATask(models.Model):
     obs_type = models.CharField(choices=ObsType.choices, default=ObsType.bulk)
     value_type = models.CharField(choices=ValueType.choices, default=ValueType.int)
     email = models.EmailField(max_length=254, blank=True, null=True)
+    queue_position = models.IntegerField(blank=True, null=True)
+    status_update_time = models.DateTimeField(auto_now=False, auto_now_add=False, null=True, blank=True)
+    # 作业已离开 squeue 但尚未写出 status.txt 的起始时间，超过宽限期后任务记为失败
+    missing_since = models.DateTimeField(auto_now=False, auto_now_add=False, null=True, blank=True)
+    # 输入文件与参数的 SHA-256，相同的任务复用已成功任务的输出
+    input_hash = models.CharField(max_length=64, blank=True, null=True, db_index=True)
+    # 复用输出时记录输出的来源任务；复用的输出文件名与内容中的 uuid 已替换为本任务的 uuid
+    result_source_uuid = models.UUIDField(blank=True, null=True)
     # input_file = models.FileField(upload_to=get_input_file_path, null=True, blank=True)
+
+class EmailOutbox(models.Model):
+    class Status(models.TextChoices):
+        Pending = 'P', 'Pending',
+        Sent = 'S', 'Sent',
+        Failed = 'F', 'Failed',
+
+    # 每个任务只发送一封结束通知
+    task_uuid = models.UUIDField(unique=True)
+    email = models.EmailField(max_length=254)
+    subject = models.CharField(max_length=300)
+    body = models.TextField()
+    status = models.CharField(max_length=1, choices=Status.choices, default=Status.Pending)
+    attempts = models.IntegerField(default=0)
+    last_error = models.TextField(blank=True, null=True)
+    create_time = models.DateTimeField(auto_now=False, auto_now_add=False)
+    next_attempt_time = models.DateTimeField(auto_now=False, auto_now_add=False)
+    sent_time = models.DateTimeField(auto_now=False, auto_now_add=False, null=True, blank=True)
+
+    class Meta:
+        indexes = [models.Index(fields=['status', 'next_attempt_time'])]
@@ -5,7 +5,7 @@ class BasicAnnotationTaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = BasicAnnotationTask
         fields = '__all__'
-        read_only_fields = ['uuid', 'status', 'create_time', 'finish_time']  # 这些字段由系统自动设置
+        read_only_fields = ['uuid', 'status', 'create_time', 'finish_time', 'queue_position', 'status_update_time']  # 这些字段由系统自动设置
     
     def validate_ref(self, value):
         """验证参考基因组字段"""
@@ -47,7 +47,7 @@ class RecurrentCNATaskSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecurrentCNATask
         fields = '__all__'
-        read_only_fields = ['uuid', 'status', 'create_time', 'finish_time']  # 这些字段由系统自动设置
+        read_only_fields = ['uuid', 'status', 'create_time', 'finish_time', 'queue_position', 'status_update_time']  # 这些字段由系统自动设置
     
     def validate_ref(self, value):
         """验证参考基因组字段"""
@@ -5,14 +5,9 @@ from django.conf import settings
 
 seperator = '/'
 
-def sbatch_basic_annotation_task(uuid):
-    task = BasicAnnotationTask.objects.get(uuid=uuid)
-    output_dir = task.get_output_dir_absolute_path()
-    command = [
-        "sbatch",
-        f"--job-name={str(uuid).replace('-', '_')}",
-        f"--output={output_dir}{seperator}Pipeline.out",
-        f"--error={output_dir}{seperator}Pipeline.err",
+def get_basic_annotation_command(task):
+    # 任务脚本及参数，Slurm 与本地执行器共用
+    return [
         f"{settings.SLURM_SCRIPT_HOME}{seperator}run_basic_cna_anno.sh",
         str(task.uuid),
         task.get_input_file_absolute_path(),
@@ -23,6 +18,29 @@ def sbatch_basic_annotation_task(uuid):
         str(task.email),
     ]
 
+
+def get_recurrent_cna_command(task, input_files):
+    return [
+        f"{settings.SLURM_SCRIPT_HOME}{seperator}run_recurrent_cna_task.sh",
+        str(task.uuid),
+        input_files,
+        task.ref,
+        task.obs_type,
+        str(task.email),
+    ]
+
+
+def sbatch_basic_annotation_task(uuid):
+    task = BasicAnnotationTask.objects.get(uuid=uuid)
+    output_dir = task.get_output_dir_absolute_path()
+    command = [
+        "sbatch",
+        f"--job-name={str(uuid).replace('-', '_')}",
+        f"--output={output_dir}{seperator}Pipeline.out",
+        f"--error={output_dir}{seperator}Pipeline.err",
+        *get_basic_annotation_command(task),
+    ]
+
     result = subprocess.run(command, capture_output=True, text=True)
 
     if result.returncode == 0:
@@ -39,12 +57,7 @@ def sbatch_recurrent_cna_task(uuid, input_files):
         f"--job-name={str(uuid).replace('-', '_')}",
         f"--output={output_dir}{seperator}Pipeline.out",
         f"--error={output_dir}{seperator}Pipeline.err",
-        f"{settings.SLURM_SCRIPT_HOME}{seperator}run_recurrent_cna_task.sh",
-        str(task.uuid),
-        input_files,
-        task.ref,
-        task.obs_type,
-        str(task.email),
+        *get_recurrent_cna_command(task, input_files),
     ]
 
     result = subprocess.run(command, capture_output=True, text=True)
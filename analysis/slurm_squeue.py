@@ -16,3 +16,41 @@ def squeue_by_job_name(uuid):
         return result.stdout.strip()
     else:
         return False
+
+
+def squeue_all_jobs():
+    """
+    一次 squeue 调用获取队列中的全部任务（包括刚结束、仍保留在 slurmctld 中的作业），返回 {job_name: 状态}。
+    PD 状态附带排队位置（"PD 3"），与 task_query.sh 的输出格式一致；squeue 执行失败时返回 None。
+    """
+    command = [
+        "squeue",
+        "--noheader",
+        "--states=all",
+        "--sort=-p,-t",
+        "--format=%i %j %t",
+    ]
+
+    result = subprocess.run(command, capture_output=True, text=True)
+
+    if result.returncode != 0:
+        return None
+
+    jobs = {}
+    pending_count = 0
+
+    for line in result.stdout.splitlines():
+        fields = line.split()
+
+        if len(fields) < 3:
+            continue
+
+        job_name, job_state = fields[1], fields[2]
+
+        if job_state == 'PD':
+            jobs[job_name] = f'PD {pending_count}'
+            pending_count += 1
+        else:
+            jobs[job_name] = job_state
+
+    return jobs
@@ -0,0 +1,410 @@
+import os
+import json
+import time
+import queue
+import logging
+import itertools
+import threading
+import subprocess
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+
+from database.utils import path_utils
+
+from .models import BasicAnnotationTask, RecurrentCNATask
+from .utils import dedup_utils, outbox_utils
+from .slurm_sbatch import (
+    sbatch_basic_annotation_task, sbatch_recurrent_cna_task, get_basic_annotation_command, get_recurrent_cna_command
+)
+
+logger = logging.getLogger(__name__)
+
+# 本地执行时限制计算库线程数的环境变量
+thread_env_names = ['OMP_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'MKL_NUM_THREADS', 'NUMEXPR_NUM_THREADS']
+
+local_task_models = [BasicAnnotationTask, RecurrentCNATask]
+
+# 本地任务的脚本与参数，进程重启后据此恢复排队中的任务
+JOB_FILE_NAME = 'job.json'
+
+
+class SlurmExecutor:
+    """
+    通过 sbatch 提交任务，状态由 poll_task_status 调用 squeue 获取。
+    """
+    polls_status = True
+
+    def submit_basic_annotation_task(self, uuid, priority=0):
+        return sbatch_basic_annotation_task(uuid)
+
+    def submit_recurrent_cna_task(self, uuid, input_files, priority=0):
+        return sbatch_recurrent_cna_task(uuid, input_files)
+
+
+class LocalJob:
+    def __init__(self, model, uuid, command, priority=0):
+        self.model = model
+        self.uuid = uuid
+        self.command = command
+        self.priority = priority
+
+    @staticmethod
+    def get_job_file_path(uuid):
+        return os.path.join(settings.WORKSPACE_HOME, str(uuid), JOB_FILE_NAME)
+
+    def save(self):
+        job_file_path = self.get_job_file_path(self.uuid)
+        tmp_path = path_utils.make_temp_path(job_file_path)
+
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'command': self.command, 'priority': self.priority}, f)
+
+            os.replace(tmp_path, job_file_path)
+        except BaseException:
+            path_utils.remove_temp_path(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, model, uuid):
+        # 不是本地执行器提交的任务（没有 job.json）返回 None
+        try:
+            with open(cls.get_job_file_path(uuid), 'r') as f:
+                data = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+        return cls(model, uuid, data['command'], data.get('priority', 0))
+
+
+class LocalExecutor:
+    """
+    在本机运行任务脚本，不经过 Slurm。
+
+    Web 进程中 submit 只写入 job.json；任务由单独的 `manage.py run_local_executor` 服务（单实例）执行，
+    同时运行的任务数不随 Web 进程数增加，任务脚本也不是 Web 进程的子进程。
+
+    服务每 poll_interval 秒把带 job.json 的 Pending 任务加入优先级队列（priority 越小越先执行，同优先级先到先得），
+    最多 workers 个任务同时运行；每个任务限制 CPU 线程数、虚拟内存和运行时间，开始、结束时直接把状态写入数据库。
+
+    数据库是任务状态的唯一依据：执行前以 Pending -> Running 的条件更新认领任务，同一任务只会被执行一次；
+    运行中的任务每 heartbeat 秒刷新 status_update_time。服务正常停止时结束运行中的脚本并把任务放回 Pending，
+    重启后重新执行；心跳超时（服务异常退出）的 Running 任务标记为失败。
+    """
+    polls_status = False
+
+    def __init__(self, workers, cpus, memory_mb, timeout, heartbeat):
+        self.workers = workers
+        self.cpus = cpus
+        self.memory_mb = memory_mb
+        self.timeout = timeout
+        self.heartbeat = heartbeat
+        self._queue = queue.PriorityQueue()
+        self._counter = itertools.count()
+        self._pending = []
+        self._queued = set()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._processes = {}
+        self._positions = {}
+        self._stopping = threading.Event()
+
+    def submit(self, job):
+        # 由 run_local_executor 服务在下一次检查时加入队列
+        job.save()
+
+        return True
+
+    def run(self, poll_interval):
+        """
+        启动 workers 个执行线程，并每 poll_interval 秒加入新提交的任务，直到 stop() 被调用。
+        """
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._run_worker, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+        while not self._stopping.is_set():
+            self._recover_jobs()
+            self._stopping.wait(poll_interval)
+
+        for thread in self._threads:
+            thread.join()
+
+    def stop(self):
+        # 结束运行中的脚本，对应的任务由执行线程放回 Pending
+        self._stopping.set()
+
+        with self._lock:
+            processes = list(self._processes.values())
+
+        for process in processes:
+            try:
+                os.killpg(process.pid, 15)
+            except ProcessLookupError:
+                pass
+
+    def submit_basic_annotation_task(self, uuid, priority=0):
+        task = BasicAnnotationTask.objects.get(uuid=uuid)
+
+        return self.submit(LocalJob(BasicAnnotationTask, task.uuid, get_basic_annotation_command(task), priority))
+
+    def submit_recurrent_cna_task(self, uuid, input_files, priority=0):
+        task = RecurrentCNATask.objects.get(uuid=uuid)
+
+        return self.submit(LocalJob(RecurrentCNATask, task.uuid, get_recurrent_cna_command(task, input_files), priority))
+
+    def _enqueue(self, job):
+        with self._lock:
+            # 本进程已在排队或运行的任务不重复加入
+            if str(job.uuid) in self._queued:
+                return False
+
+            item = (job.priority, next(self._counter), job)
+            self._queued.add(str(job.uuid))
+            self._pending.append(item)
+            self._pending.sort()
+
+        self._queue.put(item)
+
+        return True
+
+    def _update_queue_positions(self):
+        # 与 squeue 一致，排队位置从 0 开始；只写入变化的位置
+        with self._lock:
+            positions = [(item[2], position) for position, item in enumerate(self._pending)]
+
+        now = timezone.now()
+        current = {}
+
+        for job, position in positions:
+            current[str(job.uuid)] = position
+
+            if self._positions.get(str(job.uuid)) != position:
+                job.model.objects.filter(pk=job.uuid, status=job.model.Status.Pending).update(
+                    queue_position=position, status_update_time=now
+                )
+
+        self._positions = current
+
+    def _recover_jobs(self):
+        try:
+            close_old_connections()
+            stale_before = timezone.now() - timedelta(seconds=self.heartbeat * 3)
+
+            for model in local_task_models:
+                for uuid in model.objects.filter(status=model.Status.Pending).values_list('pk', flat=True):
+                    with self._lock:
+                        if str(uuid) in self._queued:
+                            continue
+
+                    job = LocalJob.load(model, uuid)
+
+                    if job is not None:
+                        self._enqueue(job)
+
+                orphaned = model.objects.filter(status=model.Status.Running).filter(
+                    Q(status_update_time__lt=stale_before) | Q(status_update_time__isnull=True)
+                )
+
+                for task in orphaned:
+                    with self._lock:
+                        if str(task.uuid) in self._queued:
+                            continue
+
+                    if os.path.exists(LocalJob.get_job_file_path(task.uuid)):
+                        logger.warning('Local task %s lost its worker process', task.uuid)
+                        self._finish_task(task, None)
+
+            self._update_queue_positions()
+        except Exception:
+            logger.exception('Failed to recover local tasks')
+        finally:
+            close_old_connections()
+
+    def _run_worker(self):
+        while not self._stopping.is_set():
+            try:
+                item = self._queue.get(timeout=1)
+            except queue.Empty:
+                continue
+
+            job = item[2]
+
+            with self._lock:
+                self._pending.remove(item)
+
+            try:
+                self._run_job(job)
+            except Exception:
+                logger.exception('Local task %s failed', job.uuid)
+                self._fail_task(job)
+            finally:
+                with self._lock:
+                    self._queued.discard(str(job.uuid))
+
+                close_old_connections()
+                self._queue.task_done()
+
+            self._update_queue_positions()
+
+    def _get_command(self, job):
+        # 在子 shell 中用 ulimit 限制虚拟内存（KB），避免在多线程进程中使用 preexec_fn
+        return ['bash', '-c', 'ulimit -v "$0" && exec bash "$@"', str(self.memory_mb * 1024)] + job.command
+
+    def _run_job(self, job):
+        close_old_connections()
+
+        if self._stopping.is_set():
+            return
+
+        # 认领任务：已被其它进程执行或已结束时跳过
+        claimed = job.model.objects.filter(pk=job.uuid, status=job.model.Status.Pending).update(
+            status=job.model.Status.Running, queue_position=None, status_update_time=timezone.now()
+        )
+
+        if not claimed:
+            return
+
+        task = job.model.objects.get(pk=job.uuid)
+        output_dir = task.get_output_dir_absolute_path()
+        os.makedirs(output_dir, exist_ok=True)
+
+        env = dict(os.environ, **{name: str(self.cpus) for name in thread_env_names})
+        env['SLURM_CPUS_PER_TASK'] = str(self.cpus)
+
+        with open(os.path.join(output_dir, 'Pipeline.out'), 'w') as stdout, \
+                open(os.path.join(output_dir, 'Pipeline.err'), 'w') as stderr:
+            process = subprocess.Popen(
+                self._get_command(job), stdout=stdout, stderr=stderr, env=env, start_new_session=True
+            )
+
+            with self._lock:
+                self._processes[str(job.uuid)] = process
+
+            try:
+                returncode = self._wait(job, process)
+            finally:
+                with self._lock:
+                    self._processes.pop(str(job.uuid), None)
+
+                # 等待过程中出错（如数据库不可用）时不留下孤儿进程
+                if process.poll() is None:
+                    os.killpg(process.pid, 9)
+                    process.wait()
+
+        if self._stopping.is_set():
+            # 服务停止导致脚本被结束，重启后重新执行
+            job.model.objects.filter(pk=job.uuid, status=job.model.Status.Running).update(
+                status=job.model.Status.Pending, status_update_time=timezone.now()
+            )
+            return
+
+        self._finish_task(task, returncode)
+
+    def _wait(self, job, process):
+        # 等待脚本结束，期间定期刷新心跳；超时返回 None
+        deadline = time.monotonic() + self.timeout
+
+        while True:
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                return None
+
+            try:
+                return process.wait(timeout=min(self.heartbeat, remaining))
+            except subprocess.TimeoutExpired:
+                job.model.objects.filter(pk=job.uuid, status=job.model.Status.Running).update(
+                    status_update_time=timezone.now()
+                )
+
+    def _finish_task(self, task, returncode):
+        # task_utils 依赖本模块，在函数内导入
+        from analysis.utils import task_utils
+
+        # 脚本写出的 status.txt 优先，缺失时按退出码判断
+        try:
+            task.finish_time, success = task_utils.read_status_file(task)
+        except (FileNotFoundError, ValueError):
+            task.finish_time, success = timezone.now(), returncode == 0
+
+        task.status = task.Status.Success if success else task.Status.Failed
+        task.queue_position = None
+        task.status_update_time = timezone.now()
+        task.save(update_fields=['status', 'finish_time', 'queue_position', 'status_update_time'])
+        outbox_utils.enqueue_task_notification(task)
+
+    def _fail_task(self, job):
+        try:
+            close_old_connections()
+            task = job.model.objects.get(pk=job.uuid)
+
+            if task.status in [task.Status.Success, task.Status.Failed]:
+                return
+
+            now = timezone.now()
+            task.status = task.Status.Failed
+            task.finish_time = now
+            task.queue_position = None
+            task.status_update_time = now
+            task.save(update_fields=['status', 'finish_time', 'queue_position', 'status_update_time'])
+            outbox_utils.enqueue_task_notification(task)
+        except Exception:
+            logger.exception('Failed to mark local task %s as failed', job.uuid)
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """
+    按 settings.TASK_EXECUTOR 返回任务执行器：slurm（默认）或 local。
+    """
+    global _executor
+
+    with _executor_lock:
+        if _executor is None:
+            if settings.TASK_EXECUTOR == 'local':
+                _executor = LocalExecutor(
+                    settings.LOCAL_EXECUTOR_WORKERS,
+                    settings.LOCAL_EXECUTOR_CPUS,
+                    settings.LOCAL_EXECUTOR_MEMORY_MB,
+                    settings.LOCAL_EXECUTOR_TIMEOUT,
+                    settings.LOCAL_EXECUTOR_HEARTBEAT,
+                )
+            else:
+                _executor = SlurmExecutor()
+
+    return _executor
+
+
+def get_input_priority(*file_paths):
+    # 输入越小越先执行，小任务不必等待大任务
+    return sum(os.path.getsize(path) for path in file_paths if os.path.isfile(path))
+
+
+def submit_basic_annotation_task(uuid):
+    task = BasicAnnotationTask.objects.get(uuid=uuid)
+    task_input = task.get_input_file_absolute_path()
+
+    # 相同输入已有成功结果时直接复用，不再提交
+    if dedup_utils.reuse_task_result(task, [task_input]):
+        return True
+
+    return get_executor().submit_basic_annotation_task(uuid, priority=get_input_priority(task_input))
+
+
+def submit_recurrent_cna_task(uuid, input_files):
+    task = RecurrentCNATask.objects.get(uuid=uuid)
+    input_paths = input_files.split(',')
+
+    if dedup_utils.reuse_task_result(task, input_paths):
+        return True
+
+    return get_executor().submit_recurrent_cna_task(uuid, input_files, priority=get_input_priority(*input_paths))
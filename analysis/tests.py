@@ -1,3 +1,531 @@
-from django.test import TestCase
+import io
+import os
+import csv
+import gzip
+import shutil
+import uuid
+import socket
+import hashlib
+import tempfile
+import threading
+from datetime import timedelta
+from unittest import mock
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from analysis.models import BasicAnnotationTask, RecurrentCNATask, EmailOutbox
+from analysis import task_executor
+from analysis.utils import task_utils, upload_utils, dedup_utils, email_utils, outbox_utils
+from analysis.management.commands.smtp_sink import SMTPSinkServer
+
+
+class WorkspaceTestCase(TestCase):
+    """
+    每个测试使用独立的临时 WORKSPACE_HOME。
+    """
+
+    def setUp(self):
+        self.workspace = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.workspace, ignore_errors=True)
+
+        override = override_settings(WORKSPACE_HOME=self.workspace)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def create_task(self, model=BasicAnnotationTask, **fields):
+        fields.setdefault('create_time', timezone.now())
+        fields.setdefault('email', 'user@example.org')
+        task = model.objects.create(**fields)
+
+        os.makedirs(os.path.join(self.workspace, str(task.uuid), 'input'))
+        os.makedirs(task.get_output_dir_absolute_path())
+
+        return task
+
+    def write_status_file(self, task, raw_status):
+        with open(os.path.join(task.get_output_dir_absolute_path(), 'status.txt'), 'w') as f:
+            f.write(f'2026-01-01 12:00:00\n{raw_status}\n')
+
+
+@override_settings(TASK_MISSING_GRACE_SECONDS=300)
+class ApplyJobStatusTests(WorkspaceTestCase):
+    def test_pending_and_running(self):
+        task = self.create_task()
+        now = timezone.now()
+
+        task_utils.apply_job_status(task, 'PD 3', now)
+        self.assertEqual(task.status, task.Status.Pending)
+        self.assertEqual(task.queue_position, 3)
+
+        task_utils.apply_job_status(task, 'R', now)
+        self.assertEqual(task.status, task.Status.Running)
+        self.assertIsNone(task.queue_position)
+        self.assertEqual(task.status_update_time, now)
+
+    def test_completed_job_uses_status_file(self):
+        task = self.create_task(status=BasicAnnotationTask.Status.Running)
+        self.write_status_file(task, 'failed')
+
+        task_utils.apply_job_status(task, 'CD', timezone.now())
+
+        self.assertEqual(task.status, task.Status.Failed)
+        self.assertEqual(task.finish_time.year, 2026)
+
+    def test_missing_job_waits_for_status_file_within_grace_period(self):
+        task = self.create_task(status=BasicAnnotationTask.Status.Running)
+        now = timezone.now()
+
+        task_utils.apply_job_status(task, None, now)
+        self.assertEqual(task.status, task.Status.Running)
+        self.assertEqual(task.missing_since, now)
+
+        # 宽限期内写出了 status.txt
+        self.write_status_file(task, 'success')
+        task_utils.apply_job_status(task, None, now + timedelta(seconds=60))
+        self.assertEqual(task.status, task.Status.Success)
+        self.assertIsNone(task.missing_since)
+
+    def test_missing_job_fails_after_grace_period(self):
+        task = self.create_task(status=BasicAnnotationTask.Status.Running)
+        now = timezone.now()
+
+        task_utils.apply_job_status(task, None, now)
+        task_utils.apply_job_status(task, None, now + timedelta(seconds=301))
+
+        self.assertEqual(task.status, task.Status.Failed)
+        self.assertIsNone(task.missing_since)
+
+    def test_failed_job_without_status_file_fails_immediately(self):
+        for job_status in ['TO', 'OOM', 'CA']:
+            task = self.create_task(status=BasicAnnotationTask.Status.Running)
+            task_utils.apply_job_status(task, job_status, timezone.now())
+
+            self.assertEqual(task.status, task.Status.Failed, job_status)
+
+    def test_job_back_in_queue_clears_missing_since(self):
+        task = self.create_task(status=BasicAnnotationTask.Status.Running)
+        now = timezone.now()
+
+        task_utils.apply_job_status(task, None, now)
+        task_utils.apply_job_status(task, 'R', now + timedelta(seconds=10))
+
+        self.assertIsNone(task.missing_since)
+        self.assertEqual(task.status, task.Status.Running)
+
+
+class FindTaskTests(WorkspaceTestCase):
+    def setUp(self):
+        super().setUp()
+        task_utils.task_lookup_cache._entries.clear()
+
+    def test_find_task_in_either_table(self):
+        basic = self.create_task(BasicAnnotationTask, k=7)
+        recurrent = self.create_task(RecurrentCNATask)
+
+        found = task_utils.find_task(basic.uuid)
+        self.assertIsInstance(found, BasicAnnotationTask)
+        self.assertEqual(found.k, 7)
+        self.assertEqual(found.email, basic.email)
+
+        found = task_utils.find_task(recurrent.uuid)
+        self.assertIsInstance(found, RecurrentCNATask)
+        self.assertEqual(found.uuid, recurrent.uuid)
+
+    def test_unknown_or_invalid_uuid(self):
+        self.assertIsNone(task_utils.find_task('00000000-0000-0000-0000-000000000000'))
+        self.assertIsNone(task_utils.get_task('00000000-0000-0000-0000-000000000000'))
+        self.assertIsNone(task_utils.get_task('not-a-uuid'))
+
+    def test_get_task_reloads_unfinished_tasks(self):
+        task = self.create_task(RecurrentCNATask)
+        self.assertEqual(task_utils.get_task(task.uuid).status, task.Status.Pending)
+
+        RecurrentCNATask.objects.filter(pk=task.pk).update(status=task.Status.Running)
+        self.assertEqual(task_utils.get_task(task.uuid).status, task.Status.Running)
+
+    def test_get_task_caches_finished_tasks(self):
+        task = self.create_task(status=BasicAnnotationTask.Status.Success)
+        self.assertEqual(task_utils.get_task(str(task.uuid).upper()).status, task.Status.Success)
+
+        with self.assertNumQueries(0):
+            cached = task_utils.get_task(task.uuid)
+
+        self.assertEqual(cached.status, task.Status.Success)
+
+        # 返回的是副本，修改不影响缓存
+        cached.status = task.Status.Failed
+        self.assertEqual(task_utils.get_task(task.uuid).status, task.Status.Success)
+
+
+class UploadValidatorTests(TestCase):
+    def split(self, data, size):
+        return [data[i:i + size] for i in range(0, len(data), size)]
+
+    def test_lines_split_across_chunks(self):
+        text = 'id,a\r\nx,é\ry,2\n\nz,3'
+        expected = io.StringIO(text, newline='').readlines()
+
+        for size in range(1, 8):
+            chunks = self.split(text.encode('utf-8'), size)
+            self.assertEqual(list(upload_utils.iter_text_lines(chunks)), expected, size)
+
+    def test_valid_csv(self):
+        data = b'id,a,b\nx,1,2\n\ny,"3,4",5\n'
+        destination = io.BytesIO()
+
+        self.assertEqual(upload_utils.validate_csv_chunks(self.split(data, 3), destination), 4)
+        self.assertEqual(destination.getvalue(), data)
+
+    def test_column_mismatch(self):
+        with self.assertRaises(csv.Error):
+            upload_utils.validate_csv_chunks([b'id,a\nx,1,2\n'])
+
+    def test_row_limit(self):
+        with self.assertRaises(upload_utils.RowLimitExceeded):
+            upload_utils.validate_csv_chunks([b'id\n1\n2\n3\n'], max_rows=3)
+
+    def test_invalid_utf8(self):
+        with self.assertRaises(UnicodeDecodeError):
+            upload_utils.validate_csv_chunks([b'id\n\xff\n'])
+
+    def test_line_too_long(self):
+        with self.assertRaises(csv.Error):
+            list(upload_utils.iter_text_lines([b'a' * 10] * 10, max_line_length=50))
+
+    def test_failed_validation_removes_file(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, ignore_errors=True)
+        file_path = os.path.join(directory, 'cna.csv')
+
+        with self.assertRaises(csv.Error):
+            upload_utils.save_validated_csv([b'id,a\n', b'x\n'], file_path)
+
+        self.assertFalse(os.path.exists(file_path))
+
+        self.assertEqual(upload_utils.save_validated_csv([b'id,a\n', b'x,1\n'], file_path), 2)
+        self.assertTrue(os.path.exists(file_path))
+
+
+class LocalExecutorTests(WorkspaceTestCase):
+    def setUp(self):
+        super().setUp()
+        self.executor = task_executor.LocalExecutor(1, 1, 1024, 10, 1)
+
+    def create_job(self, script, status=BasicAnnotationTask.Status.Pending):
+        task = self.create_task(status=status)
+        script_path = os.path.join(self.workspace, f'{task.uuid}.sh')
+
+        with open(script_path, 'w') as f:
+            f.write(script.replace('$OUT', task.get_output_dir_absolute_path()))
+
+        job = task_executor.LocalJob(BasicAnnotationTask, task.uuid, [script_path])
+        job.save()
+
+        return task, job
+
+    def test_submit_only_writes_job_file(self):
+        task, _ = self.create_job('exit 0')
+        os.remove(task_executor.LocalJob.get_job_file_path(task.uuid))
+
+        self.executor.submit(task_executor.LocalJob(BasicAnnotationTask, task.uuid, ['run.sh'], 5))
+
+        job = task_executor.LocalJob.load(BasicAnnotationTask, task.uuid)
+        self.assertEqual((job.command, job.priority), (['run.sh'], 5))
+        task.refresh_from_db()
+        self.assertEqual(task.status, task.Status.Pending)
+
+    def test_status_file_decides_result(self):
+        task, job = self.create_job('printf "2026-01-01 12:00:00\\nsuccess\\n" > $OUT/status.txt; exit 1')
+
+        self.executor._run_job(job)
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, task.Status.Success)
+        self.assertIsNone(task.queue_position)
+        self.assertTrue(EmailOutbox.objects.filter(task_uuid=task.uuid).exists())
+
+    def test_exit_code_without_status_file(self):
+        task, job = self.create_job('echo done; exit 3')
+
+        self.executor._run_job(job)
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, task.Status.Failed)
+
+        with open(os.path.join(task.get_output_dir_absolute_path(), 'Pipeline.out')) as f:
+            self.assertEqual(f.read(), 'done\n')
+
+    def test_timeout_fails_task(self):
+        self.executor.timeout = 1
+        task, job = self.create_job('sleep 30')
+
+        self.executor._run_job(job)
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, task.Status.Failed)
+
+    def test_claimed_task_is_not_run_twice(self):
+        task, job = self.create_job('printf "2026-01-01 12:00:00\\nsuccess\\n" > $OUT/status.txt')
+        BasicAnnotationTask.objects.filter(pk=task.pk).update(status=task.Status.Running)
+
+        self.executor._run_job(job)
+
+        task.refresh_from_db()
+        self.assertEqual(task.status, task.Status.Running)
+        self.assertFalse(os.path.exists(os.path.join(task.get_output_dir_absolute_path(), 'Pipeline.out')))
+
+    def test_recover_queues_pending_tasks_with_job_file(self):
+        local_task, _ = self.create_job('exit 0')
+        slurm_task = self.create_task()
+
+        self.executor._recover_jobs()
+
+        self.assertEqual(self.executor._queued, {str(local_task.uuid)})
+        local_task.refresh_from_db()
+        self.assertEqual(local_task.queue_position, 0)
+
+        # 已在队列中的任务不重复加入
+        self.executor._recover_jobs()
+        self.assertEqual(self.executor._queue.qsize(), 1)
+
+        slurm_task.refresh_from_db()
+        self.assertIsNone(slurm_task.queue_position)
+
+    def test_recover_fails_orphaned_running_tasks(self):
+        stale = timezone.now() - timedelta(minutes=5)
+        orphan, _ = self.create_job('exit 0', status=BasicAnnotationTask.Status.Running)
+        alive, _ = self.create_job('exit 0', status=BasicAnnotationTask.Status.Running)
+        slurm_task = self.create_task(status=BasicAnnotationTask.Status.Running, status_update_time=stale)
+
+        BasicAnnotationTask.objects.filter(pk=orphan.pk).update(status_update_time=stale)
+        BasicAnnotationTask.objects.filter(pk=alive.pk).update(status_update_time=timezone.now())
+
+        self.executor._recover_jobs()
+
+        for task in (orphan, alive, slurm_task):
+            task.refresh_from_db()
+
+        self.assertEqual(orphan.status, orphan.Status.Failed)
+        self.assertTrue(EmailOutbox.objects.filter(task_uuid=orphan.uuid).exists())
+        self.assertEqual(alive.status, alive.Status.Running)
+        self.assertEqual(slurm_task.status, slurm_task.Status.Running)
+
+    def test_stop_returns_running_task_to_pending(self):
+        task, job = self.create_job('sleep 30')
+
+        # stop() 只结束进程，不访问数据库，可以在其它线程中调用
+        timer = threading.Timer(0.5, self.executor.stop)
+        timer.start()
+        self.addCleanup(timer.cancel)
+
+        self.executor._run_job(job)
+
+        self.assertTrue(os.path.exists(os.path.join(task.get_output_dir_absolute_path(), 'Pipeline.out')))
+        task.refresh_from_db()
+        self.assertEqual(task.status, task.Status.Pending)
+        self.assertFalse(EmailOutbox.objects.filter(task_uuid=task.uuid).exists())
+
+
+@override_settings(TASK_RESULT_REUSE=True)
+class ResultReuseTests(WorkspaceTestCase):
+    def write(self, path, content, opener=open):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        with opener(path, 'wb') as f:
+            f.write(content)
+
+    def read(self, path, opener=open):
+        with opener(path, 'rb') as f:
+            return f.read()
+
+    def test_stream_replace_across_chunks(self):
+        old, new = b'0123456789', b'abcdefghij'
+        data = b'x' * (dedup_utils.HASH_CHUNK_SIZE - 4) + old + b'y' + old
+        output = io.BytesIO()
+
+        dedup_utils.stream_replace(io.BytesIO(data), output, [(old, new)])
+
+        self.assertEqual(output.getvalue(), data.replace(old, new))
+
+    def test_reused_outputs_carry_the_new_uuid(self):
+        source = self.create_task(RecurrentCNATask, status=RecurrentCNATask.Status.Success, input_hash='h')
+        target = self.create_task(RecurrentCNATask, input_hash='h')
+        source_dir = source.get_output_dir_absolute_path()
+        target_dir = target.get_output_dir_absolute_path()
+        old, new = str(source.uuid), str(target.uuid)
+        old_job, new_job = old.replace('-', '_'), new.replace('-', '_')
+
+        self.write(os.path.join(source_dir, f'{old}_recurrent.json'), f'{{"{old}_1": [1]}}'.encode())
+        self.write(os.path.join(source_dir, f'{old}_gene_cna.csv.gz'), f'id\n{old}_1\n'.encode(), gzip.open)
+        self.write(os.path.join(source_dir, f'gistic_{old_job}', 'scores.gistic'), b'Type\tq\n')
+        self.write(os.path.join(source_dir, f'{old_job}.ok'), old_job.encode())
+
+        self.assertIsNotNone(dedup_utils.link_reusable_result(target))
+
+        target.refresh_from_db()
+        self.assertEqual(target.status, target.Status.Success)
+        self.assertEqual(target.result_source_uuid, source.uuid)
+
+        self.assertEqual(self.read(os.path.join(target_dir, f'{new}_recurrent.json')), f'{{"{new}_1": [1]}}'.encode())
+        self.assertEqual(self.read(os.path.join(target_dir, f'{new}_gene_cna.csv.gz'), gzip.open), f'id\n{new}_1\n'.encode())
+        self.assertEqual(self.read(os.path.join(target_dir, f'{new_job}.ok')), new_job.encode())
+
+        # 不含 uuid 的文件直接硬链接
+        scores_path = os.path.join(target_dir, f'gistic_{new_job}', 'scores.gistic')
+        self.assertTrue(os.path.samefile(scores_path, os.path.join(source_dir, f'gistic_{old_job}', 'scores.gistic')))
+
+        # 来源任务的文件不受影响
+        self.assertEqual(self.read(os.path.join(source_dir, f'{old}_recurrent.json')), f'{{"{old}_1": [1]}}'.encode())
+
+    def test_demo_input_is_copied_and_digest_saved(self):
+        master_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, master_dir, ignore_errors=True)
+        master_path = os.path.join(master_dir, 'demo.cna.csv')
+        self.write(master_path, b'id,a\nx,1\n')
+
+        task = self.create_task(k=50)
+        self.assertFalse(dedup_utils.prepare_demo_task(task, [(master_path, task.get_input_file_absolute_path())]))
+
+        self.assertFalse(os.path.samefile(master_path, task.get_input_file_absolute_path()))
+        self.assertEqual(self.read(task.get_input_file_absolute_path()), b'id,a\nx,1\n')
+        self.assertTrue(os.path.exists(master_path + dedup_utils.DIGEST_FILE_SUFFIX))
+        self.assertEqual(task.input_hash, dedup_utils.compute_input_hash(task, [task.get_input_file_absolute_path()]))
+
+    def test_demo_reuses_result_without_reading_master(self):
+        master_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, master_dir, ignore_errors=True)
+        master_path = os.path.join(master_dir, 'demo.cna.csv')
+        self.write(master_path, b'id,a\nx,1\n')
+
+        source = self.create_task(k=50)
+        dedup_utils.prepare_demo_task(source, [(master_path, source.get_input_file_absolute_path())])
+        BasicAnnotationTask.objects.filter(pk=source.pk).update(status=source.Status.Success)
+        dedup_utils._digest_cache.clear()
+
+        task = self.create_task(k=50)
+
+        with mock.patch('hashlib.sha256', wraps=hashlib.sha256) as sha256:
+            self.assertTrue(dedup_utils.prepare_demo_task(task, [(master_path, task.get_input_file_absolute_path())]))
+
+        # 只计算 input_hash 本身，不读取主文件
+        self.assertEqual(sha256.call_count, 1)
+        self.assertEqual(task.status, task.Status.Success)
+        self.assertEqual(self.read(task.get_input_file_absolute_path()), b'id,a\nx,1\n')
+        self.assertFalse(os.path.samefile(master_path, task.get_input_file_absolute_path()))
+
+
+@override_settings(EMAIL_OUTBOX_RETRY_BASE=60, EMAIL_OUTBOX_MAX_ATTEMPTS=3, EMAIL_OUTBOX_RATE_LIMIT=6000)
+class DeliverPendingEmailsTests(TestCase):
+    def setUp(self):
+        self.received = []
+        self.server = SMTPSinkServer(('127.0.0.1', 0), self.received.append)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+
+        self.sender = self.create_sender(self.server.server_address[1])
+        self.addCleanup(self.sender.close)
+
+        outbox_utils._last_send_time = None
+
+    def create_sender(self, port):
+        return email_utils.SMTPSender('127.0.0.1', port, starttls=False, sender='cnascope@localhost', timeout=5)
+
+    def create_message(self, email='user@example.org', **fields):
+        now = timezone.now()
+
+        return EmailOutbox.objects.create(
+            task_uuid=uuid.uuid4(), email=email, subject=outbox_utils.NOTIFICATION_SUBJECT,
+            body='done', create_time=now, next_attempt_time=now, **fields
+        )
+
+    def test_success(self):
+        message = self.create_message()
+
+        self.assertEqual(outbox_utils.deliver_pending_emails(self.sender), (1, 0))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.Status.Sent)
+        self.assertEqual(message.attempts, 1)
+        self.assertIsNotNone(message.sent_time)
+        self.assertEqual(len(self.received), 1)
+        self.assertIn('user@example.org', self.received[0])
+
+    def test_temporary_failure_backs_off(self):
+        message = self.create_message()
+
+        # 端口上没有服务：连接失败，按指数退避重试
+        with socket.socket() as s:
+            s.bind(('127.0.0.1', 0))
+            port = s.getsockname()[1]
+
+        sender = self.create_sender(port)
+        before = timezone.now()
+
+        self.assertEqual(outbox_utils.deliver_pending_emails(sender), (0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.Status.Pending)
+        self.assertEqual(message.attempts, 1)
+        self.assertTrue(message.last_error)
+        self.assertGreaterEqual(message.next_attempt_time, before + timedelta(seconds=60))
+
+        # 未到重试时间的邮件不会被取出
+        self.assertEqual(outbox_utils.deliver_pending_emails(self.sender), (0, 0))
+
+        EmailOutbox.objects.filter(pk=message.pk).update(next_attempt_time=timezone.now())
+        self.assertEqual(outbox_utils.deliver_pending_emails(sender), (0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.attempts, 2)
+        self.assertGreaterEqual(message.next_attempt_time, timezone.now() + timedelta(seconds=110))
+
+        # 服务恢复后发送成功
+        EmailOutbox.objects.filter(pk=message.pk).update(next_attempt_time=timezone.now())
+        self.assertEqual(outbox_utils.deliver_pending_emails(self.sender), (1, 0))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.Status.Sent)
+        self.assertEqual(message.attempts, 3)
+
+    def test_gives_up_after_max_attempts(self):
+        message = self.create_message(attempts=2)
+        sender = self.create_sender(self.server.server_address[1])
+        self.server.shutdown()
+        self.server.server_close()
+
+        self.assertEqual(outbox_utils.deliver_pending_emails(sender), (0, 1))
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.Status.Failed)
+        self.assertEqual(message.attempts, 3)
+
+    def test_permanent_failures(self):
+        refused = self.create_message('user@example.invalid')
+        invalid = self.create_message('not-an-email')
+        valid = self.create_message()
+
+        self.assertEqual(outbox_utils.deliver_pending_emails(self.sender), (1, 2))
+
+        for message in (refused, invalid):
+            message.refresh_from_db()
+            self.assertEqual(message.status, EmailOutbox.Status.Failed)
+            self.assertEqual(message.attempts, 1)
+
+        valid.refresh_from_db()
+        self.assertEqual(valid.status, EmailOutbox.Status.Sent)
+        self.assertEqual(len(self.received), 1)
+
+    def test_rate_limit_spans_batches(self):
+        self.create_message()
+        self.create_message()
+
+        with mock.patch('analysis.utils.outbox_utils.time.sleep') as sleep:
+            self.assertEqual(outbox_utils.deliver_pending_emails(self.sender, batch_size=1, rate_limit=60), (1, 0))
+            sleep.assert_not_called()
+
+            # 下一批的第一封同样需要等待上一批的最后一封
+            self.assertEqual(outbox_utils.deliver_pending_emails(self.sender, batch_size=1, rate_limit=60), (1, 0))
+            sleep.assert_called_once()
+            self.assertGreater(sleep.call_args[0][0], 0.9)
@@ -0,0 +1,302 @@
+import os
+import gzip
+import json
+import shutil
+import hashlib
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.utils import timezone
+
+from analysis.models import BasicAnnotationTask, RecurrentCNATask
+from analysis.utils import outbox_utils
+from database.utils import path_utils
+
+HASH_CHUNK_SIZE = 1024 * 1024
+DIGEST_CACHE_SIZE = 1024
+# 主文件摘要的保存位置：<文件>.sha256
+DIGEST_FILE_SUFFIX = '.sha256'
+
+# 参与 input_hash 计算的任务参数
+hash_param_fields = {
+    BasicAnnotationTask: ['ref', 'obs_type', 'window_type', 'k', 'value_type'],
+    RecurrentCNATask: ['ref', 'obs_type', 'value_type'],
+}
+
+# (设备, inode, mtime, 大小) -> 文件 SHA-256，同一文件不必重复读取
+_digest_cache = OrderedDict()
+_digest_cache_lock = threading.Lock()
+
+
+def load_digest_file(file_path, stat):
+    try:
+        with open(f'{file_path}{DIGEST_FILE_SUFFIX}', 'r') as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if saved.get('mtime_ns') != stat.st_mtime_ns or saved.get('size') != stat.st_size:
+        return None
+
+    return saved.get('sha256')
+
+
+def save_digest_file(file_path, stat, digest):
+    digest_path = f'{file_path}{DIGEST_FILE_SUFFIX}'
+
+    try:
+        tmp_path = path_utils.make_temp_path(digest_path)
+    except OSError:
+        # 目录不可写时只使用进程内缓存
+        return
+
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest}, f)
+
+        os.replace(tmp_path, digest_path)
+    except OSError:
+        path_utils.remove_temp_path(tmp_path)
+
+
+def get_file_digest(file_path, persist=False):
+    """
+    文件的 SHA-256。persist 为 True 时（演示数据等固定的主文件）摘要同时保存在 <文件>.sha256 中，
+    各进程只需 stat 主文件即可取得。
+    """
+    stat = os.stat(file_path)
+    key = (stat.st_dev, stat.st_ino, stat.st_mtime_ns, stat.st_size)
+
+    with _digest_cache_lock:
+        if key in _digest_cache:
+            _digest_cache.move_to_end(key)
+            return _digest_cache[key]
+
+    digest = load_digest_file(file_path, stat) if persist else None
+
+    if digest is None:
+        sha256 = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+
+        digest = sha256.hexdigest()
+
+        if persist:
+            save_digest_file(file_path, stat, digest)
+
+    with _digest_cache_lock:
+        _digest_cache[key] = digest
+
+        while len(_digest_cache) > DIGEST_CACHE_SIZE:
+            _digest_cache.popitem(last=False)
+
+    return digest
+
+
+def build_input_hash(task, file_digests):
+    """
+    输入文件（文件名与内容摘要）和任务参数的 SHA-256，file_digests 为 [(文件名, 摘要)]。
+
+    多文件任务的输出按输入文件名命名，文件名也参与计算。
+    """
+    payload = {
+        'files': [[name, digest] for name, digest in file_digests],
+        'params': {name: str(getattr(task, name)) for name in hash_param_fields[type(task)]},
+    }
+
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+
+def compute_input_hash(task, input_files):
+    return build_input_hash(task, [(os.path.basename(file_path), get_file_digest(file_path)) for file_path in input_files])
+
+
+def link_or_copy(src, dst):
+    try:
+        os.link(src, dst)
+    except OSError:
+        # 跨文件系统等无法硬链接时复制
+        shutil.copy2(src, dst)
+
+
+def stream_contains(file, patterns):
+    overlap = max(len(pattern) for pattern in patterns) - 1
+    tail = b''
+
+    for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+        data = tail + chunk
+
+        if any(pattern in data for pattern in patterns):
+            return True
+
+        tail = data[-overlap:]
+
+    return False
+
+
+def stream_replace(src, dst, replacements):
+    # 新旧字符串等长；每块保留可能被截断的尾部，与下一块拼接后再替换
+    overlap = max(len(old) for old, _ in replacements) - 1
+    tail = b''
+
+    for chunk in iter(lambda: src.read(HASH_CHUNK_SIZE), b''):
+        data = tail + chunk
+
+        for old, new in replacements:
+            data = data.replace(old, new)
+
+        tail = data[-overlap:]
+        dst.write(data[:-overlap])
+
+    dst.write(tail)
+
+
+def link_or_rewrite(src_path, dst_path, replacements):
+    """
+    文件内容不含 source uuid 时硬链接；含有时（如 _recurrent.json 的 key、样本名）写入替换后的副本，
+    .gz 文件解压替换后重新压缩。
+    """
+    opener = gzip.open if src_path.endswith('.gz') else open
+    byte_replacements = [(old.encode(), new.encode()) for old, new in replacements]
+
+    try:
+        with opener(src_path, 'rb') as src:
+            contains = stream_contains(src, [old for old, _ in byte_replacements])
+    except (OSError, EOFError):
+        # 无法解压的文件按原样链接
+        contains = False
+
+    if not contains:
+        link_or_copy(src_path, dst_path)
+        return
+
+    tmp_path = path_utils.make_temp_path(dst_path)
+
+    try:
+        with opener(src_path, 'rb') as src, opener(tmp_path, 'wb') as dst:
+            stream_replace(src, dst, byte_replacements)
+
+        shutil.copystat(src_path, tmp_path)
+        os.replace(tmp_path, dst_path)
+    except BaseException:
+        path_utils.remove_temp_path(tmp_path)
+        raise
+
+
+def link_task_outputs(source, target):
+    """
+    把 source 任务的输出复制到 target 任务的输出目录：文件名和文件内容中的 source uuid 都替换为 target uuid，
+    不含 uuid 的文件直接硬链接。target 的输出与自己运行得到的一致，查看和下载时无需区分是否复用。
+    """
+    source_dir = source.get_output_dir_absolute_path()
+    target_dir = target.get_output_dir_absolute_path()
+
+    # 输出中的 uuid 有两种写法：原样和 Slurm 作业名（- 替换为 _）
+    replacements = [
+        (str(source.uuid), str(target.uuid)),
+        (str(source.uuid).replace('-', '_'), str(target.uuid).replace('-', '_')),
+    ]
+
+    def rename(name):
+        for old, new in replacements:
+            name = name.replace(old, new)
+        return name
+
+    for root, _, files in os.walk(source_dir):
+        relative_dir = os.path.relpath(root, source_dir)
+        dst_dir = os.path.normpath(os.path.join(target_dir, rename(relative_dir)))
+        os.makedirs(dst_dir, exist_ok=True)
+
+        for name in files:
+            dst_path = os.path.join(dst_dir, rename(name))
+
+            if os.path.lexists(dst_path):
+                os.remove(dst_path)
+
+            link_or_rewrite(os.path.join(root, name), dst_path, replacements)
+
+
+def find_reusable_tasks(task):
+    model = type(task)
+
+    return model.objects.filter(
+        input_hash=task.input_hash, status=model.Status.Success
+    ).exclude(pk=task.pk).order_by('-finish_time')
+
+
+def reuse_task_result(task, input_files):
+    """
+    计算（未预先计算时）并保存任务的 input_hash；已有相同输入的成功任务时复用其输出并把任务直接标记为成功，返回 True。
+    """
+    if not task.input_hash:
+        try:
+            task.input_hash = compute_input_hash(task, input_files)
+        except OSError:
+            return False
+
+        task.save(update_fields=['input_hash'])
+
+    return link_reusable_result(task) is not None
+
+
+def link_reusable_result(task):
+    """
+    复用相同 input_hash 的成功任务的输出，把任务标记为成功并写入通知邮件，返回来源任务；没有可复用的结果时返回 None。
+    """
+    if not settings.TASK_RESULT_REUSE:
+        return None
+
+    for source in find_reusable_tasks(task):
+        if not os.path.isdir(source.get_output_dir_absolute_path()):
+            continue
+
+        try:
+            link_task_outputs(source, task)
+        except OSError:
+            continue
+
+        now = timezone.now()
+        task.status = task.Status.Success
+        task.finish_time = now
+        task.queue_position = None
+        task.status_update_time = now
+        task.result_source_uuid = source.uuid
+        task.save(update_fields=['status', 'finish_time', 'queue_position', 'status_update_time', 'result_source_uuid'])
+        outbox_utils.enqueue_task_notification(task)
+
+        return source
+
+    return None
+
+
+def prepare_demo_task(task, demo_files):
+    """
+    准备演示任务的输入，demo_files 为 [(主文件路径, 工作目录中的输入路径)]，已复用结果时返回 True。
+
+    先用主文件的摘要（保存在 <主文件>.sha256 中，不读取主文件）计算 input_hash 查找可复用的结果，
+    复用时输入从来源任务的工作目录链接（不会再运行任务脚本）；否则复制主文件。
+    输入从不硬链接到主文件，任务脚本写入输入文件时不会改动主文件。
+    """
+    task.input_hash = build_input_hash(task, [
+        (os.path.basename(input_path), get_file_digest(master_path, persist=True))
+        for master_path, input_path in demo_files
+    ])
+    task.save(update_fields=['input_hash'])
+
+    source = link_reusable_result(task)
+
+    for master_path, input_path in demo_files:
+        if source is not None:
+            source_input_dir = os.path.dirname(source.get_input_file_absolute_path())
+
+            try:
+                link_or_copy(os.path.join(source_input_dir, os.path.basename(input_path)), input_path)
+                continue
+            except OSError:
+                pass
+
+        shutil.copyfile(master_path, input_path)
+
+    return source is not None
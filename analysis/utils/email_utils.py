@@ -8,13 +8,6 @@ import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
-# Parse command line arguments
-parser = argparse.ArgumentParser(description='Send email notification')
-parser.add_argument('--email', required=True, help='Recipient email address')
-parser.add_argument('--subject', required=True, help='Email subject')
-parser.add_argument('--body', required=True, help='Email body')
-args = parser.parse_args()
-
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 env_path = os.path.join(BASE_DIR, '.env')
 
@@ -31,25 +24,83 @@ def is_valid_email(email):
     return re.match(pattern, email) is not None
 
 
+def build_message(sender, to, subject, body):
+    msg = MIMEMultipart()
+    msg['From'] = sender
+    msg['To'] = to
+    msg['Subject'] = subject
+    msg.attach(MIMEText(body, 'plain', 'utf-8'))
+
+    return msg
+
+
+class SMTPSender:
+    """
+    复用同一个 SMTP 连接发送多封邮件，连接被服务器断开时重连一次。
+    """
+    def __init__(self, host, port, user=None, password=None, starttls=True, sender=None, timeout=30):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender or user
+        self.timeout = timeout
+        self.server = None
+
+    def connect(self):
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+
+        try:
+            if self.starttls:
+                server.starttls()
+
+            if self.user:
+                server.login(self.user, self.password)
+        except Exception:
+            server.close()
+            raise
+
+        self.server = server
+
+    def send(self, to, subject, body):
+        message = build_message(self.sender, to, subject, body).as_string()
+
+        if self.server is None:
+            self.connect()
+
+        try:
+            self.server.sendmail(self.sender, to, message)
+        except smtplib.SMTPServerDisconnected:
+            self.server = None
+            self.connect()
+            self.server.sendmail(self.sender, to, message)
+
+    def close(self):
+        if self.server is None:
+            return
+
+        try:
+            self.server.quit()
+        except (smtplib.SMTPException, OSError):
+            self.server.close()
+
+        self.server = None
+
+
 def send_email(user, app_password, to, subject, body):
     # Validate email first
     if not is_valid_email(to):
         print(f"Error: '{to}' is not a valid email address.")
         return False
-        
+
     try:
-        # Build email
-        msg = MIMEMultipart()
-        msg['From'] = user
-        msg['To'] = to
-        msg['Subject'] = subject
-        msg.attach(MIMEText(body, 'plain', 'utf-8'))
-
-        with smtplib.SMTP('smtp.gmail.com', 587) as server:
-            server.starttls()
-            server.login(user, app_password)
-            server.sendmail(user, to, msg.as_string())
-            print(f'Email successfully sent to {to}')
+        sender = SMTPSender('smtp.gmail.com', 587, user, app_password)
+        try:
+            sender.send(to, subject, body)
+        finally:
+            sender.close()
+        print(f'Email successfully sent to {to}')
         return True
     except Exception as e:
         print(f'Error sending email: {e}')
@@ -57,10 +108,17 @@ def send_email(user, app_password, to, subject, body):
 
 
 if __name__ == '__main__':
+    # Parse command line arguments
+    parser = argparse.ArgumentParser(description='Send email notification')
+    parser.add_argument('--email', required=True, help='Recipient email address')
+    parser.add_argument('--subject', required=True, help='Email subject')
+    parser.add_argument('--body', required=True, help='Email body')
+    args = parser.parse_args()
+
     send_email(
-        GMAIL_USER, 
-        GMAIL_APP_PASSWORD, 
-        args.email, 
-        args.subject, 
+        GMAIL_USER,
+        GMAIL_APP_PASSWORD,
+        args.email,
+        args.subject,
         args.body
-    )
\ No newline at end of file
+    )
@@ -3,6 +3,7 @@ import pandas as pd
 import numpy as np
 
 from database.utils import path_utils
+from database.utils import matrix_utils as database_matrix_utils
 
 
 def extract_matrix_from_parquet(file_path, target_column):
@@ -21,6 +22,12 @@ def extract_matrix_from_parquet(file_path, target_column):
 
 
 def extract_matrix_from_csv(file_path, target_column):
+    # 存在列式 Parquet 副本时只读取请求的列
+    parquet_path = path_utils.get_matrix_parquet_path(file_path)
+
+    if database_matrix_utils.is_parquet_sidecar_fresh(file_path, parquet_path):
+        return database_matrix_utils.extract_matrix_from_parquet_sidecar(parquet_path, target_column)
+
     # 先读取 CSV 文件的头部（schema）
     df = pd.read_csv(file_path, nrows=1)
     all_columns = df.columns.tolist()
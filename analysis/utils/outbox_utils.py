@@ -0,0 +1,132 @@
+import time
+import smtplib
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from analysis.models import EmailOutbox
+from analysis.utils import email_utils
+
+NOTIFICATION_SUBJECT = 'CNAScope Task Notification'
+
+# 上一次发送邮件的时间（time.monotonic），速率限制跨批次生效
+_last_send_time = None
+
+
+def build_task_notification(task):
+    if task.status == task.Status.Success:
+        return f'Your CNAScope task with UUID {task.uuid} has completed successfully.'
+
+    return f'Your CNAScope task with UUID {task.uuid} has failed. Please check the logs for details.'
+
+
+def enqueue_task_notification(task):
+    """
+    任务结束时写入一条待发送的通知邮件；未填写邮箱或已写入过时不重复写入。
+
+    所有把任务置为结束状态的位置都需调用：poll_task_status（Slurm，包括作业异常退出、超过宽限期未写出 status.txt）、
+    本地执行器（正常结束、超时、启动失败、所属进程退出）和输出复用。
+    """
+    if not task.email or not task.email.strip():
+        return None
+
+    now = timezone.now()
+    message, _ = EmailOutbox.objects.get_or_create(
+        task_uuid=task.uuid,
+        defaults={
+            'email': task.email.strip(),
+            'subject': NOTIFICATION_SUBJECT,
+            'body': build_task_notification(task),
+            'create_time': now,
+            'next_attempt_time': now,
+        }
+    )
+
+    return message
+
+
+def get_smtp_sender():
+    return email_utils.SMTPSender(
+        settings.EMAIL_SMTP_HOST,
+        settings.EMAIL_SMTP_PORT,
+        settings.EMAIL_SMTP_USER,
+        settings.EMAIL_SMTP_PASSWORD,
+        starttls=settings.EMAIL_SMTP_STARTTLS,
+        sender=settings.EMAIL_FROM,
+    )
+
+
+def get_retry_delay(attempts):
+    # 指数退避：base, 2 * base, 4 * base ...
+    return settings.EMAIL_OUTBOX_RETRY_BASE * 2 ** (attempts - 1)
+
+
+def mark_failed_attempt(message, error, now, permanent=False):
+    message.attempts += 1
+    message.last_error = str(error)
+
+    if permanent or message.attempts >= settings.EMAIL_OUTBOX_MAX_ATTEMPTS:
+        message.status = EmailOutbox.Status.Failed
+    else:
+        message.next_attempt_time = now + timedelta(seconds=get_retry_delay(message.attempts))
+
+
+def wait_for_send_slot(min_interval):
+    global _last_send_time
+
+    if _last_send_time is not None:
+        delay = _last_send_time + min_interval - time.monotonic()
+
+        if delay > 0:
+            time.sleep(delay)
+
+    _last_send_time = time.monotonic()
+
+
+def deliver_pending_emails(sender, batch_size=None, rate_limit=None):
+    """
+    通过同一个 sender 连接发送一批到期的待发送邮件，返回 (成功数, 失败数)。
+
+    每分钟最多发送 rate_limit 封（包括上一批次的最后一封）；发送失败按指数退避重试，超过 EMAIL_OUTBOX_MAX_ATTEMPTS 次后放弃。
+    只应由单个 send_task_emails 进程调用。
+    """
+    batch_size = batch_size or settings.EMAIL_OUTBOX_BATCH_SIZE
+    rate_limit = rate_limit or settings.EMAIL_OUTBOX_RATE_LIMIT
+    min_interval = 60 / rate_limit
+
+    messages = list(
+        EmailOutbox.objects.filter(
+            status=EmailOutbox.Status.Pending, next_attempt_time__lte=timezone.now()
+        ).order_by('next_attempt_time', 'id')[:batch_size]
+    )
+
+    sent = failed = 0
+
+    for message in messages:
+        if not email_utils.is_valid_email(message.email):
+            mark_failed_attempt(message, f"'{message.email}' is not a valid email address", timezone.now(), permanent=True)
+            failed += 1
+        else:
+            wait_for_send_slot(min_interval)
+            now = timezone.now()
+
+            try:
+                sender.send(message.email, message.subject, message.body)
+            except smtplib.SMTPRecipientsRefused as e:
+                # 收件人被拒绝，重试也不会成功
+                mark_failed_attempt(message, e, now, permanent=True)
+                failed += 1
+            except (smtplib.SMTPException, OSError) as e:
+                sender.close()
+                mark_failed_attempt(message, e, now)
+                failed += 1
+            else:
+                message.status = EmailOutbox.Status.Sent
+                message.sent_time = now
+                message.attempts += 1
+                sent += 1
+
+        message.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt_time', 'sent_time'])
+
+    return sent, failed
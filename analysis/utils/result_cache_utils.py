@@ -0,0 +1,157 @@
+import os
+import sqlite3
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from rest_framework.renderers import JSONRenderer
+
+from database.utils import cache_utils, response_utils, path_utils, matrix_utils, recurrent_utils
+
+# 缓存内容的生成方式变化时递增，旧的磁盘缓存和浏览器缓存随 ETag 一起失效
+RESULT_CACHE_VERSION = 2
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def is_result_immutable(task):
+    # 只有成功结束的任务输出不再变化
+    return task.status == task.Status.Success
+
+
+def read_json_text_body(file_path):
+    # 与 Response(文件文本) 的渲染结果一致
+    with open(file_path, 'r') as f:
+        return render_json(f.read())
+
+
+def render_json(data):
+    return JSONRenderer().render(data)
+
+
+def get_result_cache_dir(task):
+    return os.path.join(settings.WORKSPACE_HOME, str(task.uuid), 'cache')
+
+
+def build_result_etag(task, name):
+    return f'"{task.uuid}-{name}-v{RESULT_CACHE_VERSION}"'
+
+
+def get_result_body(task, name, build, cacheable=None):
+    """
+    返回 build() 生成的响应体，依次查找进程内缓存、WORKSPACE_HOME/<uuid>/cache/<name>，都没有时生成并写入两者。
+
+    cacheable 在 build() 之后调用，返回 False 时不写入缓存（如超出范围的分页）。
+    """
+    key = (f'task:{task.uuid}:{name}', RESULT_CACHE_VERSION)
+    body = cache_utils.payload_cache.get(key)
+
+    if body is not None:
+        return body
+
+    cache_path = os.path.join(get_result_cache_dir(task), f'v{RESULT_CACHE_VERSION}', name)
+
+    try:
+        with open(cache_path, 'rb') as f:
+            body = f.read()
+    except OSError:
+        # 缺失或不可读时重新生成
+        body = build()
+
+        if cacheable is not None and not cacheable():
+            return body
+
+        try:
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            tmp_path = path_utils.make_temp_path(cache_path)
+
+            try:
+                with open(tmp_path, 'wb') as f:
+                    f.write(body)
+
+                os.replace(tmp_path, cache_path)
+            except OSError:
+                path_utils.remove_temp_path(tmp_path)
+                raise
+        except OSError:
+            # 工作目录不可写时只使用内存缓存
+            pass
+
+    cache_utils.payload_cache.put(key, body, len(body))
+
+    return body
+
+
+def build_result_response(request, task, name, content_type, build, filename=None, disposition='attachment', cacheable=None):
+    """
+    返回任务结果响应，build() 生成响应体字节串。
+
+    成功结束的任务：强 ETag 由任务 UUID 和结果名称决定，命中 If-None-Match 时不读取任何文件，
+    响应体经内存 / 磁盘缓存只生成一次，并允许浏览器永久缓存。其它状态的任务每次重新生成。
+    """
+    if not is_result_immutable(task):
+        response = HttpResponse(build(), content_type=content_type)
+    else:
+        etag = build_result_etag(task, name)
+        response = get_conditional_response(request, etag=etag)
+
+        if response is None:
+            response = HttpResponse(get_result_body(task, name, build, cacheable), content_type=content_type)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+
+    if filename and response.status_code == 200:
+        response['Content-Disposition'] = f'{disposition}; filename="{filename}"'
+
+    return response
+
+
+def build_csv_result_response(request, task, file_path, filename):
+    """
+    任务输出的 CSV 从原文件流式返回，只改写表头第一列；不读入内存，也不在缓存中另存一份。
+
+    条件请求与 Range 由 build_csv_passthrough_response 按文件 ETag 处理，成功任务允许浏览器永久缓存。
+    """
+    response = response_utils.build_csv_passthrough_response(request, file_path, filename)
+
+    if is_result_immutable(task):
+        response['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+
+    return response
+
+
+def ensure_matrix_parquet(task):
+    """
+    成功任务的输入矩阵首次访问时转换为列式 Parquet 副本（input/cna.parquet），之后按列读取。
+    """
+    matrix_path = task.get_input_file_absolute_path()
+    parquet_path = path_utils.get_matrix_parquet_path(matrix_path)
+
+    if is_result_immutable(task) and not matrix_utils.is_parquet_sidecar_fresh(matrix_path, parquet_path):
+        try:
+            matrix_utils.convert_matrix_csv_to_parquet(matrix_path, parquet_path)
+        except OSError:
+            # 转换失败时继续读取 CSV
+            pass
+
+    return matrix_path
+
+
+def ensure_recurrent_index(task, json_path):
+    """
+    成功任务的 _recurrent.json 首次访问时建立 SQLite 分页索引，返回索引路径。
+    """
+    index_path = os.path.join(get_result_cache_dir(task), 'recurrent.sqlite3')
+
+    if is_result_immutable(task) and not recurrent_utils.is_recurrent_index_fresh(json_path, index_path):
+        try:
+            os.makedirs(os.path.dirname(index_path), exist_ok=True)
+            recurrent_utils.build_recurrent_index(json_path, index_path)
+        except (OSError, sqlite3.Error):
+            # 建立失败（工作目录不可写等）时 query_recurrent_profiles 回退到读取 JSON
+            pass
+
+    return index_path
+
@@ -0,0 +1,284 @@
+import os
+import copy
+import time
+import uuid
+import logging
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Value, IntegerField
+from django.utils import timezone
+
+from analysis.models import BasicAnnotationTask, RecurrentCNATask
+from analysis import task_executor
+from analysis.utils import outbox_utils
+from analysis.slurm_squeue import squeue_all_jobs
+
+
+logger = logging.getLogger(__name__)
+
+task_models = [BasicAnnotationTask, RecurrentCNATask]
+
+# Slurm 状态码 -> 任务状态，未列出的状态保持不变
+running_states = {'R', 'CG', 'CF'}
+# 作业异常结束（取消、失败、超时、节点故障、内存不足、被抢占等），脚本可能来不及写出 status.txt
+failed_states = {'CA', 'F', 'TO', 'NF', 'OOM', 'PR', 'BF', 'DL'}
+completed_state = 'CD'
+
+
+def get_job_name(task):
+    return str(task.uuid).replace('-', '_')
+
+
+def is_terminal(task):
+    return task.status in [task.Status.Success, task.Status.Failed]
+
+
+def get_active_tasks():
+    tasks = []
+
+    for model in task_models:
+        tasks.extend(model.objects.exclude(status__in=[model.Status.Success, model.Status.Failed]))
+
+    return tasks
+
+
+def read_status_file(task):
+    """
+    读取 output/status.txt：第一行为完成时间，第二行为 success / failed。
+    """
+    status_file_path = os.path.join(settings.WORKSPACE_HOME, str(task.uuid), 'output', 'status.txt')
+
+    with open(status_file_path, 'r') as status_file:
+        finish_time_str = status_file.readline().strip()
+        raw_status = status_file.readline().strip()
+
+    finish_time = timezone.make_aware(datetime.strptime(finish_time_str, '%Y-%m-%d %H:%M:%S'))
+
+    return finish_time, raw_status == 'success'
+
+
+def apply_job_status(task, job_status, now):
+    """
+    根据 squeue 结果更新任务字段，job_status 为 None 表示任务已不在队列中。
+
+    作业结束后以 status.txt 为准；异常结束的作业没有 status.txt 时直接记为失败，
+    已离开队列（或正常完成）的作业超过 TASK_MISSING_GRACE_SECONDS 仍没有 status.txt 时也记为失败。
+    """
+    task.status_update_time = now
+
+    if job_status is None or job_status == completed_state or job_status in failed_states:
+        try:
+            task.finish_time, success = read_status_file(task)
+        except (FileNotFoundError, ValueError):
+            if job_status not in failed_states:
+                # 状态文件可能因共享存储延迟尚未可见，宽限期内等待下一轮
+                if task.missing_since is None:
+                    task.missing_since = now
+
+                if (now - task.missing_since).total_seconds() <= settings.TASK_MISSING_GRACE_SECONDS:
+                    return
+
+            task.finish_time, success = now, False
+
+        task.status = task.Status.Success if success else task.Status.Failed
+        task.queue_position = None
+        task.missing_since = None
+        return
+
+    task.missing_since = None
+
+    if job_status.startswith('PD'):
+        task.status = task.Status.Pending
+        task.queue_position = int(job_status.split(' ')[1])
+    elif job_status in running_states:
+        task.status = task.Status.Running
+        task.queue_position = None
+
+
+def poll_task_status(tasks=None):
+    """
+    用一次 squeue 调用刷新所有未结束任务的状态，返回更新的任务数；squeue 失败时返回 None。
+    """
+    # 本地执行器直接把状态写入数据库，无需查询 squeue
+    if not task_executor.get_executor().polls_status:
+        return 0
+
+    if tasks is None:
+        tasks = get_active_tasks()
+
+    if not tasks:
+        return 0
+
+    jobs = squeue_all_jobs()
+
+    if jobs is None:
+        return None
+
+    now = timezone.now()
+
+    for task in tasks:
+        apply_job_status(task, jobs.get(get_job_name(task)), now)
+        task.save(update_fields=['status', 'finish_time', 'queue_position', 'status_update_time', 'missing_since'])
+
+        if is_terminal(task):
+            outbox_utils.enqueue_task_notification(task)
+
+    return len(tasks)
+
+
+def is_status_stale(task):
+    if is_terminal(task):
+        return False
+
+    if task.status_update_time is None:
+        return True
+
+    return (timezone.now() - task.status_update_time).total_seconds() > settings.TASK_STATUS_STALE_SECONDS
+
+
+_stale_warned_at = 0
+
+
+def warn_if_status_stale(task):
+    """
+    Slurm 任务状态过期时记录警告（状态轮询服务未运行），每个 STALE 周期最多记录一次。
+    """
+    global _stale_warned_at
+
+    # 本地执行器直接写入状态，排队中的任务不会刷新 status_update_time
+    if not task_executor.get_executor().polls_status or not is_status_stale(task):
+        return False
+
+    now = time.monotonic()
+
+    if now - _stale_warned_at < settings.TASK_STATUS_STALE_SECONDS:
+        return True
+
+    _stale_warned_at = now
+    logger.warning(
+        'Task %s status was last updated at %s; is `manage.py poll_task_status` running?',
+        task.uuid, task.status_update_time
+    )
+
+    return True
+
+
+class TaskLookupCache:
+    """
+    进程内 uuid -> (任务模型, 已结束的任务记录) 缓存，条目超过 ttl 秒后失效，按 LRU 淘汰。
+
+    任务类型不会变化；已结束的任务状态不再变化，可直接返回缓存的记录。
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                return None
+
+            if time.monotonic() > entry[2]:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+
+            return entry[0], entry[1]
+
+    def put(self, key, model, task=None):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (model, task, time.monotonic() + self.ttl)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+
+task_lookup_cache = TaskLookupCache(settings.TASK_LOOKUP_CACHE_TTL, settings.TASK_LOOKUP_CACHE_SIZE)
+
+
+def get_task_field_names():
+    # 两个任务表的公共字段在前，BasicAnnotationTask 独有的字段在后
+    common_fields = [field.attname for field in RecurrentCNATask._meta.concrete_fields]
+    extra_fields = [
+        field for field in BasicAnnotationTask._meta.concrete_fields if field.attname not in common_fields
+    ]
+
+    return common_fields, extra_fields
+
+
+def find_task(task_uuid):
+    """
+    用一条 UNION 查询在两个任务表中查找任务，返回模型实例，不存在时返回 None。
+    """
+    common_fields, extra_fields = get_task_field_names()
+    extra_names = [field.attname for field in extra_fields]
+    field_names = common_fields + extra_names
+
+    basic_query = BasicAnnotationTask.objects.filter(pk=task_uuid).annotate(
+        model_index=Value(0, output_field=IntegerField())
+    ).values_list(*field_names, 'model_index')
+
+    # RecurrentCNATask 没有的字段补 NULL，保证两边列数和顺序一致
+    recurrent_query = RecurrentCNATask.objects.filter(pk=task_uuid).annotate(
+        **{field.attname: Value(None, output_field=field.__class__()) for field in extra_fields},
+        model_index=Value(1, output_field=IntegerField())
+    ).values_list(*field_names, 'model_index')
+
+    row = next(iter(basic_query.union(recurrent_query, all=True)[:1]), None)
+
+    if row is None:
+        return None
+
+    model = BasicAnnotationTask if row[-1] == 0 else RecurrentCNATask
+    values = dict(zip(field_names, row))
+    model_fields = [field.attname for field in model._meta.concrete_fields]
+
+    # from_db 要求按模型字段顺序传入
+    return model.from_db('default', model_fields, [values[name] for name in model_fields])
+
+
+def get_task(task_uuid):
+    """
+    按 uuid 查找任务，返回 BasicAnnotationTask 或 RecurrentCNATask 实例，不存在或 uuid 不合法时返回 None。
+
+    已结束的任务直接从缓存返回；未结束的任务按缓存的类型只查询对应的表；首次查找使用一条 UNION 查询。
+    """
+    try:
+        key = str(uuid.UUID(str(task_uuid)))
+    except ValueError:
+        return None
+
+    entry = task_lookup_cache.get(key)
+
+    if entry is not None:
+        model, task = entry
+
+        if task is not None:
+            return copy.copy(task)
+
+        task = model.objects.filter(pk=key).first()
+    else:
+        task = find_task(key)
+
+    if task is None:
+        task_lookup_cache.discard(key)
+        return None
+
+    task_lookup_cache.put(key, type(task), copy.copy(task) if is_terminal(task) else None)
+
+    return task
+
@@ -0,0 +1,115 @@
+import io
+import os
+import csv
+import codecs
+import zipfile
+
+MAX_CSV_ROWS = 1000
+# 单行最大字符数，超过时按格式错误拒绝，避免无换行的上传占满内存
+MAX_CSV_LINE_LENGTH = 4 * 1024 * 1024
+MAX_ZIP_CSV_FILES = 5
+ZIP_CHUNK_SIZE = 64 * 1024
+
+
+class RowLimitExceeded(Exception):
+    def __init__(self, max_rows):
+        super().__init__(f'more than {max_rows} rows')
+        self.max_rows = max_rows
+
+
+def iter_text_lines(chunks, destination=None, max_line_length=MAX_CSV_LINE_LENGTH):
+    """
+    增量解码 UTF-8 字节块并按行输出（保留换行符），同时把原始字节写入 destination。
+
+    每块只切分新解码的文本，未完成的行分段保存；一行超过 max_line_length 个字符时抛出 csv.Error。
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    parts = []
+    length = 0
+
+    def split_text(text):
+        nonlocal parts, length
+
+        for line in io.StringIO(text, newline='').readlines():
+            # 上一段以 \r 结尾且本段不以 \n 开头：上一行以单独的 \r 结束
+            if parts and parts[-1].endswith('\r') and not line.startswith('\n'):
+                yield ''.join(parts)
+                parts, length = [], 0
+
+            parts.append(line)
+            length += len(line)
+
+            if length > max_line_length:
+                raise csv.Error(f'line exceeds {max_line_length} characters')
+
+            # 以 \r 结尾的行可能还有 \n 在下一块
+            if line.endswith('\n'):
+                yield ''.join(parts)
+                parts, length = [], 0
+
+    for chunk in chunks:
+        if destination is not None:
+            destination.write(chunk)
+
+        yield from split_text(decoder.decode(chunk))
+
+    yield from split_text(decoder.decode(b'', final=True))
+
+    if parts:
+        yield ''.join(parts)
+
+
+def validate_csv_chunks(chunks, destination=None, max_rows=MAX_CSV_ROWS):
+    """
+    单次遍历校验 CSV：统计行数并检查每行列数与表头一致，超过 max_rows 行时立即中止。
+
+    返回行数；编码错误抛出 UnicodeDecodeError，格式错误抛出 csv.Error，超出行数抛出 RowLimitExceeded。
+    """
+    row_count = 0
+    column_count = None
+
+    for row in csv.reader(iter_text_lines(chunks, destination)):
+        row_count += 1
+
+        if row_count > max_rows:
+            raise RowLimitExceeded(max_rows)
+
+        # 空行只计数，不参与列数检查
+        if not row:
+            continue
+
+        if column_count is None:
+            column_count = len(row)
+        elif len(row) != column_count:
+            raise csv.Error(f'row {row_count} has {len(row)} columns, expected {column_count}')
+
+    return row_count
+
+
+def save_validated_csv(chunks, file_path, max_rows=MAX_CSV_ROWS):
+    """
+    边校验边写入 file_path，校验失败时删除已写入的部分文件。
+    """
+    try:
+        with open(file_path, 'wb') as destination:
+            return validate_csv_chunks(chunks, destination, max_rows)
+    except Exception:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+
+
+def iter_zip_member_chunks(zip_ref, member, chunk_size=ZIP_CHUNK_SIZE):
+    with zip_ref.open(member) as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def list_zip_csv_members(zip_ref):
+    return [
+        member for member in zip_ref.infolist()
+        if not member.is_dir() and member.filename.lower().endswith('.csv')
+    ]
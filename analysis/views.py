@@ -1,8 +1,7 @@
 import csv
-import io
 import zipfile
 import os
-import tempfile
+import hashlib
 import shutil
 from rest_framework.decorators import api_view, parser_classes
 from rest_framework.parsers import MultiPartParser, FormParser
@@ -16,7 +15,10 @@ from .models import *
 from .serializers import *
 from .slurm_sbatch import *
 from .slurm_squeue import *
-from django.http import HttpResponse
+from .utils import task_utils, upload_utils, dedup_utils
+from . import task_executor
+from django.http import StreamingHttpResponse
+from database.utils import zip_utils
 
 @api_view(["POST"])
 @parser_classes([MultiPartParser, FormParser])
@@ -47,36 +49,36 @@ def submit_basic_annotation_task(request):
                 "msg": "Input file must be a CSV file"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 检查CSV文件的行数
+        # 创建任务 UUID
+        task_uuid = uuid.uuid4()
+        task_dir = os.path.join(settings.WORKSPACE_HOME, str(task_uuid))
+        input_dir = os.path.join(task_dir, 'input')
+        output_dir = os.path.join(task_dir, 'output')
+        os.makedirs(input_dir, exist_ok=True)
+
+        # 边校验边写入 input/cna.csv，行数超过1000行时立即中止
+        file_path = os.path.join(input_dir, 'cna.csv')
         try:
-            # 读取文件内容并计算行数
-            content = input_file.read().decode('utf-8')
-            input_file.seek(0)  # 重置文件指针
-            
-            # 使用csv模块验证格式并计算行数
-            csv_reader = csv.reader(io.StringIO(content))
-            row_count = sum(1 for row in csv_reader)
-            
-            if row_count > 1000:
-                return Response({
-                    "success": False,
-                    "msg": f"CSV file exceeds maximum allowed rows (1000). Current row count: {row_count}"
-                }, status=status.HTTP_400_BAD_REQUEST)
-                
+            row_count = upload_utils.save_validated_csv(input_file.chunks(), file_path)
+        except upload_utils.RowLimitExceeded as e:
+            shutil.rmtree(task_dir, ignore_errors=True)
+            return Response({
+                "success": False,
+                "msg": f"CSV file exceeds maximum allowed rows ({e.max_rows})"
+            }, status=status.HTTP_400_BAD_REQUEST)
         except UnicodeDecodeError:
+            shutil.rmtree(task_dir, ignore_errors=True)
             return Response({
                 "success": False,
                 "msg": "The file is not a valid UTF-8 encoded CSV file"
             }, status=status.HTTP_400_BAD_REQUEST)
-        except csv.Error:
+        except csv.Error as e:
+            shutil.rmtree(task_dir, ignore_errors=True)
             return Response({
                 "success": False,
-                "msg": "The file is not a valid CSV file"
+                "msg": f"The file is not a valid CSV file: {str(e)}"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 创建任务 UUID
-        task_uuid = uuid.uuid4()
-        
         # 准备数据 - 使用前端提供的所有参数，但移除input_file
         data = request.data.copy()
         data['uuid'] = task_uuid        
@@ -103,25 +105,11 @@ def submit_basic_annotation_task(request):
                 value_type=request.data.get('value_type', BasicAnnotationTask.ValueType.int),
                 email = request.data.get('email', ''),
             )
-            input_dir = os.path.join(settings.WORKSPACE_HOME, str(task_uuid), 'input')
-            output_dir = os.path.join(settings.WORKSPACE_HOME, str(task_uuid), 'output')
-            os.makedirs(input_dir, exist_ok=True)
             os.makedirs(output_dir, exist_ok=True)
 
-            # 手动将文件保存到指定位置，固定文件名为cna.csv
-            file_path = os.path.join(input_dir, 'cna.csv')
-            try:
-                with open(file_path, 'wb+') as destination:
-                    for chunk in input_file.chunks():
-                        destination.write(chunk)
-            except Exception as e:
-                return Response({
-                    "success": False,
-                    "msg": f"Failed to save input file: {str(e)}"
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
             # 启动异步任务处理
             
-            sbatch_basic_annotation_task(task_uuid)
+            task_executor.submit_basic_annotation_task(task_uuid)
             
             # 返回成功信息
             return Response({
@@ -143,6 +131,8 @@ def submit_basic_annotation_task(request):
                 }
             }, status=status.HTTP_201_CREATED)
         else:
+            shutil.rmtree(task_dir, ignore_errors=True)
+
             # 返回验证错误
             return Response({
                 "success": False,
@@ -187,8 +177,9 @@ def submit_recurrent_cna_task(request):
         task_uuid = uuid.uuid4()
         
         # 准备数据目录
-        input_dir = os.path.join(settings.WORKSPACE_HOME, str(task_uuid), 'input')
-        output_dir = os.path.join(settings.WORKSPACE_HOME, str(task_uuid), 'output')
+        task_dir = os.path.join(settings.WORKSPACE_HOME, str(task_uuid))
+        input_dir = os.path.join(task_dir, 'input')
+        output_dir = os.path.join(task_dir, 'output')
         os.makedirs(input_dir, exist_ok=True)
         os.makedirs(output_dir, exist_ok=True)
         
@@ -197,150 +188,114 @@ def submit_recurrent_cna_task(request):
         
         # 根据文件类型进行处理
         if file_extension == '.csv':
-            # 处理CSV文件
+            # 处理CSV文件：边校验边写入输入目录
+            csv_path = os.path.join(input_dir, 'cna.csv')
             try:
-                # 读取文件内容并计算行数
-                content = input_file.read().decode('utf-8')
-                input_file.seek(0)  # 重置文件指针
-                
-                # 使用csv模块验证格式并计算行数
-                csv_reader = csv.reader(io.StringIO(content))
-                row_count = sum(1 for row in csv_reader)
-                
-                if row_count > 1000:
-                    return Response({
-                        "success": False,
-                        "msg": f"CSV file exceeds maximum allowed rows (1000). Current row count: {row_count}"
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                    
-                # CSV文件通过验证，保存到输入目录
-                csv_path = os.path.join(input_dir, 'cna.csv')
-                with open(csv_path, 'wb') as dest_file:
-                    input_file.seek(0)
-                    for chunk in input_file.chunks():
-                        dest_file.write(chunk)
-                
-                # 添加到有效CSV文件列表
-                valid_csv_paths.append(csv_path)
-                
-                # CSV文件通过验证
-                file_info = {"type": "csv", "files": [{"name": file_name, "rows": row_count}]}
-                
+                row_count = upload_utils.save_validated_csv(input_file.chunks(), csv_path)
+            except upload_utils.RowLimitExceeded as e:
+                shutil.rmtree(task_dir, ignore_errors=True)
+                return Response({
+                    "success": False,
+                    "msg": f"CSV file exceeds maximum allowed rows ({e.max_rows})"
+                }, status=status.HTTP_400_BAD_REQUEST)
             except UnicodeDecodeError:
+                shutil.rmtree(task_dir, ignore_errors=True)
                 return Response({
                     "success": False,
                     "msg": "The file is not a valid UTF-8 encoded CSV file"
                 }, status=status.HTTP_400_BAD_REQUEST)
-            except csv.Error:
+            except csv.Error as e:
+                shutil.rmtree(task_dir, ignore_errors=True)
                 return Response({
                     "success": False,
-                    "msg": "The file is not a valid CSV file"
+                    "msg": f"The file is not a valid CSV file: {str(e)}"
                 }, status=status.HTTP_400_BAD_REQUEST)
+            
+            # 添加到有效CSV文件列表
+            valid_csv_paths.append(csv_path)
+            
+            # CSV文件通过验证
+            file_info = {"type": "csv", "files": [{"name": file_name, "rows": row_count}]}
                 
         elif file_extension == '.zip':
-            # 处理ZIP文件
+            # 处理ZIP文件：上传文件直接保存到输入目录，逐个成员流式校验，不整体解压
+            zip_destination = os.path.join(input_dir, file_name)
+            with open(zip_destination, 'wb') as dest_file:
+                for chunk in input_file.chunks():
+                    dest_file.write(chunk)
+            
             try:
-                # 创建临时目录用于解压文件
-                with tempfile.TemporaryDirectory() as temp_dir:
-                    # 保存上传的ZIP文件到临时文件
-                    temp_zip_path = os.path.join(temp_dir, file_name)
-                    with open(temp_zip_path, 'wb') as temp_file:
-                        for chunk in input_file.chunks():
-                            temp_file.write(chunk)
+                with zipfile.ZipFile(zip_destination, 'r') as zip_ref:
+                    csv_members = upload_utils.list_zip_csv_members(zip_ref)
                     
-                    # 解压ZIP文件到临时目录
-                    extracted_files = []
-                    with zipfile.ZipFile(temp_zip_path, 'r') as zip_ref:
-                        zip_ref.extractall(temp_dir)
-                        
-                        # 检查每个CSV文件
-                        csv_files = []
-                        for root, _, files in os.walk(temp_dir):
-                            for file in files:
-                                if file.lower().endswith('.csv'):
-                                    csv_files.append({"name": file, "path": os.path.join(root, file)})
+                    # 检查CSV文件数量
+                    if not csv_members:
+                        shutil.rmtree(task_dir, ignore_errors=True)
+                        return Response({
+                            "success": False,
+                            "msg": "ZIP file does not contain any CSV files"
+                        }, status=status.HTTP_400_BAD_REQUEST)
+                    
+                    if len(csv_members) > upload_utils.MAX_ZIP_CSV_FILES:
+                        shutil.rmtree(task_dir, ignore_errors=True)
+                        return Response({
+                            "success": False,
+                            "msg": f"ZIP file contains too many CSV files (maximum allowed: {upload_utils.MAX_ZIP_CSV_FILES}). Found: {len(csv_members)}"
+                        }, status=status.HTTP_400_BAD_REQUEST)
+                    
+                    # 验证每个CSV文件，校验通过的内容同时写入输入目录
+                    validated_csv_files = []
+                    for member in csv_members:
+                        csv_name = os.path.basename(member.filename)
+                        dst_path = os.path.join(input_dir, csv_name)
                         
-                        # 检查CSV文件数量
-                        if not csv_files:
+                        try:
+                            row_count = upload_utils.save_validated_csv(
+                                upload_utils.iter_zip_member_chunks(zip_ref, member), dst_path
+                            )
+                        except upload_utils.RowLimitExceeded as e:
+                            shutil.rmtree(task_dir, ignore_errors=True)
                             return Response({
                                 "success": False,
-                                "msg": "ZIP file does not contain any CSV files"
+                                "msg": f"CSV file '{csv_name}' in ZIP exceeds maximum allowed rows ({e.max_rows})"
                             }, status=status.HTTP_400_BAD_REQUEST)
-                        
-                        if len(csv_files) > 5:
+                        except UnicodeDecodeError:
+                            shutil.rmtree(task_dir, ignore_errors=True)
                             return Response({
                                 "success": False,
-                                "msg": f"ZIP file contains too many CSV files (maximum allowed: 5). Found: {len(csv_files)}"
+                                "msg": f"CSV file '{csv_name}' in ZIP is not a valid UTF-8 encoded file"
+                            }, status=status.HTTP_400_BAD_REQUEST)
+                        except csv.Error as e:
+                            shutil.rmtree(task_dir, ignore_errors=True)
+                            return Response({
+                                "success": False,
+                                "msg": f"CSV file '{csv_name}' in ZIP is not a valid CSV file: {str(e)}"
                             }, status=status.HTTP_400_BAD_REQUEST)
                         
-                        # 验证每个CSV文件
-                        validated_csv_files = []
-                        for csv_file in csv_files:
-                            file_path = csv_file["path"]
-                            file_name = csv_file["name"]
-                            
-                            # 分析CSV文件行数
-                            try:
-                                with open(file_path, 'r', encoding='utf-8') as f:
-                                    csv_reader = csv.reader(f)
-                                    row_count = sum(1 for row in csv_reader)
-                                    
-                                    if row_count > 1000:
-                                        return Response({
-                                            "success": False,
-                                            "msg": f"CSV file '{file_name}' in ZIP exceeds maximum allowed rows (1000). Current row count: {row_count}"
-                                        }, status=status.HTTP_400_BAD_REQUEST)
-                                    
-                                    validated_csv_files.append({
-                                        "name": file_name, 
-                                        "rows": row_count,
-                                        "path": file_path
-                                    })
-                                    
-                                    # 构建目标路径
-                                    dst_path = os.path.join(input_dir, file_name)
-                                    extracted_files.append((file_path, dst_path))
-                            except UnicodeDecodeError:
-                                return Response({
-                                    "success": False,
-                                    "msg": f"CSV file '{file_name}' in ZIP is not a valid UTF-8 encoded file"
-                                }, status=status.HTTP_400_BAD_REQUEST)
-                            except csv.Error:
-                                return Response({
-                                    "success": False,
-                                    "msg": f"CSV file '{file_name}' in ZIP is not a valid CSV file"
-                                }, status=status.HTTP_400_BAD_REQUEST)
-                    
-                    # 复制验证通过的文件到输入目录
-                    for src, dst in extracted_files:
-                        shutil.copy2(src, dst)
-                        valid_csv_paths.append(dst)  # 添加到有效CSV文件列表
-                    
-                    # ZIP文件内容通过验证
-                    file_info = {
-                        "type": "zip", 
-                        "file_count": len(validated_csv_files),
-                        "files": [{"name": f["name"], "rows": f["rows"]} for f in validated_csv_files]
-                    }
-                    
-                    # 复制上传的ZIP文件到输入目录
-                    zip_destination = os.path.join(input_dir, file_name)
-                    with open(zip_destination, 'wb') as dest_file:
-                        input_file.seek(0)
-                        for chunk in input_file.chunks():
-                            dest_file.write(chunk)
+                        validated_csv_files.append({"name": csv_name, "rows": row_count})
+                        valid_csv_paths.append(dst_path)  # 添加到有效CSV文件列表
+                
+                # ZIP文件内容通过验证
+                file_info = {
+                    "type": "zip", 
+                    "file_count": len(validated_csv_files),
+                    "files": validated_csv_files
+                }
                 
             except zipfile.BadZipFile:
+                shutil.rmtree(task_dir, ignore_errors=True)
                 return Response({
                     "success": False,
                     "msg": "The file is not a valid ZIP file"
                 }, status=status.HTTP_400_BAD_REQUEST)
             except Exception as e:
+                shutil.rmtree(task_dir, ignore_errors=True)
                 return Response({
                     "success": False,
                     "msg": f"Error processing ZIP file: {str(e)}"
                 }, status=status.HTTP_400_BAD_REQUEST)
         else:
+            shutil.rmtree(task_dir, ignore_errors=True)
             return Response({
                 "success": False,
                 "msg": "Input file must be a CSV or ZIP file"
@@ -379,7 +334,7 @@ def submit_recurrent_cna_task(request):
             )
             
             # 启动异步任务处理 (如果需要)
-            sbatch_recurrent_cna_task(str(task_uuid), input_files_str)
+            task_executor.submit_recurrent_cna_task(str(task_uuid), input_files_str)
             
             # 返回成功信息
             response_data = {
@@ -450,123 +405,35 @@ def query_task(request):
                 "msg": "Invalid Task UUID format"
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # 尝试确定任务类型并查询相应的任务记录
-        task = None
-        task_type = None
-        
-        # 首先尝试查找BasicAnnotationTask
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        # 一次查询确定任务类型并取得任务记录，已结束的任务直接来自进程内缓存
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
         
+        task_type = type(task).__name__
+
         # 选择适当的序列化器
         if task_type == "BasicAnnotationTask":
             serializer = BasicAnnotationTaskSerializer
-            success_status = BasicAnnotationTask.Status.Success
-            failed_status = BasicAnnotationTask.Status.Failed
-            running_status = BasicAnnotationTask.Status.Running
-            pending_status = BasicAnnotationTask.Status.Pending
         else:  # RecurrentCNATask
             serializer = RecurrentCNATaskSerializer
-            success_status = RecurrentCNATask.Status.Success
-            failed_status = RecurrentCNATask.Status.Failed
-            running_status = RecurrentCNATask.Status.Running
-            pending_status = BasicAnnotationTask.Status.Pending
 
-        
-        # 如果任务已经完成或失败，直接返回任务信息
-        if task.status in [success_status, failed_status]:
-            return Response({
-                "success": True,
-                "data": serializer(task).data,
-                "task_type": task_type
-            }, status=status.HTTP_200_OK)
-        
-        # 查询Slurm中的任务状态
-        task_status = squeue_by_job_name(str(task.uuid))
-        
-        # 处理不同的任务状态
-        if task_status == 'empty':
-            # 任务不在队列中，检查状态文件
-            status_file_path = os.path.join(settings.WORKSPACE_HOME, str(task.uuid), 'output', 'status.txt')
-            try:
-                with open(status_file_path, 'r') as status_file:
-                    # 解析完成时间
-                    finish_time_str = status_file.readline().strip()
-                    task.finish_time = timezone.make_aware(
-                        datetime.strptime(finish_time_str, '%Y-%m-%d %H:%M:%S')
-                    )
-                    
-                    # 解析状态
-                    raw_status = status_file.readline().strip()
-                    if raw_status == 'success':
-                        task.status = success_status
-                    else:
-                        task.status = failed_status
-                    
-                    # 保存更新后的任务状态
-                    task.save()
-                    
-                    return Response({
-                        "success": True,
-                        "data": serializer(task).data,
-                        "task_type": task_type
-                    }, status=status.HTTP_200_OK)
-            except FileNotFoundError:
-                return Response({
-                    "success": False,
-                    "msg": "Status file not found. The task may be in an inconsistent state.",
-                    "task_type": task_type
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-            except Exception as e:
-                return Response({
-                    "success": False,
-                    "msg": f"Error reading status file: {str(e)}",
-                    "task_type": task_type
-                }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
-        
-        elif task_status == 'R':
-            # 任务正在运行
-            task.status = running_status
-            task.save()
-            
-            return Response({
-                "success": True,
-                "data": serializer(task).data,
-                "task_type": task_type
-            }, status=status.HTTP_200_OK)
-        
-        elif task_status.startswith('PD'):
-            # 任务正在队列中等待
-            task.status = pending_status
-            task.save()
+        # 状态由 poll_task_status 定期写入数据库，请求中不调用 squeue；状态过期说明轮询服务未运行，记录日志
+        task_utils.warn_if_status_stale(task)
+
+        data = serializer(task).data
+        if task.status == task.Status.Pending and task.queue_position is not None:
+            data['position'] = str(task.queue_position)
 
-            data = serializer(task).data
-            data['position'] = task_status.split(' ')[1]
-            
-            return Response({
-                "success": True,
-                "data": data,
-                "task_type": task_type
-            }, status=status.HTTP_200_OK)
-        
-        # 其他状态情况
         return Response({
-            "success": False,
-            "msg": f"Unknown task status: {task_status}",
+            "success": True,
+            "data": data,
             "task_type": task_type
-        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        }, status=status.HTTP_200_OK)
         
     except Exception as e:
         # 捕获所有其他异常
@@ -599,7 +466,6 @@ def run_demo(request):
         if name == 'TCGA-ACC':
             input_file_path = os.path.join(demo_data_folder, 'TCGA-ACC.ascatNGS.cna.csv')
             input_file = os.path.join(input_dir, 'cna.csv')
-            shutil.copy(input_file_path, input_file)
             task = BasicAnnotationTask.objects.create(
                 uuid=task_uuid,
                 user=task_uuid,
@@ -611,11 +477,11 @@ def run_demo(request):
                 window_type=BasicAnnotationTask.WindowType.bin,
                 value_type=BasicAnnotationTask.ValueType.int
             )
-            sbatch_basic_annotation_task(task_uuid)
+            if not dedup_utils.prepare_demo_task(task, [(input_file_path, input_file)]):
+                task_executor.submit_basic_annotation_task(task_uuid)
         elif name == 'WCDT-MCRPC':
             input_file_path = os.path.join(demo_data_folder, 'WCDT-MCRPC.GATK4_CNV.cna.csv')
             input_file = os.path.join(input_dir, 'cna.csv')
-            shutil.copy(input_file_path, input_file)
             task = BasicAnnotationTask.objects.create(
                 uuid=task_uuid,
                 user=task_uuid,
@@ -627,11 +493,11 @@ def run_demo(request):
                 window_type=BasicAnnotationTask.WindowType.bin,
                 value_type=BasicAnnotationTask.ValueType.log
             )
-            sbatch_basic_annotation_task(task_uuid)
+            if not dedup_utils.prepare_demo_task(task, [(input_file_path, input_file)]):
+                task_executor.submit_basic_annotation_task(task_uuid)
         elif name == 'BRCA-T10':
             input_file_path = os.path.join(demo_data_folder, 'T10_cna.csv')
             input_file = os.path.join(input_dir, 'cna.csv')
-            shutil.copy(input_file_path, input_file)
             task = BasicAnnotationTask.objects.create(
                 uuid=task_uuid,
                 user=task_uuid,
@@ -643,14 +509,13 @@ def run_demo(request):
                 window_type=BasicAnnotationTask.WindowType.bin,
                 value_type=BasicAnnotationTask.ValueType.int
             )
-            sbatch_basic_annotation_task(task_uuid)
+            if not dedup_utils.prepare_demo_task(task, [(input_file_path, input_file)]):
+                task_executor.submit_basic_annotation_task(task_uuid)
         elif name == 'LUAD':
             cna1 = os.path.join(demo_data_folder, 'CPTAC-LUAD.ascatNGS.cna.csv')
             cna2 = os.path.join(demo_data_folder, 'APOLLO-LUAD.ascatNGS.cna.csv')
             input_file1 = os.path.join(input_dir, 'CPTAC-LUAD.ascatNGS.cna.csv')
             input_file2 = os.path.join(input_dir, 'APOLLO-LUAD.ascatNGS.cna.csv')
-            shutil.copy(cna1, input_file1)
-            shutil.copy(cna2, input_file2)
             input_file = ','.join([input_file1, input_file2])
             task = RecurrentCNATask.objects.create(
                 uuid=task_uuid,
@@ -659,14 +524,13 @@ def run_demo(request):
                 ref=RecurrentCNATask.Ref.hg19,
                 obs_type=RecurrentCNATask.ObsType.bulk,
             )
-            sbatch_recurrent_cna_task(task_uuid, input_file)
+            if not dedup_utils.prepare_demo_task(task, [(cna1, input_file1), (cna2, input_file2)]):
+                task_executor.submit_recurrent_cna_task(task_uuid, input_file)
         elif name == 'LUSC':
             cna1 = os.path.join(demo_data_folder, 'TCGA-LUSC.ascatNGS.cna.csv')
             cna2 = os.path.join(demo_data_folder, 'CPTAC-LUSC.ascatNGS.cna.csv')
             input_file1 = os.path.join(input_dir, 'TCGA-LUSC.ascatNGS.cna.csv')
             input_file2 = os.path.join(input_dir, 'CPTAC-LUSC.ascatNGS.cna.csv')
-            shutil.copy(cna1, input_file1)
-            shutil.copy(cna2, input_file2)
             input_file = ','.join([input_file1, input_file2])
             task = RecurrentCNATask.objects.create(
                 uuid=task_uuid,
@@ -675,15 +539,14 @@ def run_demo(request):
                 ref=RecurrentCNATask.Ref.hg19,
                 obs_type=RecurrentCNATask.ObsType.bulk,
             )
-            sbatch_recurrent_cna_task(task_uuid, input_file)
+            if not dedup_utils.prepare_demo_task(task, [(cna1, input_file1), (cna2, input_file2)]):
+                task_executor.submit_recurrent_cna_task(task_uuid, input_file)
 
         elif name == 'COAD':
             cna1 = os.path.join(demo_data_folder, 'SRP017032.Ginkgo.cna.csv')
             cna2 = os.path.join(demo_data_folder, 'SRP093555.Ginkgo.cna.csv')
             input_file1 = os.path.join(input_dir, 'SRP017032.Ginkgo.cna.csv')
             input_file2 = os.path.join(input_dir, 'SRP093555.Ginkgo.cna.csv')
-            shutil.copy(cna1, input_file1)
-            shutil.copy(cna2, input_file2)
             input_file = ','.join([input_file1, input_file2])
             task = RecurrentCNATask.objects.create(
                 uuid=task_uuid,
@@ -692,7 +555,8 @@ def run_demo(request):
                 ref=RecurrentCNATask.Ref.hg19,
                 obs_type=RecurrentCNATask.ObsType.single,
             )
-            sbatch_recurrent_cna_task(task_uuid, input_file)
+            if not dedup_utils.prepare_demo_task(task, [(cna1, input_file1), (cna2, input_file2)]):
+                task_executor.submit_recurrent_cna_task(task_uuid, input_file)
         
         if name in ['TCGA-ACC', 'WCDT-MCRPC', 'BRCA-T10']:
             # 返回成功信息
@@ -746,20 +610,13 @@ def download_task_data(request):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
         if task.status != task.Status.Success:
             return Response({'detail': 'The task is not completed yet.'}, status=status.HTTP_400_BAD_REQUEST)
         
@@ -804,60 +661,36 @@ def download_task_data(request):
                 status=404
             )
         
-        # 创建临时ZIP文件
-        with tempfile.NamedTemporaryFile(suffix='.zip', delete=False) as temp_file:
-            temp_path = temp_file.name
-        
-        # 创建ZIP文件并添加存在的文件
-        try:
-            with zipfile.ZipFile(temp_path, 'w', zipfile.ZIP_DEFLATED) as zipf:
-                file_names = {}  # 跟踪已添加的文件名，处理重复
-                
-                for file_path in existing_files:
-                    # 获取基本文件名
-                    base_name = os.path.basename(file_path)
-                    
-                    # 处理文件名重复
-                    if base_name in file_names.values():
-                        # 添加路径的部分哈希作为前缀
-                        import hashlib
-                        dir_name = os.path.dirname(file_path)
-                        hash_prefix = hashlib.md5(dir_name.encode()).hexdigest()[:8]
-                        unique_name = f"{hash_prefix}_{base_name}"
-                        
-                        counter = 1
-                        while unique_name in file_names.values():
-                            unique_name = f"{hash_prefix}_{base_name}_{counter}"
-                            counter += 1
-                        
-                        zipf.write(file_path, unique_name)
-                        file_names[file_path] = unique_name
-                    else:
-                        zipf.write(file_path, base_name)
-                        file_names[file_path] = base_name
-            
-            # 读取ZIP文件内容
-            with open(temp_path, 'rb') as f:
-                zip_content = f.read()
-            
-            # 创建HTTP响应
-            response = HttpResponse(zip_content, content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{task_uuid}_files.zip"'
-            
-            # 删除临时文件
-            os.unlink(temp_path)
-            
-            return response
-        
-        except Exception as e:
-            # 确保清理临时文件
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+        # 计算ZIP中的文件名，处理重复
+        file_names = {}
+        for file_path in existing_files:
+            # 获取基本文件名
+            base_name = os.path.basename(file_path)
             
-            return Response(
-                {"error": f"Failed to create download file: {str(e)}"}, 
-                status=500
-            )
+            # 处理文件名重复
+            if base_name in file_names.values():
+                # 添加路径的部分哈希作为前缀
+                dir_name = os.path.dirname(file_path)
+                hash_prefix = hashlib.md5(dir_name.encode()).hexdigest()[:8]
+                unique_name = f"{hash_prefix}_{base_name}"
+                
+                counter = 1
+                while unique_name in file_names.values():
+                    unique_name = f"{hash_prefix}_{base_name}_{counter}"
+                    counter += 1
+                
+                file_names[file_path] = unique_name
+            else:
+                file_names[file_path] = base_name
+        
+        # 边压缩边输出，不生成临时文件；已压缩的 .gz 文件直接存储
+        response = StreamingHttpResponse(
+            zip_utils.iter_zip_stream(file_names.items()),
+            content_type='application/zip'
+        )
+        response['Content-Disposition'] = f'attachment; filename="{task_uuid}_files.zip"'
+        
+        return response
     
     except Exception as e:
         return Response(
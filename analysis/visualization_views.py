@@ -1,10 +1,9 @@
 import os
-import csv
-import json
 
 import pyarrow.parquet as pq
 import pandas as pd
 
+from django.conf import settings
 from django.http import HttpResponse
 
 from rest_framework import status
@@ -12,7 +11,8 @@ from rest_framework.views import APIView
 from rest_framework.response import Response
 
 from .models import *
-from analysis.utils import path_utils, matrix_utils, recurrent_utils
+from analysis.utils import path_utils, matrix_utils, recurrent_utils, task_utils, result_cache_utils
+from database.utils import recurrent_utils as database_recurrent_utils
 
 
 class CNAMatrixView(APIView):
@@ -22,45 +22,22 @@ class CNAMatrixView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
 
-        matrix_path = task.get_input_file_absolute_path()
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="matrix.csv"'
+        matrix_path = task.get_input_file_absolute_path()
 
         try:
-            with open(matrix_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 仅将表头第一列改为 'id'，从原文件流式返回
+            return result_cache_utils.build_csv_result_response(request, task, matrix_path, 'matrix.csv')
         except FileNotFoundError:
             return Response('CNA matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class CNAMetaView(APIView):
     def get(self, request):
@@ -69,46 +46,23 @@ class CNAMetaView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         meta_path = os.path.join(output_dir, f'{task_uuid}_meta_scsvas.csv')
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="meta.csv"'
-
         try:
-            with open(meta_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 仅将表头第一列改为 'id'，从原文件流式返回
+            return result_cache_utils.build_csv_result_response(request, task, meta_path, 'meta.csv')
         except FileNotFoundError:
             return Response('CNA meta file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class CNATreeView(APIView):
     def get(self, request):
@@ -117,32 +71,25 @@ class CNATreeView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         tree_path = os.path.join(output_dir, f'{task_uuid}_cut50.json')
 
         try:
-            with open(tree_path, 'r') as file:
-                content = file.read()
+            return result_cache_utils.build_result_response(
+                request, task, 'tree.json', 'application/json',
+                lambda: result_cache_utils.read_json_text_body(tree_path)
+            )
         except FileNotFoundError:
             return Response('CNA tree file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return Response(content)
-
 
 class CNAGeneListView(APIView):
     def get(self, request):
@@ -151,32 +98,26 @@ class CNAGeneListView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         gene_matrix_path = os.path.join(output_dir, f'{task_uuid}_gene_cna.parquet')
 
-        try:
+        def build():
             header = pq.read_schema(gene_matrix_path).names[1:]
-        except FileNotFoundError:
-            return Response('CNA gene matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        data = [{"id": idx, "gene": gene} for idx, gene in enumerate(header)]
+            return result_cache_utils.render_json([{"id": idx, "gene": gene} for idx, gene in enumerate(header)])
 
-        return Response(data, status=status.HTTP_200_OK)
+        try:
+            return result_cache_utils.build_result_response(request, task, 'genes.json', 'application/json', build)
+        except FileNotFoundError:
+            return Response('CNA gene matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
 
 class CNANewickView(APIView):
@@ -186,32 +127,25 @@ class CNANewickView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         newick_path = os.path.join(output_dir, f'{task_uuid}.nwk')
 
         try:
-            with open(newick_path, 'r') as file:
-                content = file.read()
+            return result_cache_utils.build_result_response(
+                request, task, 'newick.json', 'application/json',
+                lambda: result_cache_utils.read_json_text_body(newick_path)
+            )
         except FileNotFoundError:
             return Response('Newick file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return Response(content)
-
 
 class CNAGeneMatrixView(APIView):
     def post(self, request):
@@ -221,20 +155,13 @@ class CNAGeneMatrixView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         gene_matrix_path = os.path.join(output_dir, f'{task_uuid}_gene_cna.parquet')
@@ -268,32 +195,26 @@ class CNATermListView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         term_matrix_path = os.path.join(output_dir, f'{task_uuid}_term_cna.parquet')
 
-        try:
+        def build():
             header = pq.read_schema(term_matrix_path).names[1:]
-        except FileNotFoundError:
-            return Response('CNA gene matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        data = [{"id": idx, "gene": gene} for idx, gene in enumerate(header)]
+            return result_cache_utils.render_json([{"id": idx, "gene": gene} for idx, gene in enumerate(header)])
 
-        return Response(data, status=status.HTTP_200_OK)
+        try:
+            return result_cache_utils.build_result_response(request, task, 'terms.json', 'application/json', build)
+        except FileNotFoundError:
+            return Response('CNA gene matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
 
 class CNATermMatrixView(APIView):
@@ -304,20 +225,13 @@ class CNATermMatrixView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         term_matrix_path = os.path.join(output_dir, f'{task_uuid}_term_cna.parquet')
@@ -350,20 +264,13 @@ class FocalCNAInfoView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
 
@@ -379,18 +286,23 @@ class FocalCNAInfoView(APIView):
         del_gene_path = os.path.join(output_dir, f'gistic_{file_name_without_extension}', 'del_genes.conf_95.txt')
         scores_path = os.path.join(output_dir, f'gistic_{file_name_without_extension}', 'scores.gistic')
 
-        amp_regions_info = recurrent_utils.parse_recurrent_regions(amp_gene_path)
-        del_regions_info = recurrent_utils.parse_recurrent_regions(del_gene_path)
-        recurrent_scores_data = recurrent_utils.parse_recurrent_scores(scores_path)
+        def build():
+            recurrent_scores_data = recurrent_utils.parse_recurrent_scores(scores_path)
 
-        if recurrent_scores_data is None:
-            return Response({'error': 'No recurrent scores data found.'}, status=status.HTTP_400_BAD_REQUEST)
+            # scores 文件缺失时不写入缓存
+            if recurrent_scores_data is None:
+                raise FileNotFoundError(scores_path)
+
+            return result_cache_utils.render_json({
+                'amp': recurrent_utils.parse_recurrent_regions(amp_gene_path),
+                'del': recurrent_utils.parse_recurrent_regions(del_gene_path),
+                'scores': recurrent_scores_data
+            })
 
-        return Response({
-            'amp': amp_regions_info,
-            'del': del_regions_info,
-            'scores': recurrent_scores_data
-        }, status=status.HTTP_200_OK)
+        try:
+            return result_cache_utils.build_result_response(request, task, 'focal_cna_info.json', 'application/json', build)
+        except FileNotFoundError:
+            return Response({'error': 'No recurrent scores data found.'}, status=status.HTTP_400_BAD_REQUEST)
 
 
 class GeneRecurrenceQueryView(APIView):
@@ -408,57 +320,47 @@ class GeneRecurrenceQueryView(APIView):
             page_size = int(page_size) if page_size else 8
         except ValueError:
             return Response({'detail': 'Invalid page or page_size value.'}, status=status.HTTP_400_BAD_REQUEST)
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
-
-        output_dir = task.get_output_dir_absolute_path()
-        recurrence_file_path = os.path.join(output_dir, f'{task_uuid}_recurrent.json')
 
-        try:
-            with open(recurrence_file_path, 'r') as f:
-                recurrence_data = json.load(f)
-        except FileNotFoundError:
-            return Response('Recurrence file not found!', status=status.HTTP_404_NOT_FOUND)
+        # 每种 page / page_size 组合对应一个缓存文件，限制 page_size 的范围
+        if page < 1 or not 1 <= page_size <= settings.RECURRENCE_MAX_PAGE_SIZE:
+            return Response({'detail': 'Invalid page or page_size value.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 获取所有的 dataset 键
-        datasets = recurrence_data.get('datasets', {})
-        dataset_keys = list(datasets.keys())
+        task = task_utils.get_task(task_uuid)
 
-        # 排序 dataset_keys
-        dataset_keys.sort()
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
-        # 计算分页的开始和结束索引
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
+        output_dir = task.get_output_dir_absolute_path()
+        recurrence_file_path = os.path.join(output_dir, f'{task_uuid}_recurrent.json')
+        page_total = {}
 
-        # 获取当前页的 dataset 键
-        paged_keys = dataset_keys[start_index:end_index]
+        def build():
+            # 成功任务使用 SQLite 分页索引，只解码当前页的样本
+            index_path = result_cache_utils.ensure_recurrent_index(task, recurrence_file_path)
+            total, paged_profiles = database_recurrent_utils.query_recurrent_profiles(
+                recurrence_file_path, index_path, page, page_size
+            )
+            page_total['total'] = total
 
-        # 获取前缀
-        prefix = f'{task_uuid}_'
+            # 获取前缀
+            prefix = f'{task_uuid}_'
 
-        # 根据分页后的键获取对应的数据
-        paged_datasets = {
-            key.replace(prefix, ''): recurrent_utils.parse_recurrent_profiles(datasets[key])
-            for key in paged_keys
-        }
+            return result_cache_utils.render_json({
+                'total': total,
+                'data': {key.replace(prefix, ''): profile for key, profile in paged_profiles}
+            })
 
-        return Response({
-            'total': len(dataset_keys),
-            'data': paged_datasets
-        }, status=status.HTTP_200_OK)
+        try:
+            return result_cache_utils.build_result_response(
+                request, task, f'recurrence_{page}_{page_size}.json', 'application/json', build,
+                # 超出总数的空页不写入缓存
+                cacheable=lambda: (page - 1) * page_size < page_total['total']
+            )
+        except FileNotFoundError:
+            return Response('Recurrence file not found!', status=status.HTTP_404_NOT_FOUND)
 
 
 class PloidyDistributionView(APIView):
@@ -468,30 +370,24 @@ class PloidyDistributionView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         matrix_path = task.get_input_file_absolute_path()
 
         try:
-            bin_abundance_list = matrix_utils.calculate_abundance(matrix_path)
+            return result_cache_utils.build_result_response(
+                request, task, 'ploidy_distribution.json', 'application/json',
+                lambda: result_cache_utils.render_json(matrix_utils.calculate_abundance(matrix_path))
+            )
         except FileNotFoundError:
             return Response({'error': 'Matrix file not found!'}, status=status.HTTP_404_NOT_FOUND)
 
-        return Response(bin_abundance_list)
-
 
 class TopCNVarianceView(APIView):
     def get(self, request):
@@ -500,46 +396,23 @@ class TopCNVarianceView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameters.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
+
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
 
         output_dir = task.get_output_dir_absolute_path()
         matrix_path = os.path.join(output_dir, f'{task_uuid}_top_CN_variance.csv')
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="matrix.csv"'
-
         try:
-            with open(matrix_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 仅将表头第一列改为 'id'，从原文件流式返回
+            return result_cache_utils.build_csv_result_response(request, task, matrix_path, 'matrix.csv')
         except FileNotFoundError:
             return Response('CNA matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class CNAVectorView(APIView):
     def post(self, request):
@@ -549,22 +422,15 @@ class CNAVectorView(APIView):
         if not task_uuid:
             return Response({'detail': 'Missing required parameter: task id.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            task = BasicAnnotationTask.objects.get(pk=task_uuid)
-            task_type = "BasicAnnotationTask"
-        except BasicAnnotationTask.DoesNotExist:
-            # 如果不是BasicAnnotationTask，尝试查找RecurrentCNATask
-            try:
-                task = RecurrentCNATask.objects.get(pk=task_uuid)
-                task_type = "RecurrentCNATask"
-            except RecurrentCNATask.DoesNotExist:
-                # 两种类型都不是，返回404
-                return Response({
-                    "success": False,
-                    "msg": f"Task with UUID {task_uuid} not found in any task type"
-                }, status=status.HTTP_404_NOT_FOUND)
+        task = task_utils.get_task(task_uuid)
 
-        matrix_path = task.get_input_file_absolute_path()
+        if task is None:
+            return Response({
+                "success": False,
+                "msg": f"Task with UUID {task_uuid} not found in any task type"
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        matrix_path = result_cache_utils.ensure_matrix_parquet(task)
 
         try:
             # 提取 Term 的 CNA 矩阵
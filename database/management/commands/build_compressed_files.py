@@ -0,0 +1,52 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from database.models import Dataset
+from database.utils import path_utils, response_utils, compress_utils
+
+
+class Command(BaseCommand):
+    help = 'Write precompressed .zst/.gz copies of the static matrix, meta, tree and newick responses.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', default=[], help='Only process the given dataset(s).')
+        parser.add_argument('--force', action='store_true', help='Recompress files that are already up to date.')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.all()
+
+        if options['dataset']:
+            datasets = datasets.filter(name__in=options['dataset'])
+
+        for dataset in datasets:
+            for workflow, bin_size in path_utils.get_dataset_workflow_bin_sizes(dataset):
+                # 预压缩内容与对应接口的响应体一致
+                files = [
+                    (path_utils.get_dataset_matrix_path(dataset, workflow, bin_size), response_utils.iter_csv_body),
+                    (path_utils.get_dataset_meta_path(dataset, workflow, bin_size), response_utils.iter_csv_body),
+                    (path_utils.get_dataset_newick_path(dataset, workflow, bin_size), response_utils.iter_json_text_body),
+                ]
+
+                try:
+                    tree_path = path_utils.get_dataset_tree_path(dataset, workflow, bin_size)
+                except FileNotFoundError:
+                    tree_path = None
+
+                if tree_path is not None:
+                    files.append((tree_path, response_utils.iter_json_text_body))
+
+                for file_path, iter_body in files:
+                    if not os.path.exists(file_path):
+                        continue
+
+                    try:
+                        written = compress_utils.write_sidecars(
+                            file_path, lambda: iter_body(file_path), force=options['force']
+                        )
+                    except Exception as e:
+                        self.stderr.write(f'Failed to compress {file_path}: {e}')
+                        continue
+
+                    if written:
+                        self.stdout.write(f'{file_path}: {", ".join(written)}')
@@ -0,0 +1,50 @@
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from CNAScope_api.constant import DOWNLOAD_ZIP_HOME
+from database.models import Dataset
+from database.utils import download_utils
+
+
+class Command(BaseCommand):
+    help = 'Build the per-dataset download ZIPs in parallel, skipping datasets whose files are unchanged.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', default=[], help='Only process the given dataset(s).')
+        parser.add_argument('--force', action='store_true', help='Rebuild archives that are already up to date.')
+        parser.add_argument('--workers', type=int, default=os.cpu_count(), help='Number of worker processes.')
+        parser.add_argument('--output-dir', default=DOWNLOAD_ZIP_HOME, help='Directory the archives are written to.')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.all()
+
+        if options['dataset']:
+            datasets = datasets.filter(name__in=options['dataset'])
+
+        output_dir = options['output_dir']
+        empty_log_path = os.path.join(output_dir, 'empty_zip_log.txt')
+
+        # 文件列表在主进程中生成，子进程只做文件读写，不访问数据库
+        jobs = [
+            (dataset.name, download_utils.build_dataset_download_files(dataset), os.path.join(output_dir, f'{dataset.name}.zip'))
+            for dataset in datasets
+        ]
+
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            futures = {
+                executor.submit(
+                    download_utils.build_dataset_zip, name, files_config, zip_path, options['force'], empty_log_path
+                ): name
+                for name, files_config, zip_path in jobs
+            }
+
+            for future in as_completed(futures):
+                try:
+                    name, state, file_count, elapsed = future.result()
+                except Exception as e:
+                    self.stderr.write(f'Failed to build {futures[future]}: {e}')
+                    continue
+
+                self.stdout.write(f'{name}: {state}, {file_count} files, {elapsed:.1f}s')
@@ -0,0 +1,53 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from database.models import Dataset
+from database.utils import path_utils, gene_index_utils
+
+
+class Command(BaseCommand):
+    help = 'Build the gene-major CNA index used by cross-dataset gene queries.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Rebuild the whole index.')
+        parser.add_argument('--index-path', default=path_utils.get_gene_cna_index_path(),
+                            help='SQLite file the index is written to.')
+
+    def handle(self, *args, **options):
+        amp_threshold = settings.GENE_CNA_AMP_THRESHOLD
+        del_threshold = settings.GENE_CNA_DEL_THRESHOLD
+
+        conn, indexed = gene_index_utils.prepare_gene_index(
+            options['index_path'], amp_threshold, del_threshold, force=options['force']
+        )
+        current_keys = set()
+
+        try:
+            for dataset in Dataset.objects.all():
+                for workflow, bin_size in path_utils.get_dataset_workflow_bin_sizes(dataset):
+                    gene_matrix_path = path_utils.get_dataset_gene_matrix_path(dataset, workflow, bin_size)
+
+                    if not os.path.exists(gene_matrix_path):
+                        continue
+
+                    key = gene_index_utils.get_source_key(dataset.name, workflow, bin_size)
+                    current_keys.add(key)
+
+                    try:
+                        result = gene_index_utils.update_gene_index_source(
+                            conn, indexed, dataset.name, workflow, bin_size, gene_matrix_path,
+                            amp_threshold, del_threshold
+                        )
+                    except Exception as e:
+                        self.stderr.write(f'Failed to index {gene_matrix_path}: {e}')
+                        continue
+
+                    if result is not None:
+                        self.stdout.write(f'{key}: {result[0]} samples, {result[1]} genes')
+
+            for key in gene_index_utils.remove_stale_sources(conn, indexed, current_keys):
+                self.stdout.write(f'{key}: removed')
+        finally:
+            conn.close()
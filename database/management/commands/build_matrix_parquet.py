@@ -0,0 +1,42 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from database.models import Dataset
+from database.utils import path_utils, matrix_utils
+
+
+class Command(BaseCommand):
+    help = 'Convert bin-level CNA matrices (.cna.csv) to column-chunked Parquet sidecars.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', default=[], help='Only convert the given dataset(s).')
+        parser.add_argument('--force', action='store_true', help='Rebuild sidecars that are already up to date.')
+        parser.add_argument('--row-group-size', type=int, default=matrix_utils.MATRIX_ROW_GROUP_SIZE)
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.all()
+
+        if options['dataset']:
+            datasets = datasets.filter(name__in=options['dataset'])
+
+        for dataset in datasets:
+            for workflow, bin_size in path_utils.get_dataset_workflow_bin_sizes(dataset):
+                matrix_path = path_utils.get_dataset_matrix_path(dataset, workflow, bin_size)
+                parquet_path = path_utils.get_matrix_parquet_path(matrix_path)
+
+                if not os.path.exists(matrix_path):
+                    continue
+
+                if not options['force'] and matrix_utils.is_parquet_sidecar_fresh(matrix_path, parquet_path):
+                    continue
+
+                try:
+                    rows, bins = matrix_utils.convert_matrix_csv_to_parquet(
+                        matrix_path, parquet_path, options['row_group_size']
+                    )
+                except Exception as e:
+                    self.stderr.write(f'Failed to convert {matrix_path}: {e}')
+                    continue
+
+                self.stdout.write(f'{parquet_path}: {rows} rows x {bins} bins')
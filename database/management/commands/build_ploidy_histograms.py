@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from database.models import Dataset
+from database.utils import path_utils, matrix_utils
+
+
+class Command(BaseCommand):
+    help = 'Precompute ploidy distribution histograms for every dataset/workflow/bin_size.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', default=[], help='Only process the given dataset(s).')
+        parser.add_argument('--force', action='store_true', help='Recompute histograms that are already up to date.')
+        parser.add_argument('--chunk-rows', type=int, default=matrix_utils.HISTOGRAM_CHUNK_ROWS,
+                            help='Number of matrix rows held in memory at a time.')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.all()
+
+        if options['dataset']:
+            datasets = datasets.filter(name__in=options['dataset'])
+
+        for dataset in datasets:
+            for workflow, bin_size in path_utils.get_dataset_workflow_bin_sizes(dataset):
+                matrix_path = path_utils.get_dataset_matrix_path(dataset, workflow, bin_size)
+
+                if not os.path.exists(matrix_path):
+                    continue
+
+                # 源矩阵 mtime 未变化时跳过
+                if not options['force'] and matrix_utils.load_abundance_sidecar(matrix_path) is not None:
+                    continue
+
+                try:
+                    histogram = matrix_utils.build_abundance_sidecar(matrix_path, options['chunk_rows'])
+                except Exception as e:
+                    self.stderr.write(f'Failed to build histogram for {matrix_path}: {e}')
+                    continue
+
+                self.stdout.write(f'{path_utils.get_matrix_histogram_path(matrix_path)}: {len(histogram)} bins')
@@ -0,0 +1,39 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from database.models import Dataset
+from database.utils import path_utils, recurrent_utils
+
+
+class Command(BaseCommand):
+    help = 'Build SQLite page indexes for the gene recurrence JSON files.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset', action='append', default=[], help='Only process the given dataset(s).')
+        parser.add_argument('--force', action='store_true', help='Rebuild indexes that are already up to date.')
+
+    def handle(self, *args, **options):
+        datasets = Dataset.objects.all()
+
+        if options['dataset']:
+            datasets = datasets.filter(name__in=options['dataset'])
+
+        for dataset in datasets:
+            for workflow, bin_size in path_utils.get_dataset_workflow_bin_sizes(dataset):
+                json_path = path_utils.get_dataset_recurrent_json_path(dataset, workflow, bin_size)
+                index_path = path_utils.get_recurrent_index_path(json_path)
+
+                if not os.path.exists(json_path):
+                    continue
+
+                if not options['force'] and recurrent_utils.is_recurrent_index_fresh(json_path, index_path):
+                    continue
+
+                try:
+                    total = recurrent_utils.build_recurrent_index(json_path, index_path)
+                except Exception as e:
+                    self.stderr.write(f'Failed to index {json_path}: {e}')
+                    continue
+
+                self.stdout.write(f'{index_path}: {total} samples')
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.23 on 2026-10-18 08:39
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("database", "0004_dataset_after_qc_ratio_dataset_raw_cn_scale_and_more"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="bulksamplemetadata",
+            index=models.Index(
+                fields=["dataset", "sample_id"], name="bulk_sample_dataset_sample"
+            ),
+        ),
+    ]
@@ -64,3 +64,9 @@ class BulkSampleMetadata(models.Model):
     # Time Information
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        # 导入脚本按 (dataset, sample_id) 增量更新
+        indexes = [
+            models.Index(fields=['dataset', 'sample_id'], name='bulk_sample_dataset_sample'),
+        ]
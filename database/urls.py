@@ -19,9 +19,11 @@ urlpatterns = [
     path('CNA_gene_matrix/', visualization_views.CNAGeneMatrixView.as_view(), name='CNA-gene-matrix'),
     path('CNA_terms/', visualization_views.CNATermListView.as_view(), name='CNA-term-list'),
     path('CNA_term_matrix/', visualization_views.CNATermMatrixView.as_view(), name='CNA-term-matrix'),
+    path('CNA_matrix_batch/', visualization_views.CNAMatrixBatchView.as_view(), name='CNA-matrix-batch'),
     path('focal_CNA_options/', visualization_views.FocalCNAOptionsView.as_view(), name='CNA-options'),
     path('focal_CNA_info/', visualization_views.FocalCNAInfoView.as_view(), name='focal-CNA-info'),
     path('gene_recurrence_query/', visualization_views.GeneRecurrenceQueryView.as_view(), name='gene-recurrence-query'),
+    path('gene_cna_query/', visualization_views.GeneCNAQueryView.as_view(), name='gene-cna-query'),
     path('ploidy_distribution/', visualization_views.PloidyDistributionView.as_view(), name='ploidy-distribution'),
     path('download_dataset/', dataset_views.download_dataset, name='download_dataset'),
     path('top_cn_variance/', visualization_views.TopCNVarianceView.as_view(), name='top-cn-variance'),
@@ -36,4 +38,5 @@ urlpatterns = [
          name='pathway-enrichment-options'),
     path('pathway_enrichment_plot/', visualization_views.PathwayEnrichmentPlotView.as_view(),
          name='pathway-enrichment-plot'),
+    path('cache_stats/', visualization_views.CacheStatsView.as_view(), name='cache-stats'),
 ]
@@ -0,0 +1,153 @@
+import os
+import threading
+from collections import OrderedDict
+
+import pyarrow.parquet as pq
+
+from django.conf import settings
+
+
+class SizedLRUCache:
+    """
+    进程内按字节数限制的 LRU 缓存，键为 (path, mtime_ns)。
+
+    文件被重新生成后 mtime 改变，旧条目在下一次访问时被替换。
+    """
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._path_keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+
+            return entry[0]
+
+    def put(self, key, value, nbytes):
+        if nbytes > self.max_bytes:
+            return
+
+        with self._lock:
+            # 同一路径的旧版本直接丢弃
+            stale_key = self._path_keys.get(key[0])
+            if stale_key is not None and stale_key != key:
+                self._remove(stale_key)
+
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (value, nbytes)
+            self._path_keys[key[0]] = key
+            self.current_bytes += nbytes
+
+            while self.current_bytes > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, nbytes = self._entries.pop(key)
+        self.current_bytes -= nbytes
+
+        if self._path_keys.get(key[0]) == key:
+            del self._path_keys[key[0]]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._path_keys.clear()
+            self.current_bytes = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'current_bytes': self.current_bytes,
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+table_cache = SizedLRUCache(settings.ARROW_TABLE_CACHE_MAX_BYTES)
+schema_cache = SizedLRUCache(settings.ARROW_SCHEMA_CACHE_MAX_BYTES)
+frame_cache = SizedLRUCache(settings.META_FRAME_CACHE_MAX_BYTES)
+payload_cache = SizedLRUCache(settings.PAYLOAD_CACHE_MAX_BYTES)
+
+
+def build_cache_key(file_path):
+    return file_path, os.stat(file_path).st_mtime_ns
+
+
+def get_parquet_schema(file_path):
+    key = build_cache_key(file_path)
+    schema = schema_cache.get(key)
+
+    if schema is None:
+        schema = pq.read_schema(file_path, memory_map=True)
+        schema_cache.put(key, schema, len(schema.to_string()))
+
+    return schema
+
+
+def get_parquet_table(file_path):
+    """
+    返回整张 Arrow 表；未压缩大小超过缓存容量的文件返回 None，由调用方按列读取。
+    """
+    key = build_cache_key(file_path)
+    table = table_cache.get(key)
+
+    if table is not None:
+        return table
+
+    parquet_file = pq.ParquetFile(file_path, memory_map=True)
+    metadata = parquet_file.metadata
+    uncompressed_bytes = sum(
+        metadata.row_group(i).total_byte_size for i in range(metadata.num_row_groups)
+    )
+
+    if uncompressed_bytes > table_cache.max_bytes:
+        return None
+
+    table = parquet_file.read(use_pandas_metadata=True)
+    table_cache.put(key, table, table.nbytes)
+
+    return table
+
+
+def get_cached_frame(file_path, loader):
+    """
+    返回 loader(file_path) 生成的 DataFrame，并按文件 mtime 缓存。
+    """
+    key = build_cache_key(file_path)
+    frame = frame_cache.get(key)
+
+    if frame is None:
+        frame = loader(file_path)
+        frame_cache.put(key, frame, int(frame.memory_usage(deep=True).sum()))
+
+    return frame
+
+
+def get_cache_stats():
+    return {
+        'table': table_cache.stats(),
+        'schema': schema_cache.stats(),
+        'frame': frame_cache.stats(),
+        'payload': payload_cache.stats(),
+    }
@@ -0,0 +1,197 @@
+import os
+import zlib
+
+from database.utils import path_utils
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+CHUNK_SIZE = 64 * 1024
+
+# 小于该大小的动态响应不压缩
+MIN_COMPRESS_SIZE = 1024
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# 离线生成预压缩文件时使用更高的压缩级别
+SIDECAR_GZIP_LEVEL = 9
+SIDECAR_ZSTD_LEVEL = 19
+
+compressible_content_types = [
+    'text/',
+    'application/json',
+    'application/vnd.apache.arrow.stream',
+]
+
+sidecar_suffixes = {
+    'zstd': '.zst',
+    'gzip': '.gz',
+}
+
+
+def get_supported_encodings():
+    # 按优先级排列，zstandard 未安装时只支持 gzip
+    if zstandard is None:
+        return ['gzip']
+
+    return ['zstd', 'gzip']
+
+
+def parse_accept_encoding(accept_encoding):
+    """
+    解析 Accept-Encoding，返回 q > 0 的编码集合。
+    """
+    encodings = set()
+
+    for item in accept_encoding.split(','):
+        parts = [part.strip() for part in item.split(';')]
+        encoding = parts[0].lower()
+
+        if not encoding:
+            continue
+
+        q = 1.0
+        for param in parts[1:]:
+            if param.startswith('q='):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+
+        if q > 0:
+            encodings.add(encoding)
+
+    return encodings
+
+
+def choose_encoding(request):
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+    for encoding in get_supported_encodings():
+        if encoding in accepted or '*' in accepted:
+            return encoding
+
+    return None
+
+
+def is_compressible(content_type):
+    return any(content_type.startswith(prefix) for prefix in compressible_content_types)
+
+
+class GzipCompressor:
+    def __init__(self, level=GZIP_LEVEL):
+        # wbits=31 生成带 gzip 头的流
+        self.compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+class ZstdCompressor:
+    def __init__(self, level=ZSTD_LEVEL):
+        self.compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self.compressor.compress(data)
+
+    def flush(self):
+        return self.compressor.flush()
+
+
+def new_compressor(encoding, level=None):
+    if encoding == 'zstd':
+        return ZstdCompressor(ZSTD_LEVEL if level is None else level)
+
+    return GzipCompressor(GZIP_LEVEL if level is None else level)
+
+
+def compress_bytes(data, encoding):
+    compressor = new_compressor(encoding)
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def iter_compressed(chunks, encoding):
+    # 流式压缩，只输出非空块
+    compressor = new_compressor(encoding)
+
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+
+    yield compressor.flush()
+
+
+def get_sidecar_path(file_path, encoding):
+    return f'{file_path}{sidecar_suffixes[encoding]}'
+
+
+def is_sidecar_fresh(file_path, sidecar_path):
+    # 预压缩文件的 mtime 与源文件保持一致，源文件更新后自动失效
+    try:
+        return os.stat(sidecar_path).st_mtime_ns == os.stat(file_path).st_mtime_ns
+    except OSError:
+        return False
+
+
+def get_fresh_sidecar(request, file_path):
+    """
+    返回客户端可接受且未过期的预压缩文件 (路径, 编码)，没有时返回 (None, None)。
+    """
+    accepted = parse_accept_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+
+    for encoding in get_supported_encodings():
+        if encoding not in accepted and '*' not in accepted:
+            continue
+
+        sidecar_path = get_sidecar_path(file_path, encoding)
+
+        if is_sidecar_fresh(file_path, sidecar_path):
+            return sidecar_path, encoding
+
+    return None, None
+
+
+def write_sidecars(file_path, iter_content, force=False):
+    """
+    为 file_path 生成 .zst / .gz 预压缩文件，内容为接口实际返回的响应体。
+
+    iter_content 为返回响应体分块的函数，每种编码调用一次；返回实际写入的编码列表。
+    """
+    stat_result = os.stat(file_path)
+    written = []
+
+    for encoding in get_supported_encodings():
+        sidecar_path = get_sidecar_path(file_path, encoding)
+
+        if not force and is_sidecar_fresh(file_path, sidecar_path):
+            continue
+
+        level = SIDECAR_ZSTD_LEVEL if encoding == 'zstd' else SIDECAR_GZIP_LEVEL
+        compressor = new_compressor(encoding, level)
+
+        tmp_path = path_utils.make_temp_path(sidecar_path)
+        try:
+            with open(tmp_path, 'wb') as f:
+                for chunk in iter_content():
+                    f.write(compressor.compress(chunk))
+                f.write(compressor.flush())
+
+            os.utime(tmp_path, ns=(stat_result.st_atime_ns, stat_result.st_mtime_ns))
+            os.replace(tmp_path, sidecar_path)
+        except BaseException:
+            path_utils.remove_temp_path(tmp_path)
+            raise
+        written.append(encoding)
+
+    return written
@@ -0,0 +1,293 @@
+import os
+import json
+import time
+import hashlib
+import zipfile
+from datetime import datetime
+
+from database.utils import path_utils, zip_utils
+
+cn_type_map = {
+    'allele': 'allele-specific',
+    'cns': 'copy-number-segment',
+    'mcns': 'masked-copy-number-segment'
+}
+
+# allele 以外的 GISTIC 结果只有这两个流程
+gistic_extra_workflows = ['GATK4 CNV', 'DNAcopy']
+
+MANIFEST_VERSION = 1
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def get_manifest_path(zip_path):
+    return f'{zip_path}.manifest.json'
+
+
+def build_matrix_files(dataset, workflow, bin_size):
+    files = [
+        path_utils.get_dataset_meta_path(dataset, workflow, bin_size),
+        path_utils.get_dataset_matrix_path(dataset, workflow, bin_size),
+        path_utils.get_dataset_newick_path(dataset, workflow, bin_size),
+        path_utils.get_dataset_gene_matrix_csv_path(dataset, workflow, bin_size),
+        path_utils.get_dataset_term_matrix_csv_path(dataset, workflow, bin_size),
+        path_utils.get_dataset_top_cn_variance_path(dataset, workflow, bin_size),
+    ]
+
+    if not bin_size and dataset.modality in ['spaDNA', 'spaRNA']:
+        files.append(path_utils.get_dataset_spatial_top_cn_variance_path(dataset, workflow, bin_size))
+
+    # GDC 数据集按 bin_size 分目录，其余放在 ZIP 根目录
+    return [(file_path, os.path.join(bin_size, os.path.basename(file_path))) for file_path in files]
+
+
+def build_gistic_files(dataset, cn_type, workflow):
+    files = [
+        path_utils.get_dataset_recurrent_gene_path(dataset, cn_type, workflow, 'amp'),
+        path_utils.get_dataset_recurrent_gene_path(dataset, cn_type, workflow, 'del'),
+        path_utils.get_dataset_recurrent_scores_path(dataset, cn_type, workflow),
+        path_utils.get_dataset_recurrent_seg_path(dataset, cn_type, workflow),
+        path_utils.get_ora_csv_path(dataset.name, cn_type, workflow),
+    ]
+
+    return [
+        (file_path, os.path.join('gistic2', cn_type_map[cn_type], workflow, os.path.basename(file_path)))
+        for file_path in files
+    ]
+
+
+def build_consensus_files(dataset):
+    files = [
+        path_utils.get_consensus_cna_csv_path(dataset.name),
+        path_utils.get_consensus_gene_csv_path(dataset.name),
+        path_utils.get_consensus_term_csv_path(dataset.name),
+        path_utils.get_ora_csv_path(dataset.name, 'consensus', 'consensus'),
+    ]
+
+    return [(file_path, os.path.join('gistic2', 'consensus', os.path.basename(file_path))) for file_path in files]
+
+
+def build_dataset_download_files(dataset):
+    """
+    返回数据集下载包的 [(文件路径, ZIP内路径)]，文件不一定存在。
+    """
+    files = []
+    workflows = [workflow.strip() for workflow in dataset.workflow.split(',')]
+
+    for workflow, bin_size in path_utils.get_dataset_workflow_bin_sizes(dataset):
+        files.extend(build_matrix_files(dataset, workflow, bin_size))
+
+    if dataset.source == 'GDC Portal':
+        for workflow in workflows:
+            files.extend(build_gistic_files(dataset, 'allele', workflow))
+
+        for cn_type in cn_type_map.keys():
+            if cn_type != 'allele':
+                for workflow in gistic_extra_workflows:
+                    files.extend(build_gistic_files(dataset, cn_type, workflow))
+
+        files.extend(build_consensus_files(dataset))
+
+    # 多流程数据集会重复生成同一路径，去重后保持原顺序
+    return list(dict.fromkeys(files))
+
+
+def normalize_files_config(files_config):
+    """
+    过滤不存在的文件，文件夹递归展开为其中的所有文件。
+    """
+    normalized_configs = []
+
+    for file_path, target_path in files_config:
+        if not file_path or not os.path.exists(file_path):
+            continue
+
+        if os.path.isfile(file_path):
+            normalized_configs.append((file_path, target_path))
+            continue
+
+        for root, _, file_names in os.walk(file_path):
+            for file_name in sorted(file_names):
+                full_path = os.path.join(root, file_name)
+                rel_path = os.path.relpath(full_path, os.path.dirname(file_path))
+                normalized_configs.append((full_path, os.path.join(target_path, rel_path)))
+
+    return normalized_configs
+
+
+def resolve_zip_names(normalized_configs):
+    """
+    同一目录下的重名文件加上源路径哈希前缀。
+    """
+    path_name_map = {}
+    entries = []
+
+    for file_path, target_path in normalized_configs:
+        target_dir = os.path.dirname(target_path)
+        base_name = os.path.basename(target_path)
+        names = path_name_map.setdefault(target_dir, set())
+
+        if base_name in names:
+            hash_prefix = hashlib.md5(file_path.encode()).hexdigest()[:8]
+            unique_name = f'{hash_prefix}_{base_name}'
+
+            counter = 1
+            while unique_name in names:
+                unique_name = f'{hash_prefix}_{base_name}_{counter}'
+                counter += 1
+
+            target_path = os.path.join(target_dir, unique_name)
+
+        names.add(os.path.basename(target_path))
+        entries.append((file_path, target_path))
+
+    return entries
+
+
+def stat_entries(entries):
+    result = []
+
+    for file_path, arcname in entries:
+        stat_result = os.stat(file_path)
+        result.append({
+            'path': file_path,
+            'arcname': arcname,
+            'size': stat_result.st_size,
+            'mtime_ns': stat_result.st_mtime_ns,
+        })
+
+    return result
+
+
+def hash_file(file_path):
+    sha256 = hashlib.sha256()
+
+    with open(file_path, 'rb') as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            sha256.update(chunk)
+
+    return sha256.hexdigest()
+
+
+def load_manifest(zip_path):
+    try:
+        with open(get_manifest_path(zip_path), 'r') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        return None
+
+    return manifest
+
+
+def write_manifest(zip_path, files):
+    manifest_path = get_manifest_path(zip_path)
+    tmp_path = path_utils.make_temp_path(manifest_path)
+
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'version': MANIFEST_VERSION, 'files': files}, f, indent=1)
+
+        os.replace(tmp_path, manifest_path)
+    except BaseException:
+        path_utils.remove_temp_path(tmp_path)
+        raise
+
+
+def check_manifest(zip_path, files):
+    """
+    比较当前文件与清单：返回 'fresh'、'touched'（仅 mtime 变化且哈希一致）或 'stale'。
+    """
+    manifest = load_manifest(zip_path)
+
+    if manifest is None or not os.path.exists(zip_path):
+        return 'stale'
+
+    old_files = manifest['files']
+
+    if len(old_files) != len(files):
+        return 'stale'
+
+    touched = False
+
+    for old, new in zip(old_files, files):
+        if (old['path'], old['arcname'], old['size']) != (new['path'], new['arcname'], new['size']):
+            return 'stale'
+
+        if old['mtime_ns'] != new['mtime_ns']:
+            # 文件被重新写入但内容可能不变，用哈希确认
+            if hash_file(new['path']) != old.get('sha256'):
+                return 'stale'
+            touched = True
+
+        new['sha256'] = old.get('sha256')
+
+    return 'touched' if touched else 'fresh'
+
+
+def write_zip(zip_path, files, chunk_size=zip_utils.CHUNK_SIZE):
+    """
+    写入临时文件后原子替换；返回的 files 中附带每个文件的 sha256（压缩时顺便计算）。
+    """
+    tmp_path = path_utils.make_temp_path(zip_path)
+
+    try:
+        with zipfile.ZipFile(tmp_path, 'w', allowZip64=True) as zipf:
+            for item in files:
+                zip_info = zip_utils.build_zip_info(item['path'], item['arcname'])
+                sha256 = hashlib.sha256()
+
+                with open(item['path'], 'rb') as src, zipf.open(zip_info, 'w') as dest:
+                    while True:
+                        chunk = src.read(chunk_size)
+                        if not chunk:
+                            break
+                        sha256.update(chunk)
+                        dest.write(chunk)
+
+                item['sha256'] = sha256.hexdigest()
+
+        os.replace(tmp_path, zip_path)
+    except BaseException:
+        path_utils.remove_temp_path(tmp_path)
+        raise
+
+    return files
+
+
+def log_empty_zip(empty_log_path, message):
+    with open(empty_log_path, 'a') as empty_log:
+        current_time = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        empty_log.write(f'[{current_time}] {message}\n')
+
+
+def build_dataset_zip(name, files_config, zip_path, force=False, empty_log_path=None):
+    """
+    构建单个数据集的下载包，可在子进程中运行（不访问数据库）。
+
+    返回 (name, 状态, 文件数, 耗时秒数)，状态为 built / fresh / touched / empty。
+    """
+    start = time.monotonic()
+    entries = resolve_zip_names(normalize_files_config(files_config))
+
+    if not entries:
+        if empty_log_path:
+            log_empty_zip(empty_log_path, f'空ZIP文件未生成: {zip_path}')
+        return name, 'empty', 0, time.monotonic() - start
+
+    files = stat_entries(entries)
+    state = 'stale' if force else check_manifest(zip_path, files)
+
+    if state == 'stale':
+        files = write_zip(zip_path, files)
+        state = 'built'
+
+    if state != 'fresh':
+        write_manifest(zip_path, files)
+
+    return name, state, len(files), time.monotonic() - start
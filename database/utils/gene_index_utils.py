@@ -0,0 +1,235 @@
+import os
+import json
+import sqlite3
+
+import numpy as np
+import pyarrow.parquet as pq
+
+INDEX_VERSION = 1
+
+# 每次读取的基因列数，内存占用约为 样本数 x GENE_COLUMN_BATCH x 4 字节
+GENE_COLUMN_BATCH = 2000
+
+
+def get_source_key(dataset_name, workflow, bin_size):
+    return f'{dataset_name}|{workflow}|{bin_size}'
+
+
+def open_gene_index(index_path):
+    """
+    打开（必要时创建）基因索引用于写入。
+
+    gene_stats 以 (gene, source_id) 为主键聚簇存储，查询单个基因只读取连续的页；
+    各样本的拷贝数向量单独存放在 gene_values 中，只在需要时读取。
+    """
+    os.makedirs(os.path.dirname(index_path), exist_ok=True)
+
+    conn = sqlite3.connect(index_path)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT)')
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS sources (id INTEGER PRIMARY KEY, key TEXT UNIQUE, dataset_name TEXT, '
+        'workflow TEXT, bin_size TEXT, mtime_ns INTEGER, sample_ids TEXT)'
+    )
+    conn.execute(
+        'CREATE TABLE IF NOT EXISTS gene_stats (gene TEXT, source_id INTEGER, n INTEGER, amp_freq REAL, '
+        'del_freq REAL, mean_cn REAL, PRIMARY KEY (gene, source_id)) WITHOUT ROWID'
+    )
+    conn.execute('CREATE TABLE IF NOT EXISTS gene_values (gene TEXT, source_id INTEGER, data BLOB)')
+    conn.execute('CREATE INDEX IF NOT EXISTS gene_stats_source ON gene_stats (source_id)')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS gene_values_gene ON gene_values (gene, source_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS gene_values_source ON gene_values (source_id)')
+
+    return conn
+
+
+def get_index_settings(amp_threshold, del_threshold):
+    return json.dumps({'version': INDEX_VERSION, 'amp_threshold': amp_threshold, 'del_threshold': del_threshold})
+
+
+def summarize_gene_values(values, amp_threshold, del_threshold):
+    """
+    values 为 样本 x 基因 的 float32 矩阵，按列返回 (有效样本数, 扩增比例, 缺失比例, 平均拷贝数)，忽略 NaN。
+    """
+    valid = ~np.isnan(values)
+    n = valid.sum(axis=0)
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        amp_freq = (values >= amp_threshold).sum(axis=0) / n
+        del_freq = (values <= del_threshold).sum(axis=0) / n
+        mean_cn = np.where(valid, values, 0).sum(axis=0, dtype=np.float64) / n
+
+    return n, amp_freq, del_freq, mean_cn
+
+
+def to_nullable(value):
+    return None if np.isnan(value) else float(value)
+
+
+def get_gene_columns(parquet_file):
+    # 第一列为样本 ID，排除 pandas 写入的索引列
+    schema = parquet_file.schema_arrow
+    pandas_metadata = schema.pandas_metadata or {}
+    index_cols = {c for c in pandas_metadata.get('index_columns', []) if isinstance(c, str)}
+
+    return schema.names[0], [name for name in schema.names[1:] if name not in index_cols]
+
+
+def index_gene_matrix(conn, source_id, parquet_path, amp_threshold, del_threshold, batch_size=GENE_COLUMN_BATCH):
+    parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+    sample_column, gene_columns = get_gene_columns(parquet_file)
+
+    sample_ids = parquet_file.read(columns=[sample_column]).column(0).to_pylist()
+
+    for start in range(0, len(gene_columns), batch_size):
+        genes = gene_columns[start:start + batch_size]
+        table = parquet_file.read(columns=genes)
+
+        values = np.column_stack([
+            column.to_numpy(zero_copy_only=False).astype(np.float32) for column in table.columns
+        ])
+
+        n, amp_freq, del_freq, mean_cn = summarize_gene_values(values, amp_threshold, del_threshold)
+
+        conn.executemany(
+            'INSERT INTO gene_stats VALUES (?, ?, ?, ?, ?, ?)',
+            (
+                (gene, source_id, int(n[i]), to_nullable(amp_freq[i]), to_nullable(del_freq[i]), to_nullable(mean_cn[i]))
+                for i, gene in enumerate(genes)
+            )
+        )
+        conn.executemany(
+            'INSERT INTO gene_values VALUES (?, ?, ?)',
+            ((gene, source_id, np.ascontiguousarray(values[:, i]).tobytes()) for i, gene in enumerate(genes))
+        )
+
+    return sample_ids, len(gene_columns)
+
+
+def delete_source(conn, source_id):
+    conn.execute('DELETE FROM gene_stats WHERE source_id = ?', (source_id,))
+    conn.execute('DELETE FROM gene_values WHERE source_id = ?', (source_id,))
+    conn.execute('DELETE FROM sources WHERE id = ?', (source_id,))
+
+
+def prepare_gene_index(index_path, amp_threshold, del_threshold, force=False):
+    """
+    打开索引并返回 (连接, {来源 key: (source_id, mtime_ns)})，阈值变化或 force 时清空索引。
+    """
+    conn = open_gene_index(index_path)
+    index_settings = get_index_settings(amp_threshold, del_threshold)
+    row = conn.execute("SELECT value FROM meta WHERE name = 'settings'").fetchone()
+
+    if force or row is None or row[0] != index_settings:
+        with conn:
+            conn.execute('DELETE FROM gene_stats')
+            conn.execute('DELETE FROM gene_values')
+            conn.execute('DELETE FROM sources')
+            conn.execute("INSERT OR REPLACE INTO meta VALUES ('settings', ?)", (index_settings,))
+
+    indexed = {
+        key: (source_id, mtime_ns)
+        for source_id, key, mtime_ns in conn.execute('SELECT id, key, mtime_ns FROM sources')
+    }
+
+    return conn, indexed
+
+
+def update_gene_index_source(conn, indexed, dataset_name, workflow, bin_size, parquet_path, amp_threshold, del_threshold):
+    """
+    Parquet 新增或 mtime 变化时重建该来源的索引，返回 (样本数, 基因数)；未变化时返回 None。
+    """
+    key = get_source_key(dataset_name, workflow, bin_size)
+    mtime_ns = os.stat(parquet_path).st_mtime_ns
+
+    if key in indexed and indexed[key][1] == mtime_ns:
+        return None
+
+    # 每个来源单独提交，中途失败时回滚，不影响其它来源
+    with conn:
+        if key in indexed:
+            delete_source(conn, indexed[key][0])
+
+        source_id = conn.execute(
+            'INSERT INTO sources (key, dataset_name, workflow, bin_size, mtime_ns) VALUES (?, ?, ?, ?, ?)',
+            (key, dataset_name, workflow, bin_size, mtime_ns)
+        ).lastrowid
+        sample_ids, gene_count = index_gene_matrix(conn, source_id, parquet_path, amp_threshold, del_threshold)
+        conn.execute(
+            'UPDATE sources SET sample_ids = ? WHERE id = ?',
+            (json.dumps(sample_ids, separators=(',', ':')), source_id)
+        )
+
+    indexed[key] = (source_id, mtime_ns)
+
+    return len(sample_ids), gene_count
+
+
+def remove_stale_sources(conn, indexed, current_keys):
+    # 删除数据集或矩阵文件已不存在的来源
+    removed = [key for key in indexed if key not in current_keys]
+
+    with conn:
+        for key in removed:
+            delete_source(conn, indexed.pop(key)[0])
+
+    return removed
+
+
+def query_gene_cna(index_path, gene, workflow=None, bin_size=None, include_values=False):
+    """
+    返回基因在所有数据集中的统计信息，include_values 时附带样本 ID 与拷贝数向量。
+
+    bin_size 只筛选区分 bin_size 的数据集（GDC），其余数据集始终返回。
+    """
+    if not os.path.exists(index_path):
+        raise FileNotFoundError(index_path)
+
+    sql = (
+        'SELECT s.id, s.dataset_name, s.workflow, s.bin_size, g.n, g.amp_freq, g.del_freq, g.mean_cn '
+        'FROM gene_stats g JOIN sources s ON s.id = g.source_id WHERE g.gene = ?'
+    )
+    params = [gene]
+
+    if workflow:
+        sql += ' AND s.workflow = ?'
+        params.append(workflow)
+
+    if bin_size:
+        sql += " AND (s.bin_size = ? OR s.bin_size = '')"
+        params.append(bin_size)
+
+    sql += ' ORDER BY s.dataset_name, s.workflow, s.bin_size'
+
+    conn = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+    try:
+        rows = conn.execute(sql, params).fetchall()
+
+        data = [
+            {
+                'dataset_name': dataset_name,
+                'workflow_type': workflow_name,
+                'bin_size': bin_size_name,
+                'n': n,
+                'amp_freq': amp_freq,
+                'del_freq': del_freq,
+                'mean_cn': mean_cn,
+            }
+            for _, dataset_name, workflow_name, bin_size_name, n, amp_freq, del_freq, mean_cn in rows
+        ]
+
+        if include_values:
+            for item, row in zip(data, rows):
+                source_id = row[0]
+                sample_ids = conn.execute('SELECT sample_ids FROM sources WHERE id = ?', (source_id,)).fetchone()[0]
+                blob = conn.execute(
+                    'SELECT data FROM gene_values WHERE gene = ? AND source_id = ?', (gene, source_id)
+                ).fetchone()[0]
+                values = np.frombuffer(blob, dtype=np.float32)
+
+                item['samples'] = json.loads(sample_ids)
+                item['values'] = [None if np.isnan(value) else round(float(value), 4) for value in values]
+    finally:
+        conn.close()
+
+    return data
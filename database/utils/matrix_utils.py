@@ -1,26 +1,178 @@
+import os
+import csv
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pyarrow as pa
+import pyarrow.csv as pa_csv
 import pyarrow.parquet as pq
 import pandas as pd
 import numpy as np
 
-from database.utils import path_utils
+from database.utils import path_utils, cache_utils
 
 
 def extract_matrix_from_parquet(file_path, target_column):
-    # 先读取 header（schema）
-    schema = pq.read_schema(file_path)
+    # 先读取 header（schema），schema 与整表均来自进程内 LRU 缓存
+    schema = cache_utils.get_parquet_schema(file_path)
     all_columns = schema.names
+    column_set = set(all_columns)
     first_col = all_columns[0]
 
     # 构造需要的列：第一列 + 用户指定的存在的列
-    selected_cols = [first_col] + [c for c in target_column if c in all_columns and c != first_col]
+    selected_cols = [first_col] + [c for c in target_column if c in column_set and c != first_col]
 
-    # 只读取需要的列（高效）
-    df = pd.read_parquet(file_path, engine='pyarrow', columns=selected_cols)
+    # 与 pd.read_parquet 一致，同时读取 pandas 元数据中记录的索引列
+    pandas_metadata = schema.pandas_metadata or {}
+    index_cols = [
+        c for c in pandas_metadata.get('index_columns', [])
+        if isinstance(c, str) and c not in selected_cols
+    ]
+
+    table = cache_utils.get_parquet_table(file_path)
+
+    if table is None:
+        # 文件超过缓存容量时只读取需要的列
+        table = pq.read_table(file_path, columns=selected_cols + index_cols, memory_map=True)
+    else:
+        table = table.select(selected_cols + index_cols)
+
+    df = table.to_pandas()
 
     return df
 
 
+def matrix_to_arrow_table(df, metadata=None):
+    """
+    将 extract_matrix_from_parquet 的结果转换为 Arrow 表，数值列统一为 float32，索引作为第一列。
+    """
+    df = df.reset_index()
+    numeric_cols = df.select_dtypes(include='number').columns
+    df[numeric_cols] = df[numeric_cols].astype('float32')
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # 不保留 pandas 元数据，schema metadata 只放调用方传入的信息
+    return table.replace_schema_metadata({key: str(value) for key, value in (metadata or {}).items()})
+
+
+def write_arrow_stream(sink, table):
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+
+
+def matrix_to_arrow_bytes(df, metadata=None):
+    df.index.name = 'id'
+
+    sink = pa.BufferOutputStream()
+    write_arrow_stream(sink, matrix_to_arrow_table(df, metadata))
+
+    return sink.getvalue().to_pybytes()
+
+
+def extract_matrices(jobs, workers):
+    """
+    并发读取多个矩阵子集，jobs 为 [(file_path, columns)]，file_path 为 None 表示跳过。
+
+    返回与 jobs 顺序一致的 [(df, error)]，单个子请求失败不影响其它子请求。
+    """
+    def extract(job):
+        file_path, columns = job
+
+        if file_path is None:
+            return None, None
+
+        try:
+            df = extract_matrix_from_parquet(file_path, columns)
+            df.index.name = 'id'
+            return df, None
+        except FileNotFoundError:
+            return None, 'Matrix file not found.'
+        except Exception as e:
+            return None, str(e)
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(extract, jobs))
+
+
+def build_matrix_batch_stream(results):
+    """
+    将批量结果写为依次拼接的 Arrow IPC stream，每个子请求一个 stream，
+    子请求的序号、参数和错误信息写在 schema metadata 中；失败的子请求写一个空表。
+    """
+    sink = pa.BufferOutputStream()
+
+    for metadata, df in results:
+        if df is None:
+            table = pa.table({}).replace_schema_metadata({key: str(value) for key, value in metadata.items()})
+        else:
+            table = matrix_to_arrow_table(df, metadata)
+
+        write_arrow_stream(sink, table)
+
+    return sink.getvalue().to_pybytes()
+
+
+MATRIX_ROW_GROUP_SIZE = 65536
+
+
+def is_parquet_sidecar_fresh(matrix_path, parquet_path):
+    try:
+        return os.path.getmtime(parquet_path) >= os.path.getmtime(matrix_path)
+    except OSError:
+        return False
+
+
+def convert_matrix_csv_to_parquet(matrix_path, parquet_path, row_group_size=MATRIX_ROW_GROUP_SIZE):
+    # 读取表头，保证第一列（样本 ID）按字符串存储
+    with open(matrix_path, 'r', newline='') as f:
+        first_col = next(csv.reader(f))[0]
+
+    table = pa_csv.read_csv(
+        matrix_path,
+        convert_options=pa_csv.ConvertOptions(column_types={first_col: pa.string()})
+    )
+
+    # 矩阵为 样本 x bin，按列存储后每个 bin 是一个独立的 column chunk；
+    # 样本数通常远小于 row_group_size，整表只有一个 row group，读取单个 bin 只需一次顺序读
+    tmp_path = path_utils.make_temp_path(parquet_path)
+    try:
+        pq.write_table(table, tmp_path, row_group_size=row_group_size, compression='zstd')
+        os.replace(tmp_path, parquet_path)
+    except BaseException:
+        path_utils.remove_temp_path(tmp_path)
+        raise
+
+    return table.num_rows, table.num_columns - 1
+
+
+def extract_matrix_from_parquet_sidecar(parquet_path, target_column):
+    all_columns = cache_utils.get_parquet_schema(parquet_path).names
+    first_col = all_columns[0]
+    column_index = {c: i for i, c in enumerate(all_columns)}
+
+    # 与 read_csv(usecols=...) 保持一致：去重并按文件中的列顺序返回
+    selected_cols = sorted(
+        {c for c in target_column if c in column_index and c != first_col},
+        key=column_index.get
+    )
+
+    table = pq.read_table(parquet_path, columns=[first_col] + selected_cols)
+
+    return table.to_pandas().set_index(first_col)
+
+
 def extract_matrix_from_csv(file_path, target_column):
+    # 优先读取列式存储的 Parquet 副本，只解码请求的 bin 列
+    parquet_path = path_utils.get_matrix_parquet_path(file_path)
+
+    if is_parquet_sidecar_fresh(file_path, parquet_path):
+        try:
+            return extract_matrix_from_parquet_sidecar(parquet_path, target_column)
+        except (OSError, pa.ArrowException):
+            # 副本不可读或已损坏时回退到 CSV
+            pass
+
     # 先读取 CSV 文件的头部（schema）
     df = pd.read_csv(file_path, nrows=1)
     all_columns = df.columns.tolist()
@@ -35,35 +187,68 @@ def extract_matrix_from_csv(file_path, target_column):
     return df
 
 
-def calculate_abundance(file_path):
+HISTOGRAM_STEP = 0.1
+HISTOGRAM_CHUNK_ROWS = 1000
+
+
+def iter_matrix_value_chunks(file_path, chunk_rows=HISTOGRAM_CHUNK_ROWS):
+    # 按行分块读取矩阵数值（排除第一列样本 ID），内存占用与 chunk_rows 成正比
+    parquet_path = path_utils.get_matrix_parquet_path(file_path)
+
+    parquet_file = None
+
+    if is_parquet_sidecar_fresh(file_path, parquet_path):
+        try:
+            parquet_file = pq.ParquetFile(parquet_path, memory_map=True)
+        except (OSError, pa.ArrowException):
+            # 副本不可读或已损坏时回退到 CSV
+            pass
+
+    if parquet_file is not None:
+        value_columns = parquet_file.schema_arrow.names[1:]
+
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=value_columns):
+            yield batch.to_pandas().to_numpy().ravel()
+    else:
+        for chunk in pd.read_csv(file_path, chunksize=chunk_rows):
+            yield chunk.iloc[:, 1:].to_numpy().ravel()
+
+
+def calculate_abundance(file_path, chunk_rows=HISTOGRAM_CHUNK_ROWS):
     try:
-        df = pd.read_csv(file_path)
+        # 第一遍：获取最小值和最大值
+        min_value = None
+        max_value = None
 
-        # 排除第一列（index 0），选择剩余的列
-        matrix_values = df.iloc[:, 1:].to_numpy().flatten()  # 摊平从第二列开始的所有数据
+        for values in iter_matrix_value_chunks(file_path, chunk_rows):
+            if values.size == 0:
+                continue
 
-        # 获取最小值和最大值
-        min_value = matrix_values.min()
-        max_value = matrix_values.max()
+            chunk_min = values.min()
+            chunk_max = values.max()
+            min_value = chunk_min if min_value is None else min(min_value, chunk_min)
+            max_value = chunk_max if max_value is None else max(max_value, chunk_max)
 
-        # 以 0.1 为步长，创建从最小值到最大值的区间
-        bins = np.arange(min_value, max_value + 0.1, 0.1)
+        if min_value is None:
+            return []
 
-        # 计算每个区间的丰度（出现频率）
-        abundance, _ = np.histogram(matrix_values, bins=bins)
+        # 以 0.1 为步长，创建从最小值到最大值的区间
+        bins = np.arange(min_value, max_value + HISTOGRAM_STEP, HISTOGRAM_STEP)
 
-        # 计算区间的中点
-        bin_centers = (bins[:-1] + bins[1:]) / 2  # 区间的中点
+        # 第二遍：逐块累加每个区间的丰度（区间边界固定，结果与整体计算一致）
+        abundance = np.zeros(len(bins) - 1, dtype=np.int64)
 
-        # 标准化 bin_center 到 0.1
-        bin_centers_normalized = np.round(bin_centers, 2)  # 保留到 0.01 位
+        for values in iter_matrix_value_chunks(file_path, chunk_rows):
+            chunk_abundance, _ = np.histogram(values, bins=bins)
+            abundance += chunk_abundance
 
-        # 组织成 [bin_center, abundance] 的形式
-        bin_abundance_list = [[bin_center, abundance[i]] for i, bin_center in enumerate(bin_centers_normalized)]
+        # 计算区间的中点，标准化到 0.01 位
+        bin_centers_normalized = np.round((bins[:-1] + bins[1:]) / 2, 2)
 
-        # 在列表首尾分别添加第一个区间的左边界和最后一个区间的右边界
-        bin_abundance_list.insert(0, [bins[0], 0])  # 添加第一个区间的左边界
-        bin_abundance_list.append([bins[-1], 0])  # 添加最后一个区间的右边界
+        # 组织成 [bin_center, abundance] 的形式，首尾分别添加第一个区间的左边界和最后一个区间的右边界
+        bin_abundance_list = [[float(bins[0]), 0]]
+        bin_abundance_list.extend(map(list, zip(bin_centers_normalized.tolist(), abundance.tolist())))
+        bin_abundance_list.append([float(bins[-1]), 0])
 
         return bin_abundance_list
     except FileNotFoundError as e:
@@ -72,187 +257,262 @@ def calculate_abundance(file_path):
         ) from e
 
 
-def parse_GDC_bulk_meta_matrix(meta_df):
-    result = []
-
-    def process_value(value, is_numeric=False):
-        if pd.isna(value):
-            return None if is_numeric else ''
-        return value
-
-    for index, row in meta_df.iterrows():
-        # 构建字典，键对应模型字段，值对应 DataFrame 中的值
-        sample_data = {
-            'sample_id': process_value(row['sample_id'], is_numeric=False),
-            'dataset_name': process_value(row['dataset_name'], is_numeric=False),
-            'disease_type': process_value(row['c_disease_type'], is_numeric=False),
-            'primary_site': process_value(row['c_primiary_site'], is_numeric=False),
-            'tumor_stage': process_value(row['c_tumor_stage'], is_numeric=False),
-            'tumor_grade': process_value(row['c_tumor_grade'], is_numeric=False),
-            'ethnicity': process_value(row['c_ethinicity'], is_numeric=False),
-            'race': process_value(row['c_race'], is_numeric=False),
-            'gender': process_value(row['c_gender'], is_numeric=False),
-            'age': process_value(row['n_age'], is_numeric=True),
-            'pfs': process_value(row['n_pfs'], is_numeric=True),
-            'days_to_death': process_value(row['n_os'], is_numeric=True),
-            'pfs_status': process_value(row['c_pfs_status'], is_numeric=False),
-            'vital_status': process_value(row['c_os_status'], is_numeric=False)
-        }
-
-        # 将每行数据字典添加到结果列表中
-        result.append(sample_data)
-
-    return result
-
-
-def parse_bulk_meta_matrix(meta_df):
-    result = []
-
-    def process_value(value, is_numeric=False):
-        if pd.isna(value):
-            return None if is_numeric else ''
-        return value
-
-    for index, row in meta_df.iterrows():
-        # 构建字典，键对应模型字段，值对应 DataFrame 中的值
-        sample_data = {
-            'sample_id': process_value(row['sample_id'], is_numeric=False),
-            'dataset_name': process_value(row['dataset_name'], is_numeric=False),
-            'disease_type': process_value(row['c_disease_type'], is_numeric=False),
-            'primary_site': process_value(row['c_primiary_site'], is_numeric=False),
-            'tumor_stage': process_value(row['c_tumor_stage'], is_numeric=False),
-            'tumor_grade': process_value(row['c_tumor_grade'], is_numeric=False),
-            'ethnicity': process_value(row['c_ethinicity'], is_numeric=False),
-            'race': process_value(row['c_race'], is_numeric=False),
-            'gender': process_value(row['c_gender'], is_numeric=False),
-            'age': process_value(row['n_age'], is_numeric=True),
-            'pfs': process_value(row['n_pfs'], is_numeric=True),
-            'days_to_death': process_value(row['n_days_to_death'], is_numeric=True),
-            'pfs_status': process_value(row['c_pfs_status'], is_numeric=False),
-            'vital_status': process_value(row['c_vital_status'], is_numeric=False)
-        }
-
-        # 将每行数据字典添加到结果列表中
-        result.append(sample_data)
-
-    return result
-
-
-def parse_scDNA_10x_meta_matrix(meta_df):
-    result = []
-
-    def process_value(value, is_numeric=False):
-        if pd.isna(value):
-            return None if is_numeric else ''
-        return value
-
-    for index, row in meta_df.iterrows():
-        sample_data = {
-            'cell_id': process_value(row['cell_id'], is_numeric=False),
-            'total_num_reads': process_value(row['c_total_num_reads'], is_numeric=True),
-            'num_unmapped_reads': process_value(row['c_num_unmapped_reads'], is_numeric=True),
-            'num_lowmapq_reads': process_value(row['c_num_lowmapq_reads'], is_numeric=True),
-            'num_duplicate_reads': process_value(row['c_num_duplicate_reads'], is_numeric=True),
-            'num_mapped_dedup_reads': process_value(row['c_num_mapped_dedup_reads'], is_numeric=True),
-            'frac_mapped_duplicates': process_value(row['c_frac_mapped_duplicates'], is_numeric=True),
-            'effective_depth_of_coverage': process_value(row['c_effective_depth_of_coverage'], is_numeric=True),
-            'effective_reads_per_1Mbp': process_value(row['c_effective_reads_per_1Mbp'], is_numeric=True),
-            'raw_mapd': process_value(row['c_raw_mapd'], is_numeric=True),
-            'normalized_mapd': process_value(row['c_normalized_mapd'], is_numeric=True),
-            'raw_dimapd': process_value(row['c_raw_dimapd'], is_numeric=True),
-            'normalized_dimapd': process_value(row['c_normalized_dimapd'], is_numeric=True),
-            'mean_ploidy': process_value(row['c_mean_ploidy'], is_numeric=True),
-            'ploidy_confidence': process_value(row['c_ploidy_confidence'], is_numeric=True),
-            'is_high_dimapd': process_value(row['n_is_high_dimapd'], is_numeric=True),
-            'is_noisy': process_value(row['n_is_noisy'], is_numeric=True),
-            'est_cnv_resolution_mb': process_value(row['c_est_cnv_resolution_mb'], is_numeric=True),
-        }
-
-        # 将每行数据字典添加到结果列表中
-        result.append(sample_data)
-
-    return result
-
-
-def parse_single_cell_meta_matrix(meta_df):
-    result = []
-
-    def process_value(value, is_numeric=False):
-        if pd.isna(value):
-            return None if is_numeric else ''
-        return value
-
-    for index, row in meta_df.iterrows():
-        # 构建字典，键对应模型字段，值对应 DataFrame 中的值
-        sample_data = {
-            'cell_id': process_value(row['cell_id'], is_numeric=False),
-            'dataset_name': process_value(row['dataset_name'], is_numeric=False),
-            'cell_type': process_value(row['c_cell_type'], is_numeric=False),
-            'confidence': process_value(row['c_confidence'], is_numeric=False),
-            'donor': process_value(row['c_donor'], is_numeric=False),
-            'cnv_score': process_value(row['n_cnv_score'], is_numeric=True),
-            'cnv_status': process_value(row['c_cnv_status'], is_numeric=False),
-            'malignancy': process_value(row['c_malignancy'], is_numeric=False),
-            'cell_label': process_value(row['c_cell_label'], is_numeric=False),
-        }
-
-        # 将每行数据字典添加到结果列表中
-        result.append(sample_data)
-
-    return result
-
-
-def parse_ST_meta_matrix(meta_df):
-    result = []
-
-    def process_value(value, is_numeric=False):
-        if pd.isna(value):
-            return None if is_numeric else ''
-        return value
-
-    for index, row in meta_df.iterrows():
-        # 构建字典，键对应模型字段，值对应 DataFrame 中的值
-        sample_data = {
-            'spot_id': process_value(row['spot_id'], is_numeric=False),
-            'dataset_name': process_value(row['dataset_name'], is_numeric=False),
-            'cell_type': process_value(row['c_cell_type'], is_numeric=False),
-            'confidence': process_value(row['c_confidence'], is_numeric=False),
-            'donor': process_value(row['c_donor'], is_numeric=False),
-            'cnv_score': process_value(row['n_cnv_score'], is_numeric=True),
-            'cnv_status': process_value(row['c_cnv_status'], is_numeric=False),
-            'malignancy': process_value(row['c_malignancy'], is_numeric=False),
-            'cell_label': process_value(row['c_cell_label'], is_numeric=False),
-            'spatial_1': process_value(row['n_spatial_1'], is_numeric=True),
-            'spatial_2': process_value(row['n_spatial_2'], is_numeric=True)
-        }
-
-        # 将每行数据字典添加到结果列表中
-        result.append(sample_data)
-
-    return result
+def write_abundance_sidecar(file_path, source_mtime_ns, bin_abundance_list):
+    histogram_path = path_utils.get_matrix_histogram_path(file_path)
 
+    # 每次写入使用独立的临时文件，并发请求同时生成时互不影响
+    tmp_path = path_utils.make_temp_path(histogram_path)
+    try:
+        with open(tmp_path, 'w') as f:
+            json.dump({'source_mtime_ns': source_mtime_ns, 'histogram': bin_abundance_list}, f, separators=(',', ':'))
+
+        os.replace(tmp_path, histogram_path)
+    except BaseException:
+        path_utils.remove_temp_path(tmp_path)
+        raise
+
+
+def build_abundance_sidecar(file_path, chunk_rows=HISTOGRAM_CHUNK_ROWS):
+    source_mtime_ns = os.stat(file_path).st_mtime_ns
+    bin_abundance_list = calculate_abundance(file_path, chunk_rows)
+    write_abundance_sidecar(file_path, source_mtime_ns, bin_abundance_list)
+
+    return bin_abundance_list
 
-def parse_meta_matrix(dataset):
-    meta_matrix_path = path_utils.get_dataset_samples_path(dataset)
 
+def load_abundance_sidecar(file_path):
+    # 侧车文件记录的源矩阵 mtime 与当前一致时才视为有效
     try:
-        meta_df = pd.read_csv(meta_matrix_path)
-    except FileNotFoundError as e:
-        raise FileNotFoundError(
-            f"Meta matrix file for dataset '{dataset}' not found."
-        ) from e
+        source_mtime_ns = os.stat(file_path).st_mtime_ns
+
+        with open(path_utils.get_matrix_histogram_path(file_path), 'r') as f:
+            sidecar = json.load(f)
+    except (OSError, ValueError):
+        # 缺失、无读权限或内容损坏时重新计算
+        return None
+
+    if sidecar.get('source_mtime_ns') != source_mtime_ns:
+        return None
+
+    return sidecar['histogram']
 
+
+def get_abundance(file_path):
+    bin_abundance_list = load_abundance_sidecar(file_path)
+
+    if bin_abundance_list is not None:
+        return bin_abundance_list
+
+    source_mtime_ns = os.stat(file_path).st_mtime_ns
+    bin_abundance_list = calculate_abundance(file_path)
+
+    try:
+        write_abundance_sidecar(file_path, source_mtime_ns, bin_abundance_list)
+    except OSError:
+        # 数据目录只读或不可写时直接返回计算结果
+        pass
+
+    return bin_abundance_list
+
+
+# 元数据列映射：(返回字段, CSV 列名, 是否数值列)
+# 缺失值：数值列返回 None，字符串列返回 ''
+bulk_meta_columns = [
+    ('sample_id', 'sample_id', False),
+    ('dataset_name', 'dataset_name', False),
+    ('disease_type', 'c_disease_type', False),
+    ('primary_site', 'c_primiary_site', False),
+    ('tumor_stage', 'c_tumor_stage', False),
+    ('tumor_grade', 'c_tumor_grade', False),
+    ('ethnicity', 'c_ethinicity', False),
+    ('race', 'c_race', False),
+    ('gender', 'c_gender', False),
+    ('age', 'n_age', True),
+    ('pfs', 'n_pfs', True),
+    ('days_to_death', 'n_days_to_death', True),
+    ('pfs_status', 'c_pfs_status', False),
+    ('vital_status', 'c_vital_status', False),
+]
+
+GDC_bulk_meta_columns = [
+    ('sample_id', 'sample_id', False),
+    ('dataset_name', 'dataset_name', False),
+    ('disease_type', 'c_disease_type', False),
+    ('primary_site', 'c_primiary_site', False),
+    ('tumor_stage', 'c_tumor_stage', False),
+    ('tumor_grade', 'c_tumor_grade', False),
+    ('ethnicity', 'c_ethinicity', False),
+    ('race', 'c_race', False),
+    ('gender', 'c_gender', False),
+    ('age', 'n_age', True),
+    ('pfs', 'n_pfs', True),
+    ('days_to_death', 'n_os', True),
+    ('pfs_status', 'c_pfs_status', False),
+    ('vital_status', 'c_os_status', False),
+]
+
+scDNA_10x_meta_columns = [
+    ('cell_id', 'cell_id', False),
+    ('total_num_reads', 'c_total_num_reads', True),
+    ('num_unmapped_reads', 'c_num_unmapped_reads', True),
+    ('num_lowmapq_reads', 'c_num_lowmapq_reads', True),
+    ('num_duplicate_reads', 'c_num_duplicate_reads', True),
+    ('num_mapped_dedup_reads', 'c_num_mapped_dedup_reads', True),
+    ('frac_mapped_duplicates', 'c_frac_mapped_duplicates', True),
+    ('effective_depth_of_coverage', 'c_effective_depth_of_coverage', True),
+    ('effective_reads_per_1Mbp', 'c_effective_reads_per_1Mbp', True),
+    ('raw_mapd', 'c_raw_mapd', True),
+    ('normalized_mapd', 'c_normalized_mapd', True),
+    ('raw_dimapd', 'c_raw_dimapd', True),
+    ('normalized_dimapd', 'c_normalized_dimapd', True),
+    ('mean_ploidy', 'c_mean_ploidy', True),
+    ('ploidy_confidence', 'c_ploidy_confidence', True),
+    ('is_high_dimapd', 'n_is_high_dimapd', True),
+    ('is_noisy', 'n_is_noisy', True),
+    ('est_cnv_resolution_mb', 'c_est_cnv_resolution_mb', True),
+]
+
+single_cell_meta_columns = [
+    ('cell_id', 'cell_id', False),
+    ('dataset_name', 'dataset_name', False),
+    ('cell_type', 'c_cell_type', False),
+    ('confidence', 'c_confidence', False),
+    ('donor', 'c_donor', False),
+    ('cnv_score', 'n_cnv_score', True),
+    ('cnv_status', 'c_cnv_status', False),
+    ('malignancy', 'c_malignancy', False),
+    ('cell_label', 'c_cell_label', False),
+]
+
+ST_meta_columns = [
+    ('spot_id', 'spot_id', False),
+    ('dataset_name', 'dataset_name', False),
+    ('cell_type', 'c_cell_type', False),
+    ('confidence', 'c_confidence', False),
+    ('donor', 'c_donor', False),
+    ('cnv_score', 'n_cnv_score', True),
+    ('cnv_status', 'c_cnv_status', False),
+    ('malignancy', 'c_malignancy', False),
+    ('cell_label', 'c_cell_label', False),
+    ('spatial_1', 'n_spatial_1', True),
+    ('spatial_2', 'n_spatial_2', True),
+]
+
+
+def get_meta_columns(dataset):
     if dataset.modality == 'bulkDNA':
         if dataset.source == 'GDC Portal':
-            return parse_GDC_bulk_meta_matrix(meta_df)
+            return GDC_bulk_meta_columns
         else:
-            return parse_bulk_meta_matrix(meta_df)
+            return bulk_meta_columns
     elif dataset.modality == 'scDNA':
         if dataset.source == '10x Official':
-            return parse_scDNA_10x_meta_matrix(meta_df)
+            return scDNA_10x_meta_columns
         else:
-            return parse_single_cell_meta_matrix(meta_df)
+            return single_cell_meta_columns
     elif dataset.modality == 'scRNA':
-        return parse_single_cell_meta_matrix(meta_df)
+        return single_cell_meta_columns
     else:
-        return parse_ST_meta_matrix(meta_df)
+        return ST_meta_columns
+
+
+def convert_meta_matrix(meta_df, meta_columns):
+    fields = []
+    values = []
+
+    # 按列整体处理缺失值，再按行拼装字典
+    for field, column, is_numeric in meta_columns:
+        series = meta_df[column]
+        fill_value = None if is_numeric else ''
+
+        fields.append(field)
+        values.append(series.astype(object).where(series.notna(), fill_value).tolist())
+
+    return [dict(zip(fields, row)) for row in zip(*values)]
+
+
+def load_meta_frame(dataset):
+    meta_matrix_path = path_utils.get_dataset_samples_path(dataset)
+    meta_columns = get_meta_columns(dataset)
+
+    def loader(file_path):
+        meta_df = pd.read_csv(file_path)
+
+        # 只保留需要的列，并重命名为返回字段
+        return meta_df[[column for _, column, _ in meta_columns]].set_axis(
+            [field for field, _, _ in meta_columns], axis=1
+        )
+
+    try:
+        return cache_utils.get_cached_frame(meta_matrix_path, loader)
+    except FileNotFoundError as e:
+        raise FileNotFoundError(
+            f"Meta matrix file for dataset '{dataset}' not found."
+        ) from e
+
+
+def get_meta_frame_columns(dataset):
+    return [(field, field, is_numeric) for field, _, is_numeric in get_meta_columns(dataset)]
+
+
+def parse_meta_matrix(dataset):
+    return convert_meta_matrix(load_meta_frame(dataset), get_meta_frame_columns(dataset))
+
+
+def query_meta_matrix(dataset, filters=None, ordering=None, page=1, page_size=30):
+    """
+    在缓存的元数据上筛选、排序并分页，返回 (总数, 当前页数据)。
+
+    filters: {字段: [取值]} 精确匹配，或 {字段__gte / 字段__lte: 数值} 范围筛选。
+    ordering: 字段列表，'-' 前缀表示降序。
+    page_size 为 None 时不分页，返回全部匹配的样本。
+    """
+    frame = load_meta_frame(dataset)
+    frame_columns = get_meta_frame_columns(dataset)
+    numeric_fields = {field for field, _, is_numeric in frame_columns if is_numeric}
+
+    mask = pd.Series(True, index=frame.index)
+
+    for key, value in (filters or {}).items():
+        field, _, lookup = key.partition('__')
+
+        if field not in frame.columns:
+            raise ValueError(f"Unknown filter field: {field}")
+
+        if lookup in ('gte', 'lte'):
+            if field not in numeric_fields:
+                raise ValueError(f"Range filter is only supported on numeric fields: {field}")
+
+            column = pd.to_numeric(frame[field], errors='coerce')
+            mask &= column >= float(value) if lookup == 'gte' else column <= float(value)
+        elif lookup == '':
+            if field in numeric_fields:
+                mask &= pd.to_numeric(frame[field], errors='coerce').isin([float(v) for v in value])
+            else:
+                mask &= frame[field].fillna('').astype(str).isin(value)
+        else:
+            raise ValueError(f"Unsupported filter lookup: {key}")
+
+    result = frame[mask]
+
+    if ordering:
+        sort_fields = [field.lstrip('-') for field in ordering]
+        unknown_fields = [field for field in sort_fields if field not in frame.columns]
+
+        if unknown_fields:
+            raise ValueError(f"Unknown ordering field: {', '.join(unknown_fields)}")
+
+        result = result.sort_values(
+            by=sort_fields,
+            ascending=[not field.startswith('-') for field in ordering],
+            na_position='last',
+            kind='mergesort'
+        )
+
+    if page_size is None:
+        return len(result), convert_meta_matrix(result, frame_columns)
+
+    start_index = (page - 1) * page_size
+    page_frame = result.iloc[start_index:start_index + page_size]
+
+    return len(result), convert_meta_matrix(page_frame, frame_columns)
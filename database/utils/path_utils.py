@@ -1,8 +1,9 @@
 import os
 import re
 import glob
+import tempfile
 
-from CNAScope_api.constant import DATA_HOME, GISTIC_HOME
+from CNAScope_api.constant import DATA_HOME, GISTIC_HOME, DOWNLOAD_ZIP_HOME
 
 source_map = {
     'cBioportal': 'cBioPortal',
@@ -60,6 +61,8 @@ cn_type_map = {
     'mcns': 'masked-copy-number-segment'
 }
 
+bin_sizes = ['200kb', '500kb', '5M']
+
 ora_workflow_map = {
     'Ascat2': 'ascat2',
     'Ascat3': 'ascat3',
@@ -86,6 +89,15 @@ def build_dataset_prefix(dataset, workflow):
     return f'{dataset.name}.{workflow_name}_'
 
 
+def get_dataset_workflow_bin_sizes(dataset):
+    workflows = [workflow.strip() for workflow in dataset.workflow.split(',')]
+
+    if dataset.source == 'GDC Portal':
+        return [(workflow, bin_size) for workflow in workflows for bin_size in bin_sizes]
+
+    return [(workflow, '') for workflow in workflows]
+
+
 def get_dataset_samples_path(dataset):
     data_dir = str(build_dataset_data_dir_path(dataset))
 
@@ -115,6 +127,49 @@ def get_dataset_matrix_path(dataset, workflow, bin_size):
     return os.path.join(data_dir, matrix_name)
 
 
+def get_matrix_parquet_path(matrix_path):
+    # xxx.cna.csv -> xxx.cna.parquet，与 CSV 矩阵放在同一目录
+    return f'{os.path.splitext(matrix_path)[0]}.parquet'
+
+
+def get_umask():
+    # os.umask 只能通过设置来读取，在导入时（单线程）读取一次
+    umask = os.umask(0)
+    os.umask(umask)
+
+    return umask
+
+
+_umask = get_umask()
+
+
+def make_temp_path(target_path):
+    """
+    在目标文件所在目录创建唯一的临时文件，写完后 os.replace 到目标路径，并发写入互不覆盖。
+
+    mkstemp 创建的文件权限为 0600，改为与普通 open() 创建的文件一致（0666 & ~umask），其它用户的进程同样可读。
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), prefix=f'.{os.path.basename(target_path)}.', suffix='.tmp')
+    try:
+        os.fchmod(fd, 0o666 & ~_umask)
+    finally:
+        os.close(fd)
+
+    return tmp_path
+
+
+def remove_temp_path(tmp_path):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
+
+
+def get_matrix_histogram_path(matrix_path):
+    # xxx.cna.csv -> xxx.cna.ploidy.json
+    return f'{os.path.splitext(matrix_path)[0]}.ploidy.json'
+
+
 def get_dataset_meta_path(dataset, workflow, bin_size):
     data_base_dir = str(build_dataset_data_dir_path(dataset))
 
@@ -268,6 +323,11 @@ def get_dataset_recurrent_json_path(dataset, workflow, bin_size):
     return os.path.join(data_dir, file_name)
 
 
+def get_recurrent_index_path(recurrent_json_path):
+    # xxx_recurrent.json -> xxx_recurrent.sqlite3
+    return f'{os.path.splitext(recurrent_json_path)[0]}.sqlite3'
+
+
 def get_dataset_top_cn_variance_path(dataset, workflow, bin_size):
     data_base_dir = str(build_dataset_data_dir_path(dataset))
 
@@ -329,3 +389,11 @@ def get_ora_csv_path(dataset_name, cn_type, workflow):
     folder_name = f'gistic_{dataset_name}.{workflow_name}'
 
     return os.path.join(GISTIC_HOME, cn_type_map[cn_type], folder_name, 'ora', 'focal_term.csv')
+
+
+def get_dataset_download_zip_path(dataset_name):
+    return os.path.join(DOWNLOAD_ZIP_HOME, f'{dataset_name}.zip')
+
+
+def get_gene_cna_index_path():
+    return os.path.join(DATA_HOME, 'gene_index', 'gene_cna.sqlite3')
@@ -1,7 +1,44 @@
 import os
+import re
 import csv
+import json
+import math
+import time
+import sqlite3
+import threading
+
+import numpy as np
+import pandas as pd
+
+from django.conf import settings
 
 from CNAScope_api.constant import GISTIC_HOME
+from database.utils import cache_utils, path_utils
+
+
+boundaries_pattern = re.compile(r'^chr(\w+):(\d+)-(\d+)$')
+
+
+def to_number(value):
+    # NaN、inf 等非有限值（JSON 中不合法）同样返回 None
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+
+    return number if math.isfinite(number) else None
+
+
+def parse_boundaries(boundaries):
+    # chr8:127000000-128000000 -> ('8', 127000000, 128000000)
+    match = boundaries_pattern.match(boundaries.strip())
+
+    if not match:
+        return None, None, None
+
+    chromosome, start, end = match.groups()
+
+    return chromosome, int(start), int(end)
 
 
 def parse_recurrent_regions(filepath):
@@ -16,21 +53,19 @@ def parse_recurrent_regions(filepath):
     col_num = len(rows[0]) if rows[0][-1] != '' else len(rows[0]) - 1
     for i in range(1, col_num):
         cytoband = rows[0][i]
-        q_value = rows[1][i]
+        q_value = to_number(rows[1][i])
         boundaries = rows[3][i]
+        chromosome, start, end = parse_boundaries(boundaries)
 
-        genes = []
-
-        for row in rows[4:]:
-            gene = row[i]
-
-            if gene:
-                genes.append(gene)
+        genes = [row[i] for row in rows[4:] if i < len(row) and row[i]]
 
         recurrent_regions_info.append({
             'cytoband': cytoband,
             'q_value': q_value,
             'boundaries': boundaries,
+            'chromosome': chromosome,
+            'start': start,
+            'end': end,
             'genes': genes
         })
 
@@ -38,16 +73,80 @@ def parse_recurrent_regions(filepath):
 
 
 def parse_recurrent_scores(filepath):
+    """
+    按列读取 scores.gistic，数值列转换为 int / float。
+    """
     try:
-        with open(filepath, newline='', encoding='utf-8') as f:
-            reader = csv.DictReader(f, delimiter='\t')
-            recurrent_scores_data = [row for row in reader]
+        scores_df = pd.read_csv(filepath, sep='\t')
+    except FileNotFoundError:
+        return None
+
+    return scores_df
+
+
+def downsample_recurrent_scores(scores_df, max_points):
+    """
+    全基因组图的降采样：按 Type 分组，将每组等分为 max_points 段，每段保留 G-score 最大的一行。
+    """
+    if max_points is None or 'G-score' not in scores_df.columns:
+        return scores_df
+
+    groups = []
 
-            return recurrent_scores_data
+    for _, group in scores_df.groupby('Type', sort=False):
+        if len(group) <= max_points:
+            groups.append(group)
+            continue
+
+        buckets = np.arange(len(group)) * max_points // len(group)
+        keep = group['G-score'].groupby(buckets).idxmax()
+        groups.append(group.loc[keep])
+
+    return pd.concat(groups).sort_index() if groups else scores_df
+
+
+def scores_to_records(scores_df):
+    # NaN、inf 转为 None，保证输出合法 JSON
+    scores_df = scores_df.replace([np.inf, -np.inf], np.nan)
+
+    return scores_df.astype(object).where(scores_df.notna(), None).to_dict(orient='records')
+
+
+def get_file_mtime(filepath):
+    try:
+        return os.stat(filepath).st_mtime_ns
     except FileNotFoundError:
         return None
 
 
+def load_focal_cna_info(amp_gene_path, del_gene_path, scores_path, max_points=None):
+    """
+    返回 FocalCNAInfoView 的 JSON 字节串，按文件 mtime 缓存；scores 文件缺失时返回 None。
+    """
+    paths = (amp_gene_path, del_gene_path, scores_path, max_points)
+    key = (paths, tuple(get_file_mtime(path) for path in paths[:3]))
+
+    content = cache_utils.payload_cache.get(key)
+
+    if content is not None:
+        return content
+
+    scores_df = parse_recurrent_scores(scores_path)
+
+    if scores_df is None:
+        return None
+
+    content = json.dumps({
+        'amp': parse_recurrent_regions(amp_gene_path),
+        'del': parse_recurrent_regions(del_gene_path),
+        'scores': scores_to_records(downsample_recurrent_scores(scores_df, max_points))
+    }, separators=(',', ':'), allow_nan=False).encode('utf-8')
+
+    cache_utils.payload_cache.put(key, content, len(content))
+
+    return content
+
+
 def parse_recurrent_profiles(data):
     amp = []
     loss = []
@@ -65,6 +164,90 @@ def parse_recurrent_profiles(data):
     }
 
 
+def build_recurrent_index(json_path, index_path):
+    """
+    将 _recurrent.json 转换为 SQLite 索引：按 key 排序后记录序号，
+    每个样本单独存储解析后的 profile，分页查询时只解码当前页。
+    """
+    source_mtime_ns = os.stat(json_path).st_mtime_ns
+
+    with open(json_path, 'r') as f:
+        datasets = json.load(f).get('datasets', {})
+
+    tmp_path = path_utils.make_temp_path(index_path)
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute('CREATE TABLE meta (name TEXT PRIMARY KEY, value TEXT)')
+            conn.execute('CREATE TABLE profiles (position INTEGER PRIMARY KEY, key TEXT, data TEXT)')
+            conn.execute('INSERT INTO meta VALUES (?, ?)', ('source_mtime_ns', str(source_mtime_ns)))
+            conn.executemany(
+                'INSERT INTO profiles VALUES (?, ?, ?)',
+                (
+                    (position, key, json.dumps(parse_recurrent_profiles(datasets[key]), separators=(',', ':')))
+                    for position, key in enumerate(sorted(datasets.keys()))
+                )
+            )
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        path_utils.remove_temp_path(tmp_path)
+        raise
+
+    return len(datasets)
+
+
+def is_recurrent_index_fresh(json_path, index_path):
+    try:
+        source_mtime_ns = os.stat(json_path).st_mtime_ns
+        conn = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+    except (OSError, sqlite3.OperationalError):
+        return False
+
+    try:
+        row = conn.execute("SELECT value FROM meta WHERE name = 'source_mtime_ns'").fetchone()
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+
+    return row is not None and row[0] == str(source_mtime_ns)
+
+
+def query_recurrent_profiles(json_path, index_path, page, page_size):
+    """
+    返回 (总数, [(key, profile)])，key 按字典序分页。
+    索引缺失或与 JSON 不一致时回退到整体读取 JSON。
+    """
+    start_index = (page - 1) * page_size
+    end_index = start_index + page_size
+
+    if is_recurrent_index_fresh(json_path, index_path):
+        conn = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+        try:
+            total = conn.execute('SELECT COUNT(*) FROM profiles').fetchone()[0]
+            rows = conn.execute(
+                'SELECT key, data FROM profiles WHERE position >= ? AND position < ? ORDER BY position',
+                (start_index, end_index)
+            ).fetchall()
+        finally:
+            conn.close()
+
+        return total, [(key, json.loads(data)) for key, data in rows]
+
+    with open(json_path, 'r') as f:
+        datasets = json.load(f).get('datasets', {})
+
+    dataset_keys = sorted(datasets.keys())
+    paged_keys = dataset_keys[start_index:end_index]
+
+    return len(dataset_keys), [(key, parse_recurrent_profiles(datasets[key])) for key in paged_keys]
+
+
 workflow_map = {
     'ascat2': 'Ascat2',
     'ascat3': 'Ascat3',
@@ -74,6 +257,13 @@ workflow_map = {
 }
 
 
+cn_type_folder_map = {
+    'allele-specific': 'allele',
+    'copy-number-segment': 'cns',
+    'masked-copy-number-segment': 'mcns',
+}
+
+
 def has_gistic_fail(directory):
     return os.path.exists(os.path.join(directory, 'gistic.fail'))
 
@@ -82,92 +272,138 @@ def extract_workflow(sub_category):
     return sub_category.split('.')[-1]
 
 
-def process_category(category, sub_category, dataset_name, result):
-    if dataset_name in sub_category:
-        sub_category_path = os.path.join(GISTIC_HOME, category, sub_category)
+def extract_dataset_name(sub_category):
+    # gistic_<dataset>.<workflow> -> <dataset>
+    return sub_category[len('gistic_'):].rsplit('.', 1)[0]
 
-        if os.path.isdir(sub_category_path) and not has_gistic_fail(sub_category_path):
-            workflow = workflow_map[extract_workflow(sub_category)]
 
-            if category == 'allele-specific':
-                result['allele'].append(workflow)
-            elif category == 'copy-number-segment':
-                result['cns'].append(workflow)
-            elif category == 'masked-copy-number-segment':
-                result['mcns'].append(workflow)
+def has_ora_results(directory):
+    return os.path.isfile(os.path.join(directory, 'ora', 'focal_term.csv'))
 
 
-def get_gistic_options(dataset_name):
-    result = {
-        'allele': [],
-        'cns': [],
-        'mcns': []
-    }
-
-    categories = os.listdir(GISTIC_HOME)
+def scan_gistic_home():
+    """
+    扫描 GISTIC_HOME，返回 GISTIC 成功的 {dataset_name: {cn_type: [workflow]}}、
+    有 ORA 结果（ora/focal_term.csv）的 {dataset_name: {cn_type: [workflow]}} 和有 consensus 结果的数据集集合。
+    """
+    gistic_options = {}
+    ora_options = {}
+    consensus_datasets = set()
 
-    for category in categories:
+    for category in sorted(os.listdir(GISTIC_HOME)):
         category_path = os.path.join(GISTIC_HOME, category)
 
         if category == 'consensus':
+            consensus_datasets = {
+                file_name[:-len('_consensus_term.csv')]
+                for file_name in os.listdir(category_path)
+                if file_name.endswith('_consensus_term.csv')
+            }
             continue
 
-        if os.path.isdir(category_path):
-            sub_categories = os.listdir(category_path)
+        cn_type = cn_type_folder_map.get(category)
 
-            for sub_category in sub_categories:
-                process_category(category, sub_category, dataset_name, result)
+        if cn_type is None or not os.path.isdir(category_path):
+            continue
 
-    result = {key: value for key, value in result.items() if value}
+        for sub_category in sorted(os.listdir(category_path)):
+            sub_category_path = os.path.join(category_path, sub_category)
+            workflow = workflow_map.get(extract_workflow(sub_category))
 
-    return result
+            if not sub_category.startswith('gistic_') or workflow is None:
+                continue
 
+            if not os.path.isdir(sub_category_path):
+                continue
 
-def has_ora(directory):
-    return os.path.exists(os.path.join(directory, 'ora', 'ora_results.csv'))
+            dataset_name = extract_dataset_name(sub_category)
 
+            if not has_gistic_fail(sub_category_path):
+                dataset_options = gistic_options.setdefault(dataset_name, {'allele': [], 'cns': [], 'mcns': []})
+                dataset_options[cn_type].append(workflow)
 
-def process_ora_category(category, sub_category, dataset_name, result):
-    if dataset_name in sub_category:
-        sub_category_path = os.path.join(GISTIC_HOME, category, sub_category)
+            if has_ora_results(sub_category_path):
+                dataset_options = ora_options.setdefault(dataset_name, {'allele': [], 'cns': [], 'mcns': []})
+                dataset_options[cn_type].append(workflow)
 
-        if os.path.isdir(sub_category_path) and has_ora(sub_category_path):
-            workflow = workflow_map[extract_workflow(sub_category)]
+    return gistic_options, ora_options, consensus_datasets
 
-            if category == 'allele-specific':
-                result['allele'].append(workflow)
-            elif category == 'copy-number-segment':
-                result['cns'].append(workflow)
-            elif category == 'masked-copy-number-segment':
-                result['mcns'].append(workflow)
 
+class GisticCatalog:
+    """
+    GISTIC 结果目录的内存快照，首次访问时同步构建，过期（TTL）后在后台线程刷新，刷新期间继续返回旧快照。
+    """
 
-def get_ora_options(dataset_name):
-    result = {
-        'allele': [],
-        'cns': [],
-        'mcns': []
-    }
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._snapshot = None
+        self._built_at = 0
+        self._refreshing = False
+        self._lock = threading.Lock()
 
-    categories = os.listdir(GISTIC_HOME)
+    def refresh(self):
+        snapshot = scan_gistic_home()
 
-    for category in categories:
-        category_path = os.path.join(GISTIC_HOME, category)
+        with self._lock:
+            self._snapshot = snapshot
+            self._built_at = time.monotonic()
+            self._refreshing = False
 
-        if category == 'consensus':
-            continue
+        return snapshot
+
+    def _refresh_in_background(self):
+        try:
+            self.refresh()
+        except OSError:
+            with self._lock:
+                self._refreshing = False
+
+    def preload(self):
+        threading.Thread(target=self._refresh_in_background, daemon=True).start()
+
+    def get(self):
+        with self._lock:
+            snapshot = self._snapshot
+            expired = time.monotonic() - self._built_at > self.ttl
+            start_refresh = snapshot is not None and expired and not self._refreshing
+
+            if start_refresh:
+                self._refreshing = True
+
+        if snapshot is None:
+            return self.refresh()
+
+        if start_refresh:
+            self.preload()
 
-        if os.path.isdir(category_path):
-            sub_categories = os.listdir(category_path)
+        return snapshot
 
-            for sub_category in sub_categories:
-                process_category(category, sub_category, dataset_name, result)
 
-    result = {key: value for key, value in result.items() if value}
+gistic_catalog = GisticCatalog(settings.GISTIC_CATALOG_TTL)
+
+
+def preload_gistic_catalog():
+    # 只由 Web 服务入口（wsgi.py / asgi.py）调用，manage.py 命令不扫描 GISTIC_HOME
+    if settings.GISTIC_CATALOG_PRELOAD:
+        gistic_catalog.preload()
+
+
+def get_gistic_options(dataset_name):
+    gistic_options, _, _ = gistic_catalog.get()
+    dataset_options = gistic_options.get(dataset_name, {})
+
+    result = {key: list(value) for key, value in dataset_options.items() if value}
+
+    return result
+
+
+def get_ora_options(dataset_name):
+    _, ora_options, consensus_datasets = gistic_catalog.get()
+    dataset_options = ora_options.get(dataset_name, {})
 
-    consensus_ora_name = f'{dataset_name}_consensus_term.csv'
+    result = {key: list(value) for key, value in dataset_options.items() if value}
 
-    if os.path.exists(os.path.join(GISTIC_HOME, 'consensus', consensus_ora_name)):
+    if dataset_name in consensus_datasets:
         result['consensus'] = ['consensus']
 
     return result
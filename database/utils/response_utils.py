@@ -0,0 +1,329 @@
+import os
+import io
+import re
+import csv
+import json
+
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe
+
+from database.utils import compress_utils
+
+CHUNK_SIZE = 64 * 1024
+
+ARROW_STREAM_CONTENT_TYPE = 'application/vnd.apache.arrow.stream'
+
+range_pattern = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def build_file_etag(stat_result, suffix=''):
+    return f'"{stat_result.st_mtime_ns:x}-{stat_result.st_size:x}{suffix}"'
+
+
+def accepts_arrow(request):
+    return ARROW_STREAM_CONTENT_TYPE in request.META.get('HTTP_ACCEPT', '')
+
+
+def rewrite_csv_header(header_line, first_column='id'):
+    # 只解析第一行，保留原文件的换行符
+    line_ending = header_line[len(header_line.rstrip(b'\r\n')):]
+    text = header_line.decode('utf-8')
+
+    header = next(csv.reader([text.rstrip('\r\n')]), [])
+
+    if not header:
+        return header_line
+
+    header[0] = first_column
+
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator=line_ending.decode('utf-8')).writerow(header)
+
+    return buffer.getvalue().encode('utf-8')
+
+
+def parse_range_header(range_header, total_size):
+    """
+    解析单段 Range 请求头，返回 (start, end)，end 为闭区间。
+    请求头不合法时返回 None，超出文件范围时返回 False。
+    """
+    match = range_pattern.match(range_header.strip())
+
+    if not match:
+        return None
+
+    start, end = match.groups()
+
+    if not start and not end:
+        return None
+
+    if not start:
+        # bytes=-N 表示最后 N 个字节
+        length = int(end)
+        if length == 0:
+            return False
+        return max(total_size - length, 0), total_size - 1
+
+    start = int(start)
+    end = int(end) if end else total_size - 1
+
+    if start >= total_size or start > end:
+        return False
+
+    return start, min(end, total_size - 1)
+
+
+def is_if_range_satisfied(request, etag, last_modified):
+    if_range = request.META.get('HTTP_IF_RANGE')
+
+    if not if_range:
+        return True
+
+    if if_range.startswith('"') or if_range.startswith('W/'):
+        return if_range == etag
+
+    if_range_date = parse_http_date_safe(if_range)
+
+    return if_range_date is not None and int(last_modified) <= if_range_date
+
+
+def get_byte_range(request, etag, last_modified, total_size):
+    range_header = request.META.get('HTTP_RANGE')
+
+    if not range_header or not is_if_range_satisfied(request, etag, last_modified):
+        return None
+
+    return parse_range_header(range_header, total_size)
+
+
+def build_range_not_satisfiable_response(total_size):
+    response = HttpResponse(status=416)
+    response['Content-Range'] = f'bytes */{total_size}'
+    response['Accept-Ranges'] = 'bytes'
+
+    return response
+
+
+def iter_rewritten_file(file, header, body_offset, start, end, chunk_size=CHUNK_SIZE):
+    # 虚拟文件 = 新表头 + 原文件从 body_offset 开始的剩余部分
+    try:
+        position = start
+
+        if position < len(header):
+            yield header[position:end + 1]
+            position = len(header)
+
+        file.seek(body_offset + position - len(header))
+        remaining = end + 1 - position
+
+        while remaining > 0:
+            chunk = file.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+    finally:
+        file.close()
+
+
+def iter_csv_body(file_path, first_column='id', chunk_size=CHUNK_SIZE):
+    # 与 build_csv_passthrough_response 返回的响应体一致，用于生成预压缩文件
+    with open(file_path, 'rb') as file:
+        yield rewrite_csv_header(file.readline(), first_column)
+
+        while True:
+            chunk = file.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+
+
+def iter_json_text_body(file_path):
+    # 与 Response(文件文本) 经 JSONRenderer 渲染后的响应体一致
+    with open(file_path, 'r') as file:
+        content = file.read()
+
+    yield json.dumps(content, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def build_precompressed_response(request, file_path, content_type, filename=None):
+    """
+    客户端接受且存在未过期的 .zst / .gz 预压缩文件时直接发送该文件，否则返回 None。
+
+    ETag 按编码区分；预压缩响应不支持 Range。
+    """
+    if request.META.get('HTTP_RANGE'):
+        return None
+
+    sidecar_path, encoding = compress_utils.get_fresh_sidecar(request, file_path)
+
+    if sidecar_path is None:
+        return None
+
+    file = open(sidecar_path, 'rb')
+    stat_result = os.fstat(file.fileno())
+    etag = build_file_etag(stat_result, f'-{encoding}')
+    last_modified = stat_result.st_mtime
+
+    conditional_response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+
+    if conditional_response is not None:
+        file.close()
+        response = conditional_response
+    else:
+        response = FileResponse(file, content_type=content_type)
+        response['Content-Encoding'] = encoding
+
+        if filename:
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    return response
+
+
+def build_csv_passthrough_response(request, file_path, filename, first_column='id'):
+    """
+    以流式方式返回 CSV 文件，仅改写表头第一列名称。
+
+    支持 ETag / Last-Modified 条件请求和单段 Range 请求。
+    存在预压缩文件时优先发送预压缩文件；
+    表头已符合要求时直接交给 FileResponse，由 WSGI 服务器的 file_wrapper（sendfile）发送。
+    """
+    response = build_precompressed_response(request, file_path, 'text/csv', filename)
+
+    if response is not None:
+        return response
+
+    file = open(file_path, 'rb')
+
+    try:
+        stat_result = os.fstat(file.fileno())
+        header_line = file.readline()
+        header = rewrite_csv_header(header_line, first_column)
+    except Exception:
+        file.close()
+        raise
+
+    body_offset = len(header_line)
+    total_size = len(header) + stat_result.st_size - body_offset
+    etag = build_file_etag(stat_result)
+    last_modified = stat_result.st_mtime
+
+    conditional_response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+
+    if conditional_response is not None:
+        file.close()
+        conditional_response['ETag'] = etag
+        conditional_response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(conditional_response, ('Accept-Encoding',))
+        return conditional_response
+
+    byte_range = get_byte_range(request, etag, last_modified, total_size)
+
+    if byte_range is False:
+        file.close()
+        return build_range_not_satisfiable_response(total_size)
+
+    if byte_range is None and header == header_line:
+        file.seek(0)
+        response = FileResponse(file, content_type='text/csv')
+    else:
+        start, end = byte_range if byte_range else (0, total_size - 1)
+
+        response = StreamingHttpResponse(
+            iter_rewritten_file(file, header, body_offset, start, end),
+            content_type='text/csv'
+        )
+        response['Content-Length'] = str(end - start + 1)
+
+        if byte_range:
+            response.status_code = 206
+            response['Content-Range'] = f'bytes {start}-{end}/{total_size}'
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_vary_headers(response, ('Accept-Encoding',))
+
+    return response
+
+
+def build_offload_response(file_path, content_type, accel_root):
+    """
+    按 DOWNLOAD_OFFLOAD_HEADER 生成只含头部的响应，由前端代理发送文件内容（包括 Range 请求）。
+    未开启时返回 None。
+    """
+    offload_header = settings.DOWNLOAD_OFFLOAD_HEADER
+
+    if offload_header == 'x-accel-redirect':
+        relative_path = os.path.relpath(file_path, accel_root)
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = quote(f"{settings.DOWNLOAD_ACCEL_PREFIX.rstrip('/')}/{relative_path}")
+        return response
+
+    if offload_header == 'x-sendfile':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = file_path
+        return response
+
+    return None
+
+
+def build_file_download_response(request, file_path, filename, content_type='application/octet-stream', accel_root=None):
+    """
+    返回文件下载响应，Django 进程内存占用与文件大小无关。
+
+    设置了 DOWNLOAD_OFFLOAD_HEADER 时交给代理发送；否则整文件请求使用 FileResponse（sendfile），
+    单段 Range 请求按块流式返回，支持断点续传。
+    """
+    stat_result = os.stat(file_path)
+    etag = build_file_etag(stat_result)
+    last_modified = stat_result.st_mtime
+
+    conditional_response = get_conditional_response(request, etag=etag, last_modified=int(last_modified))
+
+    if conditional_response is not None:
+        conditional_response['ETag'] = etag
+        conditional_response['Last-Modified'] = http_date(last_modified)
+        return conditional_response
+
+    response = None
+
+    if accel_root is not None:
+        response = build_offload_response(file_path, content_type, accel_root)
+
+    if response is None:
+        total_size = stat_result.st_size
+        byte_range = get_byte_range(request, etag, last_modified, total_size)
+
+        if byte_range is False:
+            return build_range_not_satisfiable_response(total_size)
+
+        file = open(file_path, 'rb')
+
+        if byte_range is None:
+            response = FileResponse(file, content_type=content_type)
+        else:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                iter_rewritten_file(file, b'', 0, start, end),
+                content_type=content_type
+            )
+            response.status_code = 206
+            response['Content-Length'] = str(end - start + 1)
+            response['Content-Range'] = f'bytes {start}-{end}/{total_size}'
+
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+
+    return response
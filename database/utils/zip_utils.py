@@ -0,0 +1,80 @@
+import os
+import time
+import zipfile
+
+CHUNK_SIZE = 64 * 1024
+
+# 已压缩格式直接存储，其余文件使用 deflate
+stored_extensions = ('.gz', '.zip', '.parquet', '.png', '.jpg', '.jpeg', '.bz2', '.xz', '.zst')
+
+
+def get_compress_type(file_path):
+    if file_path.lower().endswith(stored_extensions):
+        return zipfile.ZIP_STORED
+
+    return zipfile.ZIP_DEFLATED
+
+
+class ZipStreamBuffer:
+    """
+    只支持 write 的输出对象，ZipFile 检测到不可 seek 时会改用数据描述符，
+    写入的字节暂存在这里，由生成器逐段取出。
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def build_zip_info(file_path, arcname):
+    stat_result = os.stat(file_path)
+
+    zip_info = zipfile.ZipInfo(arcname, date_time=time.localtime(stat_result.st_mtime)[:6])
+    zip_info.compress_type = get_compress_type(file_path)
+    zip_info.external_attr = (stat_result.st_mode & 0xFFFF) << 16
+    # 预先写入文件大小，超过 4GB 的文件自动使用 ZIP64
+    zip_info.file_size = stat_result.st_size
+
+    return zip_info
+
+
+def iter_zip_stream(entries, chunk_size=CHUNK_SIZE):
+    """
+    按 [(file_path, arcname)] 边压缩边输出 ZIP 字节流，不写临时文件。
+    """
+    buffer = ZipStreamBuffer()
+
+    with zipfile.ZipFile(buffer, 'w') as zipf:
+        for file_path, arcname in entries:
+            zip_info = build_zip_info(file_path, arcname)
+
+            with open(file_path, 'rb') as src, zipf.open(zip_info, 'w') as dest:
+                while True:
+                    chunk = src.read(chunk_size)
+                    if not chunk:
+                        break
+                    dest.write(chunk)
+
+                    data = buffer.drain()
+                    if data:
+                        yield data
+
+            data = buffer.drain()
+            if data:
+                yield data
+
+    # 中央目录在 ZipFile 关闭时写出
+    data = buffer.drain()
+    if data:
+        yield data
@@ -7,11 +7,11 @@ from rest_framework.views import APIView
 from rest_framework.viewsets import ReadOnlyModelViewSet
 from rest_framework.response import Response
 from rest_framework.decorators import api_view
-from django.http import HttpResponse
 
 from database.models import Dataset
 from database.serializers.dataset_serializers import DatasetSerializer
-from database.utils import matrix_utils
+from database.utils import matrix_utils, path_utils, response_utils
+from CNAScope_api.constant import DOWNLOAD_ZIP_HOME
 import os
 
 class DatasetListView(ReadOnlyModelViewSet):
@@ -42,6 +42,32 @@ class DatasetListView(ReadOnlyModelViewSet):
 
 
 class DatasetSampleListView(APIView):
+    reserved_params = {'dataset_name', 'page', 'page_size', 'ordering', 'format'}
+
+    def get_filters(self, request, dataset):
+        """
+        元数据字段名（及 字段__gte / 字段__lte）的查询参数作为筛选条件，其余参数（如防缓存的 _）忽略。
+
+        精确匹配的多个取值通过重复参数传递（?project=A&project=B），取值本身可以包含逗号。
+        """
+        fields = {field for field, _, _ in matrix_utils.get_meta_frame_columns(dataset)}
+        filters = {}
+
+        for key in request.query_params:
+            field, _, lookup = key.partition('__')
+
+            if key in self.reserved_params or field not in fields:
+                continue
+
+            values = [value for value in request.query_params.getlist(key) if value != '']
+
+            if not values:
+                continue
+
+            filters[key] = values[-1] if lookup else values
+
+        return filters
+
     def get(self, request):
         # 从查询参数中获取 dataset_name
         dataset_name = request.query_params.get('dataset_name')
@@ -56,13 +82,47 @@ class DatasetSampleListView(APIView):
         except Dataset.DoesNotExist:
             return Response({"detail": "Dataset not found."}, status=status.HTTP_404_NOT_FOUND)
 
+        page = request.query_params.get('page')
+        page_size = request.query_params.get('page_size')
+
+        filters = self.get_filters(request, dataset)
+        ordering = [field for field in request.query_params.get('ordering', '').split(',') if field]
+
+        # 未指定分页参数时返回全部（筛选、排序后的）样本
+        if not page and not page_size:
+            try:
+                if filters or ordering:
+                    _, samples = matrix_utils.query_meta_matrix(dataset, filters, ordering, page_size=None)
+                else:
+                    samples = matrix_utils.parse_meta_matrix(dataset)
+            except FileNotFoundError:
+                return Response({"detail": "Meta matrix file not found."}, status=status.HTTP_404_NOT_FOUND)
+            except ValueError as e:
+                return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+            # 返回数据
+            return Response(samples, status=status.HTTP_200_OK)
+
+        try:
+            page = int(page) if page else 1
+            page_size = int(page_size) if page_size else 30
+        except ValueError:
+            return Response({'detail': 'Invalid page or page_size value.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if page < 1 or page_size < 1:
+            return Response({'detail': 'Invalid page or page_size value.'}, status=status.HTTP_400_BAD_REQUEST)
+
         try:
-            samples = matrix_utils.parse_meta_matrix(dataset)
+            total, samples = matrix_utils.query_meta_matrix(dataset, filters, ordering, page, page_size)
         except FileNotFoundError:
             return Response({"detail": "Meta matrix file not found."}, status=status.HTTP_404_NOT_FOUND)
+        except ValueError as e:
+            return Response({'detail': str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 返回数据
-        return Response(samples, status=status.HTTP_200_OK)
+        return Response({
+            'total': total,
+            'data': samples
+        }, status=status.HTTP_200_OK)
 
 @api_view(["GET"])
 def download_dataset(request):
@@ -76,11 +136,10 @@ def download_dataset(request):
         return Response({"detail": "Dataset not found."}, status=status.HTTP_404_NOT_FOUND)
 
     try:
-        file_path = os.path.join('/mnt/cbc_adam/platform/CNAScope/data/download_zips', f'{dataset_name}.zip')
-        with open(file_path, 'rb') as f:
-            # 使用Django的HttpResponse来处理二进制数据
-            response = HttpResponse(f.read(), content_type='application/zip')
-            response['Content-Disposition'] = f'attachment; filename="{dataset_name}.zip"'
-            return response
+        file_path = path_utils.get_dataset_download_zip_path(dataset_name)
+        # 文件由 sendfile 或前端代理发送，不读入内存
+        return response_utils.build_file_download_response(
+            request, file_path, f'{dataset_name}.zip', 'application/zip', accel_root=DOWNLOAD_ZIP_HOME
+        )
     except FileNotFoundError:
         return Response({"detail": "Data file not found."}, status=status.HTTP_404_NOT_FOUND)
\ No newline at end of file
@@ -1,19 +1,19 @@
 import os
-import csv
 import json
 
-import pyarrow.parquet as pq
 import pandas as pd
 
+from django.conf import settings
 from django.http import HttpResponse, FileResponse
 
 from rest_framework import status
 from rest_framework.views import APIView
+from rest_framework.permissions import IsAdminUser
 from rest_framework.response import Response
 
 from database.models import Dataset
 
-from database.utils import path_utils, matrix_utils, recurrent_utils
+from database.utils import path_utils, matrix_utils, recurrent_utils, response_utils, cache_utils, gene_index_utils
 
 
 class CNAMatrixView(APIView):
@@ -32,28 +32,12 @@ class CNAMatrixView(APIView):
 
         matrix_path = path_utils.get_dataset_matrix_path(dataset, workflow_type, bin_size)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="matrix.csv"'
-
         try:
-            with open(matrix_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 流式返回，仅将表头第一列改为 'id'
+            return response_utils.build_csv_passthrough_response(request, matrix_path, 'matrix.csv')
         except FileNotFoundError:
             return Response('CNA matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class CNAMetaView(APIView):
     def get(self, request):
@@ -71,28 +55,12 @@ class CNAMetaView(APIView):
 
         meta_path = path_utils.get_dataset_meta_path(dataset, workflow_type, bin_size)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="meta.csv"'
-
         try:
-            with open(meta_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 流式返回，仅将表头第一列改为 'id'
+            return response_utils.build_csv_passthrough_response(request, meta_path, 'meta.csv')
         except FileNotFoundError:
             return Response('CNA meta file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class CNATreeView(APIView):
     def get(self, request):
@@ -113,6 +81,12 @@ class CNATreeView(APIView):
         if tree_path is None:
             return Response('CNA tree file not found!', status=status.HTTP_404_NOT_FOUND)
 
+        # 优先发送离线生成的预压缩文件
+        response = response_utils.build_precompressed_response(request, tree_path, 'application/json')
+
+        if response is not None:
+            return response
+
         try:
             with open(tree_path, 'r') as file:
                 content = file.read()
@@ -139,7 +113,7 @@ class CNAGeneListView(APIView):
         gene_matrix_path = path_utils.get_dataset_gene_matrix_path(dataset, workflow_type, bin_size)
 
         try:
-            header = pq.read_schema(gene_matrix_path).names[1:]
+            header = cache_utils.get_parquet_schema(gene_matrix_path).names[1:]
         except FileNotFoundError:
             return Response('CNA gene matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
@@ -164,6 +138,12 @@ class CNANewickView(APIView):
 
         newick_path = path_utils.get_dataset_newick_path(dataset, workflow_type, bin_size)
 
+        # 优先发送离线生成的预压缩文件
+        response = response_utils.build_precompressed_response(request, newick_path, 'application/json')
+
+        if response is not None:
+            return response
+
         try:
             with open(newick_path, 'r') as file:
                 content = file.read()
@@ -204,6 +184,12 @@ class CNAGeneMatrixView(APIView):
             # 重命名索引为 'id'
             df.index.name = 'id'
 
+            # 客户端接受 Arrow 时返回 float32 的 Arrow IPC stream
+            if response_utils.accepts_arrow(request):
+                return HttpResponse(
+                    matrix_utils.matrix_to_arrow_bytes(df), content_type=response_utils.ARROW_STREAM_CONTENT_TYPE
+                )
+
             # 转成 CSV 字符串
             csv_str = df.to_csv()
 
@@ -236,7 +222,7 @@ class CNATermListView(APIView):
         term_matrix_path = path_utils.get_dataset_term_matrix_path(dataset, workflow_type, bin_size)
 
         try:
-            header = pq.read_schema(term_matrix_path).names[1:]
+            header = cache_utils.get_parquet_schema(term_matrix_path).names[1:]
         except FileNotFoundError:
             return Response('CNA gene matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
@@ -272,6 +258,12 @@ class CNATermMatrixView(APIView):
             # 重命名索引为 'id'
             df.index.name = 'id'
 
+            # 客户端接受 Arrow 时返回 float32 的 Arrow IPC stream
+            if response_utils.accepts_arrow(request):
+                return HttpResponse(
+                    matrix_utils.matrix_to_arrow_bytes(df), content_type=response_utils.ARROW_STREAM_CONTENT_TYPE
+                )
+
             # 转成 CSV 字符串
             csv_str = df.to_csv()
 
@@ -286,6 +278,93 @@ class CNATermMatrixView(APIView):
             return Response({'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class CNAMatrixBatchView(APIView):
+    """
+    批量读取多个数据集的 Gene / Term 矩阵子集。
+
+    请求体为 {"requests": [{"datasetName", "workflowType", "binSize", "genes" | "terms"}, ...]}；
+    Accept 包含 application/vnd.apache.arrow.stream 时按请求顺序返回拼接的 Arrow IPC stream，否则返回 JSON + CSV。
+    """
+    def post(self, request):
+        items = request.data.get('requests', None)
+
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'requests must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > settings.MATRIX_BATCH_MAX_ITEMS:
+            return Response(
+                {'error': f'At most {settings.MATRIX_BATCH_MAX_ITEMS} requests are allowed'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        for index, item in enumerate(items):
+            if not isinstance(item, dict):
+                return Response({'error': f'requests[{index}] must be an object'}, status=status.HTTP_400_BAD_REQUEST)
+            if not item.get('datasetName') or not item.get('workflowType') or not item.get('binSize'):
+                return Response(
+                    {'error': f'requests[{index}]: datasetName, workflowType and binSize are required'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not isinstance(item.get('genes', item.get('terms')), list):
+                return Response(
+                    {'error': f'requests[{index}]: genes or terms must be a list'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # 所有子请求的数据集一次查询
+        datasets = Dataset.objects.in_bulk([item['datasetName'] for item in items], field_name='name')
+
+        jobs = []
+        metadata_list = []
+        for index, item in enumerate(items):
+            dataset = datasets.get(item['datasetName'])
+            kind = 'genes' if 'genes' in item else 'terms'
+
+            metadata = {
+                'index': index,
+                'datasetName': item['datasetName'],
+                'workflowType': item['workflowType'],
+                'binSize': item['binSize'],
+                'kind': kind,
+            }
+
+            if dataset is None:
+                metadata['error'] = 'Dataset does not exist.'
+                jobs.append((None, None))
+            elif kind == 'genes':
+                jobs.append((
+                    path_utils.get_dataset_gene_matrix_path(dataset, item['workflowType'], item['binSize']),
+                    item['genes']
+                ))
+            else:
+                jobs.append((
+                    path_utils.get_dataset_term_matrix_path(dataset, item['workflowType'], item['binSize']),
+                    item['terms']
+                ))
+
+            metadata_list.append(metadata)
+
+        results = []
+        for metadata, (df, error) in zip(metadata_list, matrix_utils.extract_matrices(jobs, settings.MATRIX_BATCH_WORKERS)):
+            if error:
+                metadata['error'] = error
+
+            results.append((metadata, df))
+
+        if response_utils.accepts_arrow(request):
+            return HttpResponse(
+                matrix_utils.build_matrix_batch_stream(results), content_type=response_utils.ARROW_STREAM_CONTENT_TYPE
+            )
+
+        data = []
+        for metadata, df in results:
+            if df is not None:
+                metadata['csv'] = df.to_csv()
+
+            data.append(metadata)
+
+        return Response({'results': data}, status=status.HTTP_200_OK)
+
+
 class FocalCNAOptionsView(APIView):
     def get(self, request):
         dataset_name = request.query_params.get('dataset_name', None)
@@ -316,18 +395,23 @@ class FocalCNAInfoView(APIView):
         del_gene_path = path_utils.get_dataset_recurrent_gene_path(dataset, cn_type, workflow_type, 'del')
         scores_path = path_utils.get_dataset_recurrent_scores_path(dataset, cn_type, workflow_type)
 
-        amp_regions_info = recurrent_utils.parse_recurrent_regions(amp_gene_path)
-        del_regions_info = recurrent_utils.parse_recurrent_regions(del_gene_path)
-        recurrent_scores_data = recurrent_utils.parse_recurrent_scores(scores_path)
+        # 可选的降采样，用于全基因组 scores 图
+        max_points = request.query_params.get('max_points', None)
 
-        if recurrent_scores_data is None:
+        try:
+            max_points = int(max_points) if max_points else None
+        except ValueError:
+            return Response({'detail': 'Invalid max_points value.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if max_points is not None and max_points < 1:
+            return Response({'detail': 'Invalid max_points value.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        content = recurrent_utils.load_focal_cna_info(amp_gene_path, del_gene_path, scores_path, max_points)
+
+        if content is None:
             return Response({'error': 'No recurrent scores data found.'}, status=status.HTTP_400_BAD_REQUEST)
 
-        return Response({
-            'amp': amp_regions_info,
-            'del': del_regions_info,
-            'scores': recurrent_scores_data
-        }, status=status.HTTP_200_OK)
+        return HttpResponse(content, content_type='application/json')
 
 
 class GeneRecurrenceQueryView(APIView):
@@ -353,39 +437,51 @@ class GeneRecurrenceQueryView(APIView):
             return Response({'error': 'Dataset does not exist.'}, status=status.HTTP_400_BAD_REQUEST)
 
         recurrence_file_path = path_utils.get_dataset_recurrent_json_path(dataset, workflow_type, bin_size)
+        recurrence_index_path = path_utils.get_recurrent_index_path(recurrence_file_path)
 
         try:
-            with open(recurrence_file_path, 'r') as f:
-                recurrence_data = json.load(f)
+            # 优先使用索引，只解码当前页的样本
+            total, paged_profiles = recurrent_utils.query_recurrent_profiles(
+                recurrence_file_path, recurrence_index_path, page, page_size
+            )
         except FileNotFoundError:
             return Response('Recurrence file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        # 获取所有的 dataset 键
-        datasets = recurrence_data.get('datasets', {})
-        dataset_keys = list(datasets.keys())
+        # 获取前缀
+        prefix = path_utils.build_dataset_prefix(dataset, workflow_type)
 
-        # 排序 dataset_keys
-        dataset_keys.sort()
+        paged_datasets = {key.replace(prefix, ''): profile for key, profile in paged_profiles}
 
-        # 计算分页的开始和结束索引
-        start_index = (page - 1) * page_size
-        end_index = start_index + page_size
+        return Response({
+            'total': total,
+            'data': paged_datasets
+        }, status=status.HTTP_200_OK)
 
-        # 获取当前页的 dataset 键
-        paged_keys = dataset_keys[start_index:end_index]
 
-        # 获取前缀
-        prefix = path_utils.build_dataset_prefix(dataset, workflow_type)
+class GeneCNAQueryView(APIView):
+    def get(self, request):
+        gene = request.query_params.get('gene', None)
+        workflow_type = request.query_params.get('workflow_type', None)
+        bin_size = request.query_params.get('bin_size', None)
+        include_values = request.query_params.get('include_values', '').lower() in ['1', 'true']
 
-        # 根据分页后的键获取对应的数据
-        paged_datasets = {
-            key.replace(prefix, ''): recurrent_utils.parse_recurrent_profiles(datasets[key])
-            for key in paged_keys
-        }
+        if not gene:
+            return Response({'detail': 'Missing required parameters.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # 基因为主键的离线索引，一次查询返回所有数据集
+            data = gene_index_utils.query_gene_cna(
+                path_utils.get_gene_cna_index_path(), gene, workflow_type, bin_size, include_values
+            )
+        except FileNotFoundError:
+            return Response('Gene index not found!', status=status.HTTP_404_NOT_FOUND)
 
         return Response({
-            'total': len(dataset_keys),
-            'data': paged_datasets
+            'gene': gene,
+            'amp_threshold': settings.GENE_CNA_AMP_THRESHOLD,
+            'del_threshold': settings.GENE_CNA_DEL_THRESHOLD,
+            'total': len(data),
+            'data': data
         }, status=status.HTTP_200_OK)
 
 
@@ -406,7 +502,7 @@ class PloidyDistributionView(APIView):
         matrix_path = path_utils.get_dataset_matrix_path(dataset, workflow_type, bin_size)
 
         try:
-            bin_abundance_list = matrix_utils.calculate_abundance(matrix_path)
+            bin_abundance_list = matrix_utils.get_abundance(matrix_path)
         except FileNotFoundError:
             return Response({'error': 'Matrix file not found!'}, status=status.HTTP_404_NOT_FOUND)
 
@@ -429,28 +525,12 @@ class TopCNVarianceView(APIView):
 
         matrix_path = path_utils.get_dataset_top_cn_variance_path(dataset, workflow_type, bin_size)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="matrix.csv"'
-
         try:
-            with open(matrix_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 流式返回，仅将表头第一列改为 'id'
+            return response_utils.build_csv_passthrough_response(request, matrix_path, 'matrix.csv')
         except FileNotFoundError:
             return Response('CNA matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class SpatialTopCNVarianceView(APIView):
     def get(self, request):
@@ -468,28 +548,12 @@ class SpatialTopCNVarianceView(APIView):
 
         matrix_path = path_utils.get_dataset_spatial_top_cn_variance_path(dataset, workflow_type, bin_size)
 
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="matrix.csv"'
-
         try:
-            with open(matrix_path, 'r', newline='') as file:
-                reader = csv.reader(file)
-                writer = csv.writer(response)
-
-                # 读取第一行（列名）
-                header = next(reader)
-                # 将第一列名称更改为 'id'
-                header[0] = 'id'
-                writer.writerow(header)  # 写入新的列名
-
-                # 逐行写入数据
-                for row in reader:
-                    writer.writerow(row)
+            # 流式返回，仅将表头第一列改为 'id'
+            return response_utils.build_csv_passthrough_response(request, matrix_path, 'matrix.csv')
         except FileNotFoundError:
             return Response('CNA matrix file not found!', status=status.HTTP_404_NOT_FOUND)
 
-        return response
-
 
 class CNAVectorView(APIView):
     def post(self, request):
@@ -637,3 +701,10 @@ class PathwayEnrichmentPlotView(APIView):
         except FileNotFoundError:
             return Response('Pathway Enrichment file not found!', status=status.HTTP_404_NOT_FOUND)
 
+
+class CacheStatsView(APIView):
+    # 缓存统计只对管理员开放
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(cache_utils.get_cache_stats(), status=status.HTTP_200_OK)
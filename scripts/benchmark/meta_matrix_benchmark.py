@@ -0,0 +1,101 @@
+import os
+import json
+import time
+
+import numpy as np
+import pandas as pd
+import django
+import typer
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CNAScope_api.settings')
+
+django.setup()
+
+from rest_framework.utils.encoders import JSONEncoder
+
+from database.utils import matrix_utils
+
+
+def parse_meta_matrix_iterrows(meta_df, meta_columns):
+    # 旧实现：逐行 iterrows + process_value
+    result = []
+
+    def process_value(value, is_numeric=False):
+        if pd.isna(value):
+            return None if is_numeric else ''
+        return value
+
+    for index, row in meta_df.iterrows():
+        sample_data = {
+            field: process_value(row[column], is_numeric=is_numeric)
+            for field, column, is_numeric in meta_columns
+        }
+
+        result.append(sample_data)
+
+    return result
+
+
+def build_synthetic_meta_df(meta_columns, rows, seed=0):
+    rng = np.random.default_rng(seed)
+    data = {}
+
+    for field, column, is_numeric in meta_columns:
+        if is_numeric:
+            values = rng.normal(50, 10, rows)
+        else:
+            values = rng.choice(['A', 'B', 'C', 'D'], rows).astype(object)
+
+        # 约 10% 缺失值
+        values[rng.random(rows) < 0.1] = np.nan
+        data[column] = values
+
+    id_column = meta_columns[0][1]
+    data[id_column] = [f'sample_{i}' for i in range(rows)]
+
+    return pd.DataFrame(data)
+
+
+def run_benchmark(rows_list, skip_old_above):
+    meta_columns_map = {
+        'bulk': matrix_utils.bulk_meta_columns,
+        'GDC_bulk': matrix_utils.GDC_bulk_meta_columns,
+        'scDNA_10x': matrix_utils.scDNA_10x_meta_columns,
+        'single_cell': matrix_utils.single_cell_meta_columns,
+        'ST': matrix_utils.ST_meta_columns,
+    }
+
+    for name, meta_columns in meta_columns_map.items():
+        for rows in rows_list:
+            meta_df = build_synthetic_meta_df(meta_columns, rows)
+
+            start = time.perf_counter()
+            new_result = matrix_utils.convert_meta_matrix(meta_df, meta_columns)
+            new_time = time.perf_counter() - start
+
+            if rows > skip_old_above:
+                print(f'{name:<12} {rows:>9} rows  vectorized {new_time:8.3f}s  iterrows skipped')
+                continue
+
+            start = time.perf_counter()
+            old_result = parse_meta_matrix_iterrows(meta_df, meta_columns)
+            old_time = time.perf_counter() - start
+
+            identical = json.dumps(old_result, cls=JSONEncoder) == json.dumps(new_result, cls=JSONEncoder)
+
+            print(f'{name:<12} {rows:>9} rows  vectorized {new_time:8.3f}s  iterrows {old_time:8.3f}s  '
+                  f'speedup {old_time / new_time:6.1f}x  identical={identical}')
+
+
+def main(
+    rows: str = '10000,100000,1000000',
+    skip_old_above: int = 1000000,
+):
+    run_benchmark(
+        rows_list=[int(r) for r in rows.split(',')],
+        skip_old_above=skip_old_above,
+    )
+
+
+if __name__ == '__main__':
+    typer.run(main)
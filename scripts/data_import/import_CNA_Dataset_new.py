@@ -7,12 +7,11 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CNAScope_api.settings')
 django.setup()
 
 from database.models import Dataset
-from django.db import transaction
 
+import upsert_utils
 
-def import_CNA_Dataset(file_path):
-    Dataset.objects.all().delete()
 
+def import_CNA_Dataset(file_path, prune=False):
     dataset_df = pd.read_csv(file_path)
 
     column_mapping = {
@@ -43,41 +42,29 @@ def import_CNA_Dataset(file_path):
     if missing_cols:
         raise ValueError(f"Excel 缺少必要列: {missing_cols}")
 
-    datasets = []
-    for _, row in dataset_df.iterrows():
-        data = {}
-        for excel_col, model_field in column_mapping.items():
-            value = row[excel_col]
-
-            # 数字字段处理
-            if model_field in ["sample_num", "cell_num", "spot_num"]:
-                try:
-                    value = int(value) if pd.notnull(value) else None
-                except (ValueError, TypeError):
-                    value = None
-
-            # 浮动字段处理 (例如: after_qc_ratio)
-            elif model_field == "after_qc_ratio":
-                try:
-                    value = float(value) if pd.notnull(value) and value != '' else None
-                except (ValueError, TypeError):
-                    value = None
-
-            # 字符串字段处理
-            else:
-                value = str(value).strip() if pd.notnull(value) else ""
-
-            data[model_field] = value
-
-        datasets.append(Dataset(**data))
-
-    # 数据库事务写入
+    # 按列整体清洗，不再逐行处理
+    data = pd.DataFrame(index=dataset_df.index)
+    for excel_col, model_field in column_mapping.items():
+        if model_field in ["sample_num", "cell_num", "spot_num"]:
+            data[model_field] = upsert_utils.clean_int_column(dataset_df, excel_col)
+        elif model_field == "after_qc_ratio":
+            data[model_field] = upsert_utils.clean_float_column(dataset_df, excel_col)
+        else:
+            data[model_field] = upsert_utils.clean_str_column(dataset_df, excel_col).str.strip()
+
+    # 按 name 增量更新，不再清空整张表（清空会级联删除所有样本元数据）
     try:
-        with transaction.atomic():
-            Dataset.objects.bulk_create(datasets, batch_size=500)
+        updated, inserted, _ = upsert_utils.upsert_dataframe(Dataset, data, ['name'])
     except Exception as e:
         raise RuntimeError(f"写入数据库失败: {e}")
 
+    print(f"Datasets updated: {updated}, inserted: {inserted}")
+
+    if prune:
+        # 删除表格中已不存在的数据集（及其样本）
+        deleted, _ = Dataset.objects.exclude(name__in=data['name'].tolist()).delete()
+        print(f"Rows deleted: {deleted}")
+
 
 if __name__ == '__main__':
     data_file_path = './CNAScope table - Dataset Metadata.csv'
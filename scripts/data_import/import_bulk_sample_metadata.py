@@ -7,72 +7,84 @@ os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'CNAScope_api.settings')
 django.setup()
 
 from database.models import Dataset, BulkSampleMetadata
-from django.db import transaction
 
+import upsert_utils
 
-def import_bulk_sample_metadata(dirpath):
-    BulkSampleMetadata.objects.all().delete()
 
-    for filename in os.listdir(dirpath):
-        file_path = os.path.join(dirpath, filename)
+str_column_mapping = {
+    'c_disease_type': 'disease_type',
+    'c_primiary_site': 'primary_site',
+    'c_tumor_stage': 'tumor_stage',
+    'c_tumor_grade': 'tumor_grade',
+    'c_ethinicity': 'ethnicity',
+    'c_race': 'race',
+    'c_gender': 'gender',
+    'c_pfs_status': 'pfs_status',
+    'c_os_status': 'vital_status',
+}
 
-        meta_df = pd.read_csv(file_path)
+int_column_mapping = {
+    'n_age': 'age',
+    'n_pfs': 'pfs',
+    'n_os': 'days_to_death',
+}
 
-        dataset_name = meta_df.loc[0, 'dataset_name']
-        try:
-            dataset = Dataset.objects.get(name=dataset_name)
-        except Dataset.DoesNotExist:
-            print(f"Dataset {dataset_name} not found.")
+
+def load_meta_dir(dirpath):
+    frames = []
+
+    for filename in sorted(os.listdir(dirpath)):
+        meta_df = pd.read_csv(os.path.join(dirpath, filename))
+
+        if meta_df.empty:
             continue
 
-        with transaction.atomic():
-            metas = []
-            for _, row in meta_df.iterrows():
-                # 检查 sample_id 是否已存在，避免重复插入
-                sample_id = row['sample_id']
-
-                # 清洗数据，将 NaN 转换为 None 或合适的默认值
-                disease_type = row.get('c_disease_type', '') if not pd.isna(row.get('c_disease_type')) else ''
-                primary_site = row.get('c_primiary_site', '') if not pd.isna(row.get('c_primiary_site')) else ''
-                tumor_stage = row.get('c_tumor_stage', '') if not pd.isna(row.get('c_tumor_stage')) else ''
-                tumor_grade = row.get('c_tumor_grade', '') if not pd.isna(row.get('c_tumor_grade')) else ''
-                ethnicity = row.get('c_ethinicity', '') if not pd.isna(row.get('c_ethinicity')) else ''
-                race = row.get('c_race', '') if not pd.isna(row.get('c_race')) else ''
-                gender = row.get('c_gender', '') if not pd.isna(row.get('c_gender')) else ''
-
-                # 对数值字段做 NaN 处理，替换为 None
-                age = row.get('n_age', None) if not pd.isna(row.get('n_age')) else None
-                pfs = row.get('n_pfs', None) if not pd.isna(row.get('n_pfs')) else None
-                days_to_death = row.get('n_os', None) if not pd.isna(row.get('n_os')) else None
-
-                pfs_status = row.get('c_pfs_status', '') if not pd.isna(row.get('c_pfs_status')) else ''
-                vital_status = row.get('c_os_status', '') if not pd.isna(row.get('c_os_status')) else ''
-
-                # 构建一个新的 BulkSampleMetadata 实例
-                metadata = BulkSampleMetadata(
-                    sample_id=sample_id,
-                    dataset=dataset,
-                    disease_type=disease_type,
-                    primary_site=primary_site,
-                    tumor_stage=tumor_stage,
-                    tumor_grade=tumor_grade,
-                    ethnicity=ethnicity,
-                    race=race,
-                    gender=gender,
-                    age=age,
-                    pfs=pfs,
-                    days_to_death=days_to_death,
-                    pfs_status=pfs_status,
-                    vital_status=vital_status
-                )
-
-                # 将当前记录加入待保存的 list
-                metas.append(metadata)
-
-            # 批量保存所有记录
-            if metas:
-                BulkSampleMetadata.objects.bulk_create(metas, batch_size=1000)
-                print(f"Successfully imported {len(metas)} samples from {filename}")
+        # 每个文件属于同一个数据集，以第一行为准
+        meta_df['dataset_name'] = meta_df.loc[0, 'dataset_name']
+        frames.append(meta_df)
+
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+def build_sample_frame(meta_df, dataset_ids):
+    data = pd.DataFrame({
+        'dataset_id': meta_df['dataset_name'].map(dataset_ids).astype('Int64'),
+        'sample_id': meta_df['sample_id'].astype(str),
+    })
+
+    for column, field in str_column_mapping.items():
+        data[field] = upsert_utils.clean_str_column(meta_df, column)
+
+    for column, field in int_column_mapping.items():
+        data[field] = upsert_utils.clean_int_column(meta_df, column)
+
+    return data
+
+
+def import_bulk_sample_metadata(dirpath, prune=True):
+    meta_df = load_meta_dir(dirpath)
+
+    if meta_df.empty:
+        print("No sample metadata found.")
+        return
+
+    # 一次查询解析所有数据集外键
+    dataset_names = meta_df['dataset_name'].unique().tolist()
+    dataset_ids = dict(Dataset.objects.filter(name__in=dataset_names).values_list('name', 'id'))
+
+    for dataset_name in dataset_names:
+        if dataset_name not in dataset_ids:
+            print(f"Dataset {dataset_name} not found.")
+
+    meta_df = meta_df[meta_df['dataset_name'].isin(dataset_ids.keys())]
+    data = build_sample_frame(meta_df, dataset_ids)
+
+    # 按 (dataset_id, sample_id) 增量更新；prune 时删除这些数据集中已不在文件里的样本
+    updated, inserted, deleted = upsert_utils.upsert_dataframe(
+        BulkSampleMetadata, data, ['dataset_id', 'sample_id'], prune_field='dataset_id' if prune else None
+    )
+
+    print(f"Samples updated: {updated}, inserted: {inserted}, deleted: {deleted}")
 
 
 if __name__ == '__main__':
@@ -0,0 +1,97 @@
+import io
+import csv
+
+import numpy as np
+import pandas as pd
+
+from django.db import connection, transaction
+
+NULL_MARKER = '\\N'
+
+
+def clean_str_column(df, column):
+    # 缺失列或 NaN 统一为空字符串，与原导入脚本保持一致
+    if column not in df.columns:
+        return pd.Series('', index=df.index, dtype=object)
+
+    series = df[column]
+
+    return series.where(series.isna(), series.astype(str)).fillna('')
+
+
+def clean_int_column(df, column):
+    if column not in df.columns:
+        return pd.Series(pd.NA, index=df.index, dtype='Int64')
+
+    return np.trunc(pd.to_numeric(df[column], errors='coerce')).astype('Int64')
+
+
+def clean_float_column(df, column):
+    if column not in df.columns:
+        return pd.Series(np.nan, index=df.index, dtype=float)
+
+    return pd.to_numeric(df[column], errors='coerce')
+
+
+def copy_dataframe(cursor, table, df):
+    """
+    用 COPY 将 DataFrame 写入表，NaN / NA 写为 NULL。
+    """
+    buffer = io.StringIO()
+    df.to_csv(buffer, index=False, header=False, na_rep=NULL_MARKER, quoting=csv.QUOTE_MINIMAL)
+    buffer.seek(0)
+
+    columns = ', '.join(f'"{column}"' for column in df.columns)
+    cursor.copy_expert(f"COPY {table} ({columns}) FROM STDIN WITH (FORMAT csv, NULL '{NULL_MARKER}')", buffer)
+
+
+def upsert_dataframe(model, df, key_fields, prune_field=None):
+    """
+    COPY 到临时表后按 key_fields 集合式更新 / 插入，返回 (更新行数, 插入行数, 删除行数)。
+
+    只有内容变化的行会被更新；设置 prune_field 时，删除该字段取值出现在本次导入中、但本次导入里已不存在的行。
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    staging = 'upsert_staging'
+    columns = list(df.columns)
+    value_fields = [column for column in columns if column not in key_fields]
+
+    key_match = ' AND '.join(f't."{field}" = s."{field}"' for field in key_fields)
+    target_values = ', '.join(f't."{field}"' for field in value_fields)
+    staging_values = ', '.join(f's."{field}"' for field in value_fields)
+    assignments = ', '.join(f'"{field}" = s."{field}"' for field in value_fields)
+    column_list = ', '.join(f'"{column}"' for column in columns)
+    staging_list = ', '.join(f's."{column}"' for column in columns)
+
+    # 同一 key 重复出现时以最后一行为准
+    df = df.drop_duplicates(subset=key_fields, keep='last')
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f'CREATE TEMP TABLE {staging} ON COMMIT DROP AS SELECT {column_list} FROM {table} WITH NO DATA'
+        )
+        copy_dataframe(cursor, staging, df)
+        cursor.execute(f'ANALYZE {staging}')
+
+        cursor.execute(
+            f'UPDATE {table} t SET {assignments}, "updated_at" = now() FROM {staging} s '
+            f'WHERE {key_match} AND ({target_values}) IS DISTINCT FROM ({staging_values})'
+        )
+        updated = cursor.rowcount
+
+        cursor.execute(
+            f'INSERT INTO {table} ({column_list}, "created_at", "updated_at") '
+            f'SELECT {staging_list}, now(), now() FROM {staging} s '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {table} t WHERE {key_match})'
+        )
+        inserted = cursor.rowcount
+
+        deleted = 0
+        if prune_field is not None:
+            cursor.execute(
+                f'DELETE FROM {table} t WHERE t."{prune_field}" IN (SELECT DISTINCT "{prune_field}" FROM {staging}) '
+                f'AND NOT EXISTS (SELECT 1 FROM {staging} s WHERE {key_match})'
+            )
+            deleted = cursor.rowcount
+
+    return updated, inserted, deleted
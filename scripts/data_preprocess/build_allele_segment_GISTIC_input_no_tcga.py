@@ -1,9 +1,10 @@
 import os
-import json
 
 import typer
 import pandas as pd
-import numpy as np
+
+import gdc_meta_utils
+import segment_utils
 
 
 SAMPLE_META_HOME = 'E:\\CNVWebProject\\CNVData\\GDC-Info-V2\\Meta\\bulk_sample_meta'
@@ -19,18 +20,12 @@ def get_no_tcga_file_map():
                 'CGCI-HTMCP-DLBCL', 'MP2PRT-WT', 'CDDP_EAGLE-1', 'CGCI-HTMCP-LC', 'TARGET-ALL-P1', 'TARGET-CCSK']
 
     for project in projects:
-        with open(os.path.join(FILE_META_HOME, project, 'metadata.json'), 'r') as f:
-            metadata = json.load(f)
-
         if project not in ['MMRF-COMMPASS', 'TARGET-ALL-P1', 'TARGET-ALL-P3', 'WCDT-MCRPC']:
-            for item in metadata:
-                if item['data_type'] == 'Allele-specific Copy Number Segment':
-                    file_map[item['file_id']] = item['file_name']
-
+            data_type = 'Allele-specific Copy Number Segment'
         else:
-            for item in metadata:
-                if item['data_type'] == 'Copy Number Segment':
-                    file_map[item['file_id']] = item['file_name']
+            data_type = 'Copy Number Segment'
+
+        file_map.update(gdc_meta_utils.get_project_files(FILE_META_HOME, project, data_type))
 
     return file_map
 
@@ -70,37 +65,16 @@ def get_no_tcga_file_dict():
 
 
 def get_cnv_df(project, workflow, cnv_file_list, is_gatk=False):
-    segment_df = None
-
-    for file in cnv_file_list:
-        file_id = os.path.basename(os.path.dirname(file))
-
-        file_df = pd.read_csv(file, sep='\t')
-
-        if is_gatk:
-            file_df = file_df.drop(['GDC_Aliquot_ID', 'Num_Probes'], axis=1)
-            file_df.insert(0, 'file_id', f'{project}.{workflow}_{file_id}')
-            file_df.insert(4, 'Probe_Num', 1)
-            file_df = file_df[file_df['Chromosome'] != 'chrM']
-        else:
-            file_df = file_df.drop(['GDC_Aliquot', 'Major_Copy_Number', 'Minor_Copy_Number'], axis=1)
-            file_df.insert(0, 'file_id', f'{project}.{workflow}_{file_id}')
-            file_df.insert(4, 'Probe_Num', 1)
-
-        if segment_df is None:
-            segment_df = file_df
-        else:
-            segment_df = pd.concat([segment_df, file_df], ignore_index=True)
-
     if is_gatk:
-        segment_df['Chromosome'] = segment_df['Chromosome'].str.replace('chr', '', regex=False)
-    else:
-        segment_df['Chromosome'] = segment_df['Chromosome'].str.replace('chr', '', regex=False)
-        segment_df['Copy_Number'] = segment_df['Copy_Number'].apply(
-            lambda x: np.log2(x / 2.0) if x != 0 else np.log2(0.1 / 2)
+        return segment_utils.load_segments(
+            project, workflow, cnv_file_list, ['GDC_Aliquot_ID', 'Num_Probes'],
+            probe_num=True, drop_chrM=True, strip_chr=True
         )
 
-    return segment_df
+    return segment_utils.load_segments(
+        project, workflow, cnv_file_list, ['GDC_Aliquot', 'Major_Copy_Number', 'Minor_Copy_Number'],
+        probe_num=True, strip_chr=True, log2_copy_number=True
+    )
 
 
 def run_cptac(file_dict, file_map, output_dir_path):
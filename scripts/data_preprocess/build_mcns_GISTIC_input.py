@@ -1,55 +1,34 @@
 import os
-import json
 
-import pandas as pd
 import typer
 
+import gdc_meta_utils
+import segment_utils
+
 
 FILE_META_HOME = '/workspace2/zhengjieyi/CNVWebProject/scSVAS/combine_cnv_new/FileInfo'
 
 
 def get_cnv_files_list_from_metadata(cnv_dir_path, project):
-    metadata_path = os.path.join(FILE_META_HOME, project, 'metadata.json')
-
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
-
-    dna_copy_files = []
-    gatk_files = []
-
-    for item in metadata:
-        if item['analysis']['workflow_type'] == 'DNAcopy' and item['data_type'] == 'Masked Copy Number Segment':
-            dna_copy_files.append(os.path.join(cnv_dir_path, item['file_id'], item['file_name']))
-
-        if item['analysis']['workflow_type'] == 'GATK4 CNV' and item['data_type'] == 'Masked Copy Number Segment':
-            gatk_files.append(os.path.join(cnv_dir_path, item['file_id'], item['file_name']))
+    dna_copy_files = [
+        os.path.join(cnv_dir_path, file_id, file_name)
+        for file_id, file_name in gdc_meta_utils.get_project_files(FILE_META_HOME, project, 'Masked Copy Number Segment', 'DNAcopy')
+    ]
+    gatk_files = [
+        os.path.join(cnv_dir_path, file_id, file_name)
+        for file_id, file_name in gdc_meta_utils.get_project_files(FILE_META_HOME, project, 'Masked Copy Number Segment', 'GATK4 CNV')
+    ]
 
     return dna_copy_files, gatk_files
 
 
 def get_cnv_df(project, workflow, cnv_file_list, is_gatk=False):
-    segment_df = None
-
-    for file in cnv_file_list:
-        file_id = os.path.basename(os.path.dirname(file))
-
-        file_df = pd.read_csv(file, sep='\t')
-        if is_gatk:
-            file_df = file_df.drop(['GDC_Aliquot_ID'], axis=1)
-            file_df = file_df[file_df['Chromosome'] != 'chrM']
-        else:
-            file_df = file_df.drop(['GDC_Aliquot'], axis=1)
-        file_df.insert(0, 'file_id', f'{project}.{workflow}_{file_id}')
-
-        if segment_df is None:
-            segment_df = file_df
-        else:
-            segment_df = pd.concat([segment_df, file_df], ignore_index=True)
-
     if is_gatk:
-        segment_df['Chromosome'] = segment_df['Chromosome'].str.replace('chr', '', regex=False)
+        return segment_utils.load_segments(
+            project, workflow, cnv_file_list, ['GDC_Aliquot_ID'], drop_chrM=True, strip_chr=True
+        )
 
-    return segment_df
+    return segment_utils.load_segments(project, workflow, cnv_file_list, ['GDC_Aliquot'])
 
 
 def run_script(cnv_dir_path, output_dir_path):
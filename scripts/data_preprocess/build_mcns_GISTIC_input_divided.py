@@ -3,7 +3,9 @@ import json
 
 import typer
 import pandas as pd
-import numpy as np
+
+import gdc_meta_utils
+import segment_utils
 
 # CASE_META_HOME = '/workspace2/zhengjieyi/CNVWebProject/scSVAS/cns_gistic/bulk_case_meta'
 CASE_META_HOME = 'E:\\CNVWebProject\\CNVData\\GDC-Info-V2\\Meta\\bulk_case_meta'
@@ -15,46 +17,26 @@ ID_MAP_HOME = 'E:\\CNVWebProject\\CNVData\\GDC-Info-V2\\Meta\\divided_project_ca
 
 
 def get_no_tcga_file_map():
-    file_map = {}
-
-    projects = ['CPTAC-3', 'HCMI-CMDC']
-
-    for project in projects:
-        with open(os.path.join(FILE_META_HOME, project, 'metadata.json'), 'r') as f:
-            metadata = json.load(f)
-
-        for item in metadata:
-            if item['data_type'] == 'Masked Copy Number Segment':
-                file_map[item['file_id']] = item['file_name']
-
-    return file_map
+    return gdc_meta_utils.get_file_name_map(FILE_META_HOME, ['CPTAC-3', 'HCMI-CMDC'], 'Masked Copy Number Segment')
 
 
 def get_file_ids(path, is_cptac=True):
     df = pd.read_csv(path)
     sample_ids = df["sample_id"].tolist()
-    file_ids = []
 
     if is_cptac:
-        metadata_path = os.path.join(FILE_META_HOME, 'CPTAC-3', 'metadata.json')
+        project = 'CPTAC-3'
         id_map_path = os.path.join(ID_MAP_HOME, 'cptac.json')
     else:
-        metadata_path = os.path.join(FILE_META_HOME, 'HCMI-CMDC', 'metadata.json')
+        project = 'HCMI-CMDC'
         id_map_path = os.path.join(ID_MAP_HOME, 'hcmi.json')
 
-    with open(metadata_path, 'r') as f:
-        metadata = json.load(f)
-
     with open(id_map_path, 'r') as f:
         id_map = json.load(f)
 
     case_ids = [id_map[sample_id] for sample_id in sample_ids]
 
-    for meta in metadata:
-        if meta['associated_entities'][0]['case_id'] in case_ids and meta['data_type'] == 'Masked Copy Number Segment':
-            file_ids.append(meta['file_id'])
-
-    return file_ids
+    return gdc_meta_utils.get_case_file_ids(FILE_META_HOME, project, case_ids, 'Masked Copy Number Segment')
 
 
 def get_no_tcga_file_dict():
@@ -80,28 +62,12 @@ def get_no_tcga_file_dict():
 
 
 def get_cnv_df(project, workflow, cnv_file_list, is_gatk=False):
-    segment_df = None
-
-    for file in cnv_file_list:
-        file_id = os.path.basename(os.path.dirname(file))
-
-        file_df = pd.read_csv(file, sep='\t')
-        if is_gatk:
-            file_df = file_df.drop(['GDC_Aliquot_ID'], axis=1)
-            file_df = file_df[file_df['Chromosome'] != 'chrM']
-        else:
-            file_df = file_df.drop(['GDC_Aliquot'], axis=1)
-        file_df.insert(0, 'file_id', f'{project}.{workflow}_{file_id}')
-
-        if segment_df is None:
-            segment_df = file_df
-        else:
-            segment_df = pd.concat([segment_df, file_df], ignore_index=True)
-
     if is_gatk:
-        segment_df['Chromosome'] = segment_df['Chromosome'].str.replace('chr', '', regex=False)
+        return segment_utils.load_segments(
+            project, workflow, cnv_file_list, ['GDC_Aliquot_ID'], drop_chrM=True, strip_chr=True
+        )
 
-    return segment_df
+    return segment_utils.load_segments(project, workflow, cnv_file_list, ['GDC_Aliquot'])
 
 
 def run_cptac(file_dict, file_map, output_dir_path):
@@ -0,0 +1,190 @@
+import os
+import json
+import sqlite3
+import tempfile
+
+import typer
+
+
+INDEX_FILE_NAME = 'metadata_index.sqlite3'
+
+_connections = {}
+
+
+def get_index_path(file_meta_home):
+    return os.path.join(file_meta_home, INDEX_FILE_NAME)
+
+
+def make_temp_path(target_path):
+    # 同目录下的唯一临时文件，并发构建互不覆盖；权限与普通 open() 创建的文件一致（0666 & ~umask）
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target_path), prefix=f'.{os.path.basename(target_path)}.', suffix='.tmp')
+    umask = os.umask(0)
+    os.umask(umask)
+
+    try:
+        os.fchmod(fd, 0o666 & ~umask)
+    finally:
+        os.close(fd)
+
+    return tmp_path
+
+
+def list_metadata_files(file_meta_home):
+    # {project: metadata.json 的 mtime_ns}
+    metadata_files = {}
+
+    for project in sorted(os.listdir(file_meta_home)):
+        metadata_path = os.path.join(file_meta_home, project, 'metadata.json')
+
+        if os.path.isfile(metadata_path):
+            metadata_files[project] = os.stat(metadata_path).st_mtime_ns
+
+    return metadata_files
+
+
+def iter_metadata_rows(project, metadata):
+    for position, item in enumerate(metadata):
+        entities = item.get('associated_entities') or [{}]
+
+        yield (
+            project,
+            position,
+            item['file_id'],
+            item['file_name'],
+            entities[0].get('case_id'),
+            item.get('data_type'),
+            item.get('analysis', {}).get('workflow_type'),
+        )
+
+
+def build_metadata_index(file_meta_home, index_path=None):
+    """
+    将 FILE_META_HOME/<project>/metadata.json 转换为 SQLite 索引，
+    按 (project, data_type) 和 case_id 建立索引，保留每个项目内的原始顺序。
+    """
+    index_path = index_path or get_index_path(file_meta_home)
+    metadata_files = list_metadata_files(file_meta_home)
+
+    tmp_path = make_temp_path(index_path)
+
+    try:
+        conn = sqlite3.connect(tmp_path)
+        try:
+            conn.execute('CREATE TABLE sources (project TEXT PRIMARY KEY, mtime_ns INTEGER)')
+            conn.execute(
+                'CREATE TABLE files (project TEXT, position INTEGER, file_id TEXT, file_name TEXT, '
+                'case_id TEXT, data_type TEXT, workflow_type TEXT, PRIMARY KEY (project, position))'
+            )
+
+            for project, mtime_ns in metadata_files.items():
+                with open(os.path.join(file_meta_home, project, 'metadata.json'), 'r') as f:
+                    metadata = json.load(f)
+
+                conn.executemany('INSERT INTO files VALUES (?, ?, ?, ?, ?, ?, ?)', iter_metadata_rows(project, metadata))
+                conn.execute('INSERT INTO sources VALUES (?, ?)', (project, mtime_ns))
+
+            conn.execute('CREATE INDEX files_data_type ON files (project, data_type, workflow_type)')
+            conn.execute('CREATE INDEX files_case_id ON files (case_id, data_type)')
+            conn.commit()
+        finally:
+            conn.close()
+
+        os.replace(tmp_path, index_path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
+    return index_path
+
+
+def is_metadata_index_fresh(file_meta_home, index_path):
+    if not os.path.exists(index_path):
+        return False
+
+    conn = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+    try:
+        sources = dict(conn.execute('SELECT project, mtime_ns FROM sources').fetchall())
+    except sqlite3.DatabaseError:
+        return False
+    finally:
+        conn.close()
+
+    return sources == list_metadata_files(file_meta_home)
+
+
+def open_metadata_index(file_meta_home):
+    """
+    返回索引连接；索引缺失或任一 metadata.json 有变化时先重建。
+    """
+    conn = _connections.get(file_meta_home)
+
+    if conn is not None:
+        return conn
+
+    index_path = get_index_path(file_meta_home)
+
+    if not is_metadata_index_fresh(file_meta_home, index_path):
+        build_metadata_index(file_meta_home, index_path)
+
+    conn = sqlite3.connect(f'file:{index_path}?mode=ro', uri=True)
+    _connections[file_meta_home] = conn
+
+    return conn
+
+
+def get_project_files(file_meta_home, project, data_type, workflow_type=None):
+    """
+    返回 [(file_id, file_name)]，顺序与 metadata.json 一致。
+    """
+    conn = open_metadata_index(file_meta_home)
+
+    if workflow_type is None:
+        rows = conn.execute(
+            'SELECT file_id, file_name FROM files WHERE project = ? AND data_type = ? ORDER BY position',
+            (project, data_type)
+        )
+    else:
+        rows = conn.execute(
+            'SELECT file_id, file_name FROM files WHERE project = ? AND data_type = ? AND workflow_type = ? '
+            'ORDER BY position',
+            (project, data_type, workflow_type)
+        )
+
+    return rows.fetchall()
+
+
+def get_file_name_map(file_meta_home, projects, data_type):
+    # {file_id: file_name}，多个项目中重复的 file_id 以后面的项目为准
+    file_map = {}
+
+    for project in projects:
+        file_map.update(get_project_files(file_meta_home, project, data_type))
+
+    return file_map
+
+
+def get_case_file_ids(file_meta_home, project, case_ids, data_type):
+    """
+    返回项目中属于 case_ids 的文件 id，顺序与 metadata.json 一致。
+    """
+    case_ids = set(case_ids)
+    conn = open_metadata_index(file_meta_home)
+
+    rows = conn.execute(
+        'SELECT file_id, case_id FROM files WHERE project = ? AND data_type = ? ORDER BY position',
+        (project, data_type)
+    )
+
+    return [file_id for file_id, case_id in rows if case_id in case_ids]
+
+
+def main(file_meta_home: str):
+    index_path = build_metadata_index(file_meta_home)
+    print(index_path)
+
+
+if __name__ == '__main__':
+    typer.run(main)
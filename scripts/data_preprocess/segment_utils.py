@@ -0,0 +1,58 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+
+SEGMENT_READ_WORKERS = 16
+
+
+def read_segment_file(file, project, workflow, drop_columns, probe_num=False, drop_chrM=False):
+    file_id = os.path.basename(os.path.dirname(file))
+
+    file_df = pd.read_csv(file, sep='\t')
+    file_df = file_df.drop(drop_columns, axis=1)
+    file_df.insert(0, 'file_id', f'{project}.{workflow}_{file_id}')
+
+    if probe_num:
+        file_df.insert(4, 'Probe_Num', 1)
+
+    if drop_chrM:
+        file_df = file_df[file_df['Chromosome'] != 'chrM']
+
+    return file_df
+
+
+def log2_copy_number_ratio(copy_number):
+    # 拷贝数为 0 时按 0.1 计算，避免 log2(0)
+    values = copy_number.to_numpy(dtype=float)
+
+    return np.log2(np.where(values != 0, values, 0.1) / 2.0)
+
+
+def load_segments(project, workflow, cnv_file_list, drop_columns, probe_num=False, drop_chrM=False,
+                  strip_chr=False, log2_copy_number=False, workers=SEGMENT_READ_WORKERS):
+    """
+    多线程读取所有 segment 文件，最后一次性合并，染色体前缀和 log2 转换在合并后整体进行。
+
+    文件顺序与 cnv_file_list 一致；列表为空时返回 None。
+    """
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        frames = list(executor.map(
+            lambda file: read_segment_file(file, project, workflow, drop_columns, probe_num, drop_chrM),
+            cnv_file_list
+        ))
+
+    if not frames:
+        return None
+
+    segment_df = pd.concat(frames, ignore_index=True)
+
+    if strip_chr:
+        segment_df['Chromosome'] = segment_df['Chromosome'].str.replace('chr', '', regex=False)
+
+    if log2_copy_number:
+        segment_df['Copy_Number'] = log2_copy_number_ratio(segment_df['Copy_Number'])
+
+    return segment_df